@@ -9,48 +9,99 @@
 - Логирование ключевых событий (запуск, ошибки, остановка)
 
 Команды бота включают:
-/start, /help, /sleep, /calories, /workout, /stats, /plot, /advice, /motivation
+/start, /help, /sleep, /calories, /workout, /stats, /trends, /plot, /advice,
+/motivation, а для администраторов (ADMIN_IDS) - /percentiles
+
+Графики строятся в пуле процессов (модуль render_pool).
+
+Ежедневно по расписанию старые записи переносятся в архив,
+а по понедельникам активным пользователям рассылается недельная
+сводка (прерванная рассылка продолжается при запуске бота).
 
 После запуска бот начинает прослушивать обновления в режиме polling.
 """
 
+import datetime
 import logging
 from telegram.ext import CommandHandler, ApplicationBuilder, Defaults
 from telegram.constants import ParseMode
-from telegram_tracker_bot.db import initialize_db
+from telegram_tracker_bot.db import (get_storage, close_all_pools,
+                                     shutdown_db_executor)
 from telegram_tracker_bot.handlers import (start, help_command, record_sleep,
                                            record_calories, record_workout,
-                                           show_stats, send_plot, send_advice,
-                                           send_motivation, error_handler)
+                                           show_stats, show_trends,
+                                           show_percentiles,
+                                           send_plot, send_advice,
+                                           send_motivation, error_handler,
+                                           archive_job, weekly_digest_job,
+                                           resume_digest_job)
+from telegram_tracker_bot.logic.render_pool import (start_render_pool,
+                                                    shutdown_render_pool)
 from telegram_tracker_bot.config import TELEGRAM_BOT_TOKEN
 
-initialize_db('telegram_tracker_bot/db/tracker_data_base.db')
 logging.basicConfig(
     format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
     level=logging.INFO
 )
 logger = logging.getLogger(__name__)
 
-"""Запускает бота."""
-logger.info("Запуск бота...")
-
-defaults = Defaults(parse_mode=ParseMode.HTML)
-application = (ApplicationBuilder()
-               .token(TELEGRAM_BOT_TOKEN)
-               .defaults(defaults).build())
-
-application.add_handler(CommandHandler("start", start))
-application.add_handler(CommandHandler("help", help_command))
-application.add_handler(CommandHandler("sleep", record_sleep))
-application.add_handler(CommandHandler("calories", record_calories))
-application.add_handler(CommandHandler("workout", record_workout))
-application.add_handler(CommandHandler("stats", show_stats))
-application.add_handler(CommandHandler("plot", send_plot))
-application.add_handler(CommandHandler("advice", send_advice))
-application.add_handler(CommandHandler("motivation", send_motivation))
-
-application.add_error_handler(error_handler)
-logger.info("Бот готов к работе.")
-application.run_polling()
-logger.info("Бот остановлен.")
+
+async def on_startup(_application) -> None:
+    """Запускает процессы построения графиков при запуске бота."""
+    start_render_pool()
+
+
+async def on_shutdown(_application) -> None:
+    """
+    Дописывает отложенные записи хранилища, останавливает пулы потоков
+    базы данных и процессов графиков и закрывает подключения
+    при остановке бота.
+    """
+    await get_storage().close()
+    shutdown_db_executor()
+    shutdown_render_pool()
+    close_all_pools()
+
+
+def main() -> None:
+    """Запускает бота."""
+    get_storage().initialize()
+    logger.info("Запуск бота...")
+
+    defaults = Defaults(parse_mode=ParseMode.HTML)
+    application = (ApplicationBuilder()
+                   .token(TELEGRAM_BOT_TOKEN)
+                   .defaults(defaults)
+                   .post_init(on_startup)
+                   .post_shutdown(on_shutdown).build())
+
+    application.add_handler(CommandHandler("start", start))
+    application.add_handler(CommandHandler("help", help_command))
+    application.add_handler(CommandHandler("sleep", record_sleep))
+    application.add_handler(CommandHandler("calories", record_calories))
+    application.add_handler(CommandHandler("workout", record_workout))
+    application.add_handler(CommandHandler("stats", show_stats))
+    application.add_handler(CommandHandler("trends", show_trends))
+    application.add_handler(CommandHandler("percentiles", show_percentiles))
+    application.add_handler(CommandHandler("plot", send_plot))
+    application.add_handler(CommandHandler("advice", send_advice))
+    application.add_handler(CommandHandler("motivation", send_motivation))
+
+    application.job_queue.run_daily(archive_job,
+                                    time=datetime.time(hour=3))
+    # дни недели: 0 - воскресенье, 1 - понедельник
+    application.job_queue.run_daily(weekly_digest_job,
+                                    time=datetime.time(hour=10), days=(1,))
+    application.job_queue.run_once(resume_digest_job, when=0)
+
+    application.add_error_handler(error_handler)
+    logger.info("Бот готов к работе.")
+    application.run_polling()
+    logger.info("Бот остановлен.")
+
+
+# Процессы графиков запускаются методом spawn и импортируют этот модуль
+# заново, поэтому бот запускается только при прямом запуске файла.
+if __name__ == "__main__":
+    main()
 # запуск тестов PYTHONPATH=. pytest --cov=telegram_tracker_bot
\ No newline at end of file
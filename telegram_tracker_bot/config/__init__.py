@@ -8,7 +8,16 @@ from .config import (
     GIGACHAT_CLIENT_SECRET,
     GIGACHAT_TOKEN_URL,
     GIGACHAT_AUTHORIZATION_KEY,
-    DATABASE_NAME
+    DATABASE_NAME,
+    DATABASE_SHARDS,
+    STORAGE_BACKEND,
+    ARCHIVE_HORIZON_DAYS,
+    ARCHIVE_COMPRESS,
+    ADMIN_IDS,
+    PLOT_CACHE_DIR,
+    PLOT_CACHE_MAX_BYTES,
+    PLOT_ANNOTATIONS,
+    PLOT_RENDERER
 )
 
 __all__ = [
@@ -17,5 +26,14 @@ __all__ = [
     'GIGACHAT_CLIENT_SECRET',
     'GIGACHAT_TOKEN_URL',
     'GIGACHAT_AUTHORIZATION_KEY',
-    'DATABASE_NAME'
+    'DATABASE_NAME',
+    'DATABASE_SHARDS',
+    'STORAGE_BACKEND',
+    'ARCHIVE_HORIZON_DAYS',
+    'ARCHIVE_COMPRESS',
+    'ADMIN_IDS',
+    'PLOT_CACHE_DIR',
+    'PLOT_CACHE_MAX_BYTES',
+    'PLOT_ANNOTATIONS',
+    'PLOT_RENDERER'
 ]
@@ -3,7 +3,11 @@
 
 Содержит конфиденциальные данные и настройки:
 - Токен бота Telegram
-- Имя файла базы данных
+- Имя файла базы данных, число шардов базы и вид хранилища
+- Горизонт архивации старых записей
+- ID администраторов бота
+- Каталог и размер дискового кэша графиков, подписи значений на графике
+  и способ его отрисовки (matplotlib или Pillow)
 - Ключи API и другие секреты
 
 Важно:
@@ -25,3 +29,16 @@ GIGACHAT_CLIENT_SECRET = os.getenv('GIGACHAT_CLIENT_SECRET')
 GIGACHAT_TOKEN_URL = os.getenv('GIGACHAT_TOKEN_URL')
 GIGACHAT_AUTHORIZATION_KEY = os.getenv('GIGACHAT_AUTHORIZATION_KEY')
 DATABASE_NAME = 'telegram_tracker_bot/db/tracker_data_base.db'
+DATABASE_SHARDS = int(os.getenv('DATABASE_SHARDS', '1'))
+STORAGE_BACKEND = os.getenv('STORAGE_BACKEND', 'sqlite')
+ARCHIVE_HORIZON_DAYS = int(os.getenv('ARCHIVE_HORIZON_DAYS', '90'))
+ARCHIVE_COMPRESS = os.getenv('ARCHIVE_COMPRESS', '1') == '1'
+ADMIN_IDS = frozenset(int(user_id)
+                      for user_id in os.getenv('ADMIN_IDS', '').split(',')
+                      if user_id.strip())
+PLOT_CACHE_DIR = os.getenv('PLOT_CACHE_DIR',
+                           'telegram_tracker_bot/db/plot_cache')
+PLOT_CACHE_MAX_BYTES = int(os.getenv('PLOT_CACHE_MAX_BYTES',
+                                     str(64 * 1024 * 1024)))
+PLOT_ANNOTATIONS = os.getenv('PLOT_ANNOTATIONS', '1') == '1'
+PLOT_RENDERER = os.getenv('PLOT_RENDERER', 'matplotlib')
@@ -8,13 +8,86 @@ from .database import (
     add_calories_record,
     add_workout_record,
     get_records_last_n_days,
+    get_all_records_last_n_days,
+    get_daily_summary_last_n_days,
+    get_window_totals_last_n_days,
+    totals_from_summary,
+    get_running_stats,
+    get_quantile_sketches,
+    get_active_user_ids,
+    get_daily_summaries_for_users,
+    get_running_stats_for_users,
+    get_digest_progress,
+    save_digest_progress,
     initialize_db,
 )
+from .running_stats import RunningStats
+from .quantiles import QuantileSketch
+from .archive import archive_old_records
+from .days import date_to_day, day_to_date, format_day
+from .records import Record, SleepRecord, CaloriesRecord, WorkoutRecord
+from .columnar import get_daily_columns_last_n_days, has_data
+from .connection import close_all_pools
+from .sharding import shard_path, all_shard_paths, reshard
+from .write_queue import (get_write_queue, close_write_queues,
+                          WriteQueueStopped)
+from .backend import (
+    StorageBackend,
+    SQLiteBackend,
+    create_storage,
+    get_storage,
+    set_storage,
+    add_record_listener,
+)
+from .async_api import (
+    run_in_db_executor,
+    async_get_records_last_n_days,
+    shutdown_db_executor,
+)
 
 __all__ = [
     'add_sleep_record',
     'add_calories_record',
     'add_workout_record',
     'get_records_last_n_days',
+    'get_all_records_last_n_days',
+    'get_daily_summary_last_n_days',
+    'get_window_totals_last_n_days',
+    'totals_from_summary',
+    'get_running_stats',
+    'RunningStats',
+    'get_quantile_sketches',
+    'get_active_user_ids',
+    'get_daily_summaries_for_users',
+    'get_running_stats_for_users',
+    'get_digest_progress',
+    'save_digest_progress',
+    'QuantileSketch',
     'initialize_db',
+    'get_daily_columns_last_n_days',
+    'has_data',
+    'date_to_day',
+    'day_to_date',
+    'format_day',
+    'Record',
+    'SleepRecord',
+    'CaloriesRecord',
+    'WorkoutRecord',
+    'close_all_pools',
+    'shard_path',
+    'all_shard_paths',
+    'reshard',
+    'archive_old_records',
+    'get_write_queue',
+    'close_write_queues',
+    'WriteQueueStopped',
+    'StorageBackend',
+    'SQLiteBackend',
+    'create_storage',
+    'get_storage',
+    'set_storage',
+    'add_record_listener',
+    'run_in_db_executor',
+    'async_get_records_last_n_days',
+    'shutdown_db_executor',
 ]
@@ -0,0 +1,280 @@
+"""
+Модуль архивации старых записей (горячие и холодные данные).
+
+Все команды бота читают только последние дни, поэтому записи старше
+заданного горизонта переносятся из таблиц sleep, calories и workouts
+в таблицу archive_chunks: по одному блоку на (таблица, пользователь,
+месяц). Блок хранит записи месяца в JSON, по умолчанию сжатом zlib.
+Так основные таблицы и их индексы остаются небольшими.
+
+Дневные сводки при архивации не меняются, поэтому /stats и /plot
+не зависят от архива. Функции чтения записей (get_records_last_n_days,
+get_all_records_last_n_days) прозрачно дочитывают архив, только если
+окно начинается раньше горизонта ARCHIVE_HORIZON_DAYS: более новых
+записей в архиве нет, поэтому короткие окна обходятся без него.
+
+Запуск из командной строки:
+    python -m telegram_tracker_bot.db.archive --horizon 90
+"""
+
+import argparse
+import datetime
+import json
+import sqlite3
+import sys
+import zlib
+from typing import Iterator, Optional
+from .connection import connection
+from .days import date_to_day
+from .records import RECORD_TYPES, Record
+from .sharding import all_shard_paths
+
+ARCHIVE_FIELDS = {
+    "sleep": ("id", "date", "hours", "timestamp"),
+    "calories": ("id", "date", "amount", "timestamp"),
+    "workouts": ("id", "date", "duration_hours", "activity_type",
+                 "timestamp"),
+}
+
+
+def _encode(rows: list[list], compress: bool) -> bytes:
+    """
+    Упаковывает записи блока в JSON (при необходимости сжатый).
+
+    Args:
+        rows (list[list]): Записи в порядке столбцов ARCHIVE_FIELDS.
+        compress (bool): Сжимать ли блок zlib.
+
+    Returns:
+        bytes: Содержимое блока.
+    """
+    payload = json.dumps(rows, ensure_ascii=False,
+                         separators=(",", ":")).encode("utf-8")
+    return zlib.compress(payload, 9) if compress else payload
+
+
+def _decode(payload: bytes, compressed: int) -> list[list]:
+    """
+    Распаковывает записи блока.
+
+    Args:
+        payload (bytes): Содержимое блока.
+        compressed (int): Признак сжатия блока.
+
+    Returns:
+        list[list]: Записи в порядке столбцов ARCHIVE_FIELDS.
+    """
+    if compressed:
+        payload = zlib.decompress(payload)
+    return json.loads(payload.decode("utf-8"))
+
+
+def _store_chunk(conn: sqlite3.Connection, table: str, user_id: int,
+                 month: str, rows: list[list], compress: bool) -> None:
+    """
+    Добавляет записи в блок архива, объединяя с уже сохраненными.
+
+    Args:
+        conn (sqlite3.Connection): Подключение к базе данных.
+        table (str): Исходная таблица.
+        user_id (int): ID пользователя.
+        month (str): Месяц в формате ГГГГ-ММ.
+        rows (list[list]): Новые записи блока.
+        compress (bool): Сжимать ли блок zlib.
+    """
+    existing = conn.execute(
+        "SELECT payload, compressed FROM archive_chunks"
+        " WHERE table_name = ? AND user_id = ? AND month = ?",
+        (table, user_id, month)).fetchone()
+    if existing is not None:
+        rows = _decode(*existing) + rows
+        rows.sort(key=lambda row: (row[1], row[0]))
+    conn.execute(
+        "INSERT OR REPLACE INTO archive_chunks"
+        " (table_name, user_id, month, row_count, payload, compressed)"
+        " VALUES (?, ?, ?, ?, ?, ?)",
+        (table, user_id, month, len(rows), _encode(rows, compress),
+         int(compress)))
+
+
+def archive_old_records(database_name: str, horizon_days: int,
+                        compress: bool = True) -> int:
+    """
+    Переносит записи старше горизонта в помесячные блоки архива.
+
+    Каждый блок (таблица, пользователь, месяц) переносится в отдельной
+    короткой транзакции BEGIN IMMEDIATE: записи читаются, сохраняются
+    в архив и удаляются по своим id внутри одной транзакции, поэтому
+    запись, добавленная во время архивации, не может быть удалена
+    без переноса, а обработчики бота не ждут архивацию целой таблицы.
+
+    Args:
+        database_name (str): Директория базы данных
+        horizon_days (int): Сколько последних дней оставлять в основных
+         таблицах.
+        compress (bool): Сжимать ли блоки zlib.
+
+    Returns:
+        int: Количество перенесенных записей.
+    """
+    cutoff = date_to_day(datetime.date.today()) - horizon_days
+    moved = 0
+    for path in all_shard_paths(database_name):
+        with connection(path) as conn:
+            for table in ARCHIVE_FIELDS:
+                chunks = conn.execute(
+                    "SELECT DISTINCT user_id, substr(date, 1, 7)"
+                    f" FROM {table} WHERE day < ?", (cutoff,)).fetchall()
+                for user_id, month in chunks:
+                    moved += _archive_chunk(conn, table, user_id, month,
+                                            cutoff, compress)
+    return moved
+
+
+def _archive_chunk(conn: sqlite3.Connection, table: str, user_id: int,
+                   month: str, cutoff: int, compress: bool) -> int:
+    """
+    Переносит записи пользователя за месяц старше дня отсечения.
+
+    Args:
+        conn (sqlite3.Connection): Подключение к базе данных.
+        table (str): Исходная таблица.
+        user_id (int): ID пользователя.
+        month (str): Месяц в формате ГГГГ-ММ.
+        cutoff (int): Номер первого дня, который остается в таблице.
+        compress (bool): Сжимать ли блоки zlib.
+
+    Returns:
+        int: Количество перенесенных записей.
+    """
+    fields = ARCHIVE_FIELDS[table]
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        rows = [list(row) for row in conn.execute(
+            f"SELECT {', '.join(fields)} FROM {table}"
+            " WHERE user_id = ? AND day < ? AND substr(date, 1, 7) = ?"
+            " ORDER BY day, id", (user_id, cutoff, month))]
+        if rows:
+            _store_chunk(conn, table, user_id, month, rows, compress)
+            conn.executemany(f"DELETE FROM {table} WHERE id = ?",
+                             [(row[0],) for row in rows])
+    except sqlite3.Error:
+        conn.rollback()
+        raise
+    conn.commit()
+    return len(rows)
+
+
+def reaches_archive(start_day: int) -> bool:
+    """
+    Проверяет, может ли окно с данным первым днем захватывать архив.
+
+    Записи переносятся в архив, только если они старше горизонта
+    ARCHIVE_HORIZON_DAYS, поэтому окно, начинающееся не раньше
+    горизонта, целиком лежит в основных таблицах.
+
+    Args:
+        start_day (int): Номер первого дня окна.
+
+    Returns:
+        bool: True, если нужно дочитывать архив.
+    """
+    from telegram_tracker_bot.config import ARCHIVE_HORIZON_DAYS
+
+    today = date_to_day(datetime.date.today())
+    return start_day < today - ARCHIVE_HORIZON_DAYS
+
+
+def read_archived_records(conn: sqlite3.Connection, table: str,
+                          user_id: int, start_date: str,
+                          end_date: str) -> Iterator[Record]:
+    """
+    Читает архивные записи пользователя за период.
+
+    Args:
+        conn (sqlite3.Connection): Подключение к базе данных.
+        table (str): Исходная таблица.
+        user_id (int): ID пользователя.
+        start_date (str): Первая дата периода (ГГГГ-ММ-ДД).
+        end_date (str): Последняя дата периода (ГГГГ-ММ-ДД).
+
+    Yields:
+        Record: Запись того же типа, что у выборки из исходной таблицы.
+    """
+    fields = ARCHIVE_FIELDS[table]
+    chunks = conn.execute(
+        "SELECT payload, compressed FROM archive_chunks"
+        " WHERE table_name = ? AND user_id = ? AND month >= ?"
+        " AND month <= ?",
+        (table, user_id, start_date[:7], end_date[:7])).fetchall()
+    for payload, compressed in chunks:
+        for row in _decode(payload, compressed):
+            if start_date <= row[1] <= end_date:
+                yield RECORD_TYPES[table](user_id=user_id,
+                                          day=date_to_day(row[1]),
+                                          **dict(zip(fields, row)))
+
+
+def iter_archived_records(conn: sqlite3.Connection, table: str,
+                          user_ids: Optional[tuple] = None)\
+        -> Iterator[tuple[int, dict]]:
+    """
+    Перебирает все архивные записи таблицы блок за блоком.
+
+    Args:
+        conn (sqlite3.Connection): Подключение к базе данных.
+        table (str): Исходная таблица.
+        user_ids (Optional[tuple]): Только эти пользователи.
+
+    Yields:
+        tuple[int, dict]: ID пользователя и запись.
+    """
+    fields = ARCHIVE_FIELDS[table]
+    query = ("SELECT user_id, payload, compressed FROM archive_chunks"
+             " WHERE table_name = ?")
+    params: tuple = (table,)
+    if user_ids is not None:
+        query += f" AND user_id IN ({', '.join('?' * len(user_ids))})"
+        params += tuple(user_ids)
+    for user_id, payload, compressed in conn.execute(
+            query + " ORDER BY user_id, month", params):
+        for row in _decode(payload, compressed):
+            yield user_id, dict(zip(fields, row))
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    """
+    Точка входа командной строки.
+
+    Args:
+        argv (Optional[list[str]]): Аргументы (по умолчанию sys.argv).
+
+    Returns:
+        int: Код завершения.
+    """
+    from telegram_tracker_bot.config import (DATABASE_NAME,
+                                             ARCHIVE_HORIZON_DAYS,
+                                             ARCHIVE_COMPRESS)
+
+    parser = argparse.ArgumentParser(
+        prog="python -m telegram_tracker_bot.db.archive",
+        description="Перенос старых записей в архив.")
+    parser.add_argument("--horizon", type=int, default=ARCHIVE_HORIZON_DAYS,
+                        help="Сколько последних дней оставлять")
+    parser.add_argument("--no-compress", action="store_true",
+                        help="Не сжимать блоки архива")
+    parser.add_argument("--database", default=DATABASE_NAME,
+                        help="Файл базы данных")
+    args = parser.parse_args(argv)
+    if args.horizon < ARCHIVE_HORIZON_DAYS:
+        parser.error("горизонт не может быть меньше ARCHIVE_HORIZON_DAYS"
+                     f" ({ARCHIVE_HORIZON_DAYS}): чтение последних дней"
+                     " не обращается к архиву")
+    moved = archive_old_records(args.database, args.horizon,
+                                ARCHIVE_COMPRESS and not args.no_compress)
+    print(f"Перенесено в архив записей: {moved}", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,88 @@
+"""
+Асинхронный интерфейс к базе данных.
+
+Функции модуля database синхронные: вызванные из обработчика
+напрямую, они блокируют цикл событий python-telegram-bot на время
+каждого запроса. Здесь они выполняются в отдельном пуле потоков,
+размер которого совпадает с размером пула подключений, а обработчик
+только ожидает результат. Асинхронная запись идет через хранилище
+(StorageBackend.async_add_*), а не через этот модуль.
+
+Содержит:
+- run_in_db_executor: выполнение произвольной функции, работающей
+  с базой (например, построения отчета), в пуле потоков базы
+- async_get_records_last_n_days: асинхронная версия функции
+  get_records_last_n_days модуля database
+- shutdown_db_executor: остановка пула потоков при остановке бота
+"""
+
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Optional, TypeVar
+from .connection import POOL_SIZE
+from .database import get_records_last_n_days
+from .records import Record
+
+T = TypeVar('T')
+
+_executor: Optional[ThreadPoolExecutor] = None
+
+
+def get_db_executor() -> ThreadPoolExecutor:
+    """
+    Возвращает пул потоков для запросов к базе данных.
+
+    Returns:
+        ThreadPoolExecutor: Пул, создаваемый при первом обращении.
+    """
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=POOL_SIZE,
+                                       thread_name_prefix="db")
+    return _executor
+
+
+async def run_in_db_executor(func: Callable[..., T],
+                             *args: Any, **kwargs: Any) -> T:
+    """
+    Выполняет синхронную функцию в пуле потоков базы данных.
+
+    Args:
+        func (Callable): Функция, обращающаяся к базе данных.
+        *args: Позиционные аргументы функции.
+        **kwargs: Именованные аргументы функции.
+
+    Returns:
+        T: Результат функции.
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(
+        get_db_executor(), functools.partial(func, *args, **kwargs))
+
+
+async def async_get_records_last_n_days(user_id: int, table_name: str,
+                                        n_days: int,
+                                        database_name: str) -> list[Record]:
+    """
+    Асинхронно получает записи пользователя за последние N дней.
+
+    Args:
+        database_name (str): Директория базы данных
+        user_id (int): ID пользователя.
+        table_name (str): Название таблицы базы данных.
+        n_days (int): Количество последних дней для выборки.
+
+    Returns:
+        list[Record]: Записи по убыванию даты.
+    """
+    return await run_in_db_executor(get_records_last_n_days, user_id,
+                                    table_name, n_days, database_name)
+
+
+def shutdown_db_executor() -> None:
+    """Дожидается текущих запросов и останавливает пул потоков."""
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=True)
+        _executor = None
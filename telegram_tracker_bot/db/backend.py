@@ -0,0 +1,532 @@
+"""
+Модуль хранилищ данных бота.
+
+Логика и обработчики работают не с путем к файлу базы, а с объектом
+хранилища (StorageBackend): запись, выборка записей за окно, дневные
+сводки и дневные столбцы. Реализации:
+- SQLiteBackend: база SQLite (модули database, columnar, write_queue)
+  с кэшем последних дней активных пользователей (модуль hot_cache)
+- MemoryBackend: хранение в памяти процесса (модуль memory), чтобы
+  в нагрузочных тестах отделять накладные расходы бота от дискового
+  ввода-вывода
+
+Хранилище выбирается переменной STORAGE_BACKEND в конфигурации
+("sqlite" или "memory"), общий экземпляр возвращает get_storage.
+
+Модули, кэширующие производные данные пользователя (например, отчеты
+/stats), подписываются на добавление записей функцией
+add_record_listener.
+"""
+
+from abc import ABC, abstractmethod
+from typing import Callable, Optional
+import numpy as np
+from .archive import archive_old_records
+from .async_api import run_in_db_executor
+from .columnar import get_daily_columns_last_n_days
+from .database import (initialize_db, add_sleep_record, add_calories_record,
+                       add_workout_record, get_records_last_n_days,
+                       get_all_records_last_n_days,
+                       get_daily_summary_last_n_days,
+                       get_window_totals_last_n_days, totals_from_summary,
+                       get_running_stats, get_quantile_sketches,
+                       get_active_user_ids, get_daily_summaries_for_users,
+                       get_running_stats_for_users, get_digest_progress,
+                       save_digest_progress)
+from .hot_cache import HotWindowCache
+from .records import Record
+from .running_stats import RunningStats
+from .quantiles import QuantileSketch
+from .write_queue import get_write_queue, close_write_queues
+
+
+_record_listeners: list[Callable[[int], None]] = []
+
+
+def add_record_listener(listener: Callable[[int], None]) -> None:
+    """
+    Подписывает функцию на добавление записей в любое хранилище.
+
+    Args:
+        listener (Callable[[int], None]): Вызывается с ID пользователя
+         после фиксации каждой его записи.
+    """
+    _record_listeners.append(listener)
+
+
+def notify_record_added(user_id: int) -> None:
+    """
+    Оповещает подписчиков о зафиксированной записи пользователя.
+
+    Args:
+        user_id (int): ID пользователя.
+    """
+    for listener in _record_listeners:
+        listener(user_id)
+
+
+class StorageBackend(ABC):
+    """
+    Интерфейс хранилища записей о сне, калориях и тренировках.
+
+    Форматы результатов совпадают с одноименными функциями модулей
+    database и columnar.
+    """
+
+    def initialize(self) -> None:
+        """Готовит хранилище к работе."""
+
+    @abstractmethod
+    def add_sleep_record(self, user_id: int, date: str,
+                         hours: float) -> None:
+        """
+        Добавляет запись о сне.
+
+        Args:
+            user_id (int): ID-пользователя
+            date (str): Дата
+            hours (float): Время
+        """
+
+    @abstractmethod
+    def add_calories_record(self, user_id: int, date: str,
+                            amount: int) -> None:
+        """
+        Добавляет запись о калориях.
+
+        Args:
+            user_id (int): ID-пользователя
+            date (str): Дата
+            amount (int): Количество калорий
+        """
+
+    @abstractmethod
+    def add_workout_record(self, user_id: int, date: str,
+                           duration_hours: float,
+                           activity_type: str) -> None:
+        """
+        Добавляет запись о тренировке.
+
+        Args:
+            user_id (int): ID пользователя.
+            date (str): Дата тренировки в формате ГГГГ-ММ-ДД.
+            duration_hours (float): Длительность тренировки в часах.
+            activity_type (str): Тип активности.
+        """
+
+    async def async_add_sleep_record(self, user_id: int, date: str,
+                                     hours: float) -> None:
+        """Асинхронная версия add_sleep_record."""
+        await run_in_db_executor(self.add_sleep_record, user_id, date, hours)
+
+    async def async_add_calories_record(self, user_id: int, date: str,
+                                        amount: int) -> None:
+        """Асинхронная версия add_calories_record."""
+        await run_in_db_executor(self.add_calories_record,
+                                 user_id, date, amount)
+
+    async def async_add_workout_record(self, user_id: int, date: str,
+                                       duration_hours: float,
+                                       activity_type: str) -> None:
+        """Асинхронная версия add_workout_record."""
+        await run_in_db_executor(self.add_workout_record, user_id, date,
+                                 duration_hours, activity_type)
+
+    @abstractmethod
+    def get_records_last_n_days(self, user_id: int, table_name: str,
+                                n_days: int) -> list[Record]:
+        """
+        Получает записи пользователя за последние N дней из таблицы.
+
+        Args:
+            user_id (int): ID пользователя.
+            table_name (str): sleep, calories или workouts.
+            n_days (int): Количество последних дней для выборки.
+
+        Returns:
+            list[Record]: Записи по убыванию даты.
+
+        Raises:
+            ValueError: Если передано некорректное имя таблицы.
+        """
+
+    @abstractmethod
+    def get_all_records_last_n_days(self, user_id: int,
+                                    n_days: int) -> dict[str, list[dict]]:
+        """
+        Получает записи всех трех таблиц за последние N дней.
+
+        Args:
+            user_id (int): ID пользователя.
+            n_days (int): Количество последних дней для выборки.
+
+        Returns:
+            dict[str, list[dict]]: Записи по ключам "sleep", "calories"
+             и "workouts".
+        """
+
+    @abstractmethod
+    def get_daily_summary_last_n_days(self, user_id: int,
+                                      n_days: int) -> list[dict]:
+        """
+        Получает дневные сводки пользователя за последние N дней.
+
+        Args:
+            user_id (int): ID пользователя.
+            n_days (int): Количество последних дней для выборки.
+
+        Returns:
+            list[dict]: Сводки по возрастанию даты.
+        """
+
+    @abstractmethod
+    def get_daily_columns_last_n_days(self, user_id: int, n_days: int)\
+            -> dict[str, np.ndarray]:
+        """
+        Получает дневные значения за последние N дней в виде массивов.
+
+        Args:
+            user_id (int): ID пользователя.
+            n_days (int): Количество последних дней для выборки.
+
+        Returns:
+            dict[str, np.ndarray]: Столбцы date, sleep, calories, workouts.
+        """
+
+    def get_window_totals_last_n_days(self, user_id: int,
+                                      n_days: int) -> dict:
+        """
+        Получает итоги пользователя за последние N дней.
+
+        По умолчанию суммирует дневные сводки; хранилища с собственным
+        механизмом агрегации переопределяют метод.
+
+        Args:
+            user_id (int): ID пользователя.
+            n_days (int): Количество последних дней.
+
+        Returns:
+            dict: Итоги в формате функции get_window_totals_last_n_days
+             модуля database.
+        """
+        return totals_from_summary(
+            self.get_daily_summary_last_n_days(user_id, n_days))
+
+    @abstractmethod
+    def get_running_stats(self, user_id: int) -> dict[str, RunningStats]:
+        """
+        Получает статистику записей пользователя за все время.
+
+        Args:
+            user_id (int): ID пользователя.
+
+        Returns:
+            dict[str, RunningStats]: Статистика по показателям sleep,
+             calories и workouts (только показатели с записями).
+        """
+
+    @abstractmethod
+    def get_quantile_sketches(self) -> dict[str, QuantileSketch]:
+        """
+        Получает квантильные скетчи показателей всех пользователей.
+
+        Returns:
+            dict[str, QuantileSketch]: Скетчи по показателям sleep,
+             calories и workouts (только показатели с записями).
+        """
+
+    @abstractmethod
+    def get_active_user_ids(self, n_days: int) -> list[int]:
+        """
+        Получает пользователей, у которых есть записи за последние N дней.
+
+        Args:
+            n_days (int): Количество последних дней.
+
+        Returns:
+            list[int]: ID пользователей по возрастанию.
+        """
+
+    def get_daily_summaries_for_users(self, user_ids: list[int],
+                                      n_days: int) -> dict[int, list[dict]]:
+        """
+        Получает дневные сводки группы пользователей за последние N дней.
+
+        По умолчанию читает сводки каждого пользователя отдельно;
+        хранилища с пакетной выборкой переопределяют метод.
+
+        Args:
+            user_ids (list[int]): ID пользователей.
+            n_days (int): Количество последних дней для выборки.
+
+        Returns:
+            dict[int, list[dict]]: Сводки каждого пользователя.
+        """
+        return {user_id: self.get_daily_summary_last_n_days(user_id, n_days)
+                for user_id in user_ids}
+
+    def get_running_stats_for_users(self, user_ids: list[int]) \
+            -> dict[int, dict[str, RunningStats]]:
+        """
+        Получает статистику за все время группы пользователей.
+
+        Args:
+            user_ids (list[int]): ID пользователей.
+
+        Returns:
+            dict[int, dict[str, RunningStats]]: Статистика каждого
+             пользователя.
+        """
+        return {user_id: self.get_running_stats(user_id)
+                for user_id in user_ids}
+
+    @abstractmethod
+    def get_digest_progress(self, week: int) \
+            -> Optional[tuple[int, int, bool]]:
+        """
+        Получает отметку прогресса рассылки недельной сводки.
+
+        Args:
+            week (int): Номер дня понедельника недели рассылки.
+
+        Returns:
+            Optional[tuple[int, int, bool]]: ID последнего пользователя,
+             число отправленных сводок и признак завершения; None, если
+             рассылка не начиналась.
+        """
+
+    @abstractmethod
+    def save_digest_progress(self, week: int, last_user_id: int, sent: int,
+                             finished: bool) -> None:
+        """
+        Сохраняет отметку прогресса рассылки недельной сводки.
+
+        Args:
+            week (int): Номер дня понедельника недели рассылки.
+            last_user_id (int): ID последнего пользователя, которому
+             отправлена сводка.
+            sent (int): Число отправленных сводок.
+            finished (bool): Завершена ли рассылка.
+        """
+
+    def archive_old_records(self, horizon_days: int,
+                            compress: bool = True) -> int:
+        """
+        Переносит записи старше горизонта в архив, если он поддерживается.
+
+        Args:
+            horizon_days (int): Сколько последних дней оставлять.
+            compress (bool): Сжимать ли архив.
+
+        Returns:
+            int: Количество перенесенных записей.
+        """
+        _ = horizon_days, compress
+        return 0
+
+    async def close(self) -> None:
+        """Дописывает отложенные записи (при остановке бота)."""
+
+
+class SQLiteBackend(StorageBackend):
+    """Хранилище в базе SQLite (с шардами, если они настроены)."""
+
+    def __init__(self, database_name: str) -> None:
+        """
+        Args:
+            database_name (str): Директория базы данных
+        """
+        self.database_name = database_name
+        self.cache = HotWindowCache(self._load_window)
+
+    def _load_window(self, user_id: int,
+                     n_days: int) -> dict[str, list[Record]]:
+        """
+        Читает из базы записи пользователя для кэша.
+
+        Args:
+            user_id (int): ID пользователя.
+            n_days (int): Количество последних дней.
+
+        Returns:
+            dict[str, list[Record]]: Записи по таблицам.
+        """
+        return {table: get_records_last_n_days(user_id, table, n_days,
+                                               self.database_name)
+                for table in ("sleep", "calories", "workouts")}
+
+    def initialize(self) -> None:
+        initialize_db(self.database_name)
+        self.cache.clear()
+
+    def _added(self, table: str, record: Record) -> None:
+        """
+        Обновляет кэш и оповещает подписчиков о сохраненной записи.
+
+        Args:
+            table (str): sleep, calories или workouts.
+            record (Record): Сохраненная запись.
+        """
+        self.cache.add(table, record)
+        notify_record_added(record.user_id)
+
+    def add_sleep_record(self, user_id: int, date: str,
+                         hours: float) -> None:
+        self._added("sleep", add_sleep_record(user_id, date, hours,
+                                              self.database_name))
+
+    def add_calories_record(self, user_id: int, date: str,
+                            amount: int) -> None:
+        self._added("calories", add_calories_record(
+            user_id, date, amount, self.database_name))
+
+    def add_workout_record(self, user_id: int, date: str,
+                           duration_hours: float,
+                           activity_type: str) -> None:
+        self._added("workouts", add_workout_record(
+            user_id, date, duration_hours, activity_type,
+            self.database_name))
+
+    async def async_add_sleep_record(self, user_id: int, date: str,
+                                     hours: float) -> None:
+        self._added("sleep", await get_write_queue(
+            self.database_name).add_sleep_record(user_id, date, hours))
+
+    async def async_add_calories_record(self, user_id: int, date: str,
+                                        amount: int) -> None:
+        self._added("calories", await get_write_queue(
+            self.database_name).add_calories_record(user_id, date, amount))
+
+    async def async_add_workout_record(self, user_id: int, date: str,
+                                       duration_hours: float,
+                                       activity_type: str) -> None:
+        self._added("workouts", await get_write_queue(
+            self.database_name).add_workout_record(
+                user_id, date, duration_hours, activity_type))
+
+    def get_records_last_n_days(self, user_id: int, table_name: str,
+                                n_days: int) -> list[Record]:
+        records = self.cache.get_records_last_n_days(user_id, table_name,
+                                                     n_days)
+        if records is None:
+            records = get_records_last_n_days(user_id, table_name, n_days,
+                                              self.database_name)
+        return records
+
+    def get_all_records_last_n_days(self, user_id: int,
+                                    n_days: int) -> dict[str, list[dict]]:
+        bundle = self.cache.get_all_records_last_n_days(user_id, n_days)
+        if bundle is None:
+            bundle = get_all_records_last_n_days(user_id, n_days,
+                                                 self.database_name)
+        return bundle
+
+    def get_daily_summary_last_n_days(self, user_id: int,
+                                      n_days: int) -> list[dict]:
+        days = self.cache.get_daily_summary_last_n_days(user_id, n_days)
+        if days is None:
+            days = get_daily_summary_last_n_days(user_id, n_days,
+                                                 self.database_name)
+        return days
+
+    def get_daily_columns_last_n_days(self, user_id: int, n_days: int)\
+            -> dict[str, np.ndarray]:
+        columns = self.cache.get_daily_columns_last_n_days(user_id, n_days)
+        if columns is None:
+            columns = get_daily_columns_last_n_days(user_id, n_days,
+                                                    self.database_name)
+        return columns
+
+    def get_window_totals_last_n_days(self, user_id: int,
+                                      n_days: int) -> dict:
+        if n_days <= self.cache.window_days:
+            return super().get_window_totals_last_n_days(user_id, n_days)
+        return get_window_totals_last_n_days(user_id, n_days,
+                                             self.database_name)
+
+    def get_running_stats(self, user_id: int) -> dict[str, RunningStats]:
+        return get_running_stats(user_id, self.database_name)
+
+    def get_quantile_sketches(self) -> dict[str, QuantileSketch]:
+        return get_quantile_sketches(self.database_name)
+
+    def get_active_user_ids(self, n_days: int) -> list[int]:
+        return get_active_user_ids(n_days, self.database_name)
+
+    def get_daily_summaries_for_users(self, user_ids: list[int],
+                                      n_days: int) -> dict[int, list[dict]]:
+        return get_daily_summaries_for_users(user_ids, n_days,
+                                             self.database_name)
+
+    def get_running_stats_for_users(self, user_ids: list[int]) \
+            -> dict[int, dict[str, RunningStats]]:
+        return get_running_stats_for_users(user_ids, self.database_name)
+
+    def get_digest_progress(self, week: int) \
+            -> Optional[tuple[int, int, bool]]:
+        return get_digest_progress(week, self.database_name)
+
+    def save_digest_progress(self, week: int, last_user_id: int, sent: int,
+                             finished: bool) -> None:
+        save_digest_progress(week, last_user_id, sent, finished,
+                             self.database_name)
+
+    def archive_old_records(self, horizon_days: int,
+                            compress: bool = True) -> int:
+        return archive_old_records(self.database_name, horizon_days,
+                                   compress)
+
+    async def close(self) -> None:
+        await close_write_queues()
+
+
+def create_storage(kind: str, database_name: str) -> StorageBackend:
+    """
+    Создает хранилище указанного вида.
+
+    Args:
+        kind (str): "sqlite" или "memory".
+        database_name (str): Директория базы данных (для SQLite).
+
+    Returns:
+        StorageBackend: Новое хранилище.
+
+    Raises:
+        ValueError: Если вид хранилища неизвестен.
+    """
+    if kind == "sqlite":
+        return SQLiteBackend(database_name)
+    if kind == "memory":
+        # memory импортирует этот модуль, поэтому импорт отложен
+        from .memory import MemoryBackend
+        return MemoryBackend()
+    raise ValueError(f"Неизвестное хранилище: {kind!r}")
+
+
+_storage: Optional[StorageBackend] = None
+
+
+def get_storage() -> StorageBackend:
+    """
+    Возвращает общее хранилище, выбранное в конфигурации.
+
+    Returns:
+        StorageBackend: Хранилище, создаваемое при первом обращении.
+    """
+    global _storage
+    if _storage is None:
+        from telegram_tracker_bot.config import STORAGE_BACKEND, DATABASE_NAME
+        _storage = create_storage(STORAGE_BACKEND, DATABASE_NAME)
+    return _storage
+
+
+def set_storage(storage: Optional[StorageBackend]) -> None:
+    """
+    Заменяет общее хранилище (для тестов и замеров производительности).
+
+    Args:
+        storage (Optional[StorageBackend]): Новое хранилище или None,
+         чтобы при следующем обращении создать его по конфигурации.
+    """
+    global _storage
+    _storage = storage
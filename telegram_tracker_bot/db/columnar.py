@@ -0,0 +1,93 @@
+"""
+Модуль выборки дневных данных в столбцовом виде (массивы NumPy).
+
+Вместо словаря на каждую строку возвращаются массивы, выровненные
+по плотной сетке дней окна: дни без записей присутствуют в сетке
+со значением NaN (для тренировок - 0). Это позволяет графикам
+и статистике работать векторно даже для длинных окон.
+"""
+
+import numpy as np
+from .connection import connection
+from .days import day_window
+from .sharding import shard_path
+
+
+def get_daily_columns_last_n_days(user_id: int, n_days: int,
+                                  database_name: str)\
+        -> dict[str, np.ndarray]:
+    """
+    Получает дневные значения за последние N дней в виде массивов.
+
+    Args:
+        database_name (str): Директория базы данных
+        user_id (int): ID пользователя.
+        n_days (int): Количество последних дней для выборки.
+
+    Returns:
+        dict[str, np.ndarray]: Ключ "date" - массив datetime64[D]
+         длиной n_days по возрастанию; ключи "sleep", "calories"
+         и "workouts" - массивы float64 той же длины
+         (NaN для дней без сна или калорий, 0 для дней без тренировок).
+    """
+    start_day, today = day_window(n_days)
+    query = (
+        "SELECT day,"
+        " CASE WHEN sleep_count > 0 THEN sleep_hours END,"
+        " CASE WHEN calories_count > 0 THEN calories END,"
+        " workout_hours"
+        " FROM daily_summary"
+        " WHERE user_id = ? AND day >= ? AND day <= ?")
+    with connection(shard_path(database_name, user_id)) as conn:
+        rows = conn.execute(query, (user_id, start_day, today)).fetchall()
+    return columns_from_summary(start_day, n_days, rows)
+
+
+def columns_from_summary(start_day: int, n_days: int,
+                         rows: list[tuple]) -> dict[str, np.ndarray]:
+    """
+    Раскладывает строки дневных сводок по сетке дней окна.
+
+    Номер дня (см. модуль days) совпадает со значением datetime64[D],
+    поэтому позиция в сетке - разность целых чисел.
+
+    Args:
+        start_day (int): Номер первого дня окна.
+        n_days (int): Количество дней в окне.
+        rows (list[tuple]): Строки (номер дня, сон, калории, тренировки)
+         для дней окна; None означает отсутствие записей.
+
+    Returns:
+        dict[str, np.ndarray]: Столбцы в формате
+         get_daily_columns_last_n_days.
+    """
+    dates = np.arange(start_day, start_day + n_days).astype('datetime64[D]')
+    columns = {"date": dates,
+               "sleep": np.full(n_days, np.nan),
+               "calories": np.full(n_days, np.nan),
+               "workouts": np.zeros(n_days)}
+    if rows:
+        row_days, sleep, calories, workouts = zip(*rows)
+        positions = np.array(row_days, dtype=np.int64) - start_day
+        columns["sleep"][positions] = np.array(sleep, dtype=np.float64)
+        columns["calories"][positions] = np.array(calories,
+                                                  dtype=np.float64)
+        columns["workouts"][positions] = np.array(workouts,
+                                                  dtype=np.float64)
+    return columns
+
+
+def has_data(columns: dict[str, np.ndarray]) -> bool:
+    """
+    Проверяет, есть ли в столбцах хотя бы одно значение.
+
+    Args:
+        columns (dict[str, np.ndarray]): Результат
+         get_daily_columns_last_n_days.
+
+    Returns:
+        bool: True, если за окно есть хоть одна запись.
+    """
+    return bool(np.isfinite(columns["sleep"]).any()
+                or np.isfinite(columns["calories"]).any()
+                or (columns["workouts"] > 0).any())
@@ -0,0 +1,173 @@
+"""
+Модуль управления подключениями к базе данных SQLite.
+
+Содержит:
+- ConnectionPool: ограниченный пул переиспользуемых подключений
+  к одному файлу базы данных
+- get_pool: получение (или создание) пула для указанного файла
+- connection: контекстный менеджер, выдающий подключение из пула
+  и фиксирующий транзакцию при выходе
+- close_all_pools: закрытие всех подключений при остановке бота
+
+Каждое подключение при создании переводится в режим журнала WAL,
+чтобы чтения не блокировались записью, и получает настроенные
+параметры synchronous и cache_size.
+"""
+
+import os
+import queue
+import sqlite3
+import threading
+from contextlib import contextmanager
+from typing import Iterator
+
+POOL_SIZE = 5
+ACQUIRE_TIMEOUT = 10.0
+BUSY_TIMEOUT = 5.0
+PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA cache_size=-16000",
+    "PRAGMA temp_store=MEMORY",
+)
+
+
+class ConnectionPool:
+    """
+    Ограниченный пул подключений к одному файлу базы данных.
+
+    Подключения создаются лениво, но не более size одновременно.
+    Освобожденные подключения возвращаются в пул и переиспользуются.
+    """
+
+    def __init__(self, database_dir: str, size: int = POOL_SIZE,
+                 timeout: float = ACQUIRE_TIMEOUT) -> None:
+        """
+        Args:
+            database_dir (str): Директория базы данных
+            size (int): Максимальное число подключений.
+            timeout (float): Время ожидания свободного подключения, сек.
+        """
+        self.database_dir = database_dir
+        self.size = size
+        self.timeout = timeout
+        self._idle: queue.LifoQueue = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(size)
+        self._closed = False
+
+    def _connect(self) -> sqlite3.Connection:
+        """
+        Открывает новое подключение и применяет PRAGMA-настройки.
+
+        Returns:
+            sqlite3.Connection: Новое подключение.
+        """
+        conn = sqlite3.connect(self.database_dir,
+                               timeout=BUSY_TIMEOUT,
+                               check_same_thread=False)
+        for pragma in PRAGMAS:
+            conn.execute(pragma)
+        return conn
+
+    def acquire(self) -> sqlite3.Connection:
+        """
+        Выдает подключение из пула, при необходимости создавая новое.
+
+        Returns:
+            sqlite3.Connection: Подключение к базе данных.
+
+        Raises:
+            sqlite3.OperationalError: Если пул закрыт или свободное
+             подключение не появилось за отведенное время.
+        """
+        if self._closed:
+            raise sqlite3.OperationalError("Пул подключений закрыт")
+        if not self._slots.acquire(timeout=self.timeout):
+            raise sqlite3.OperationalError("Нет свободных подключений")
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+        try:
+            return self._connect()
+        except sqlite3.Error:
+            self._slots.release()
+            raise
+
+    def release(self, conn: sqlite3.Connection) -> None:
+        """
+        Возвращает подключение в пул.
+
+        Args:
+            conn (sqlite3.Connection): Ранее выданное подключение.
+        """
+        if self._closed:
+            conn.close()
+        else:
+            self._idle.put(conn)
+        self._slots.release()
+
+    def close(self) -> None:
+        """Закрывает все свободные подключения пула."""
+        self._closed = True
+        while True:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            conn.close()
+
+
+_pools: dict[str, ConnectionPool] = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(database_dir: str) -> ConnectionPool:
+    """
+    Возвращает пул подключений для файла базы данных.
+
+    Args:
+        database_dir (str): Директория базы данных
+
+    Returns:
+        ConnectionPool: Пул, общий для всех вызовов с тем же файлом.
+    """
+    key = os.path.abspath(database_dir)
+    with _pools_lock:
+        pool = _pools.get(key)
+        if pool is None:
+            pool = ConnectionPool(database_dir)
+            _pools[key] = pool
+        return pool
+
+
+@contextmanager
+def connection(database_dir: str) -> Iterator[sqlite3.Connection]:
+    """
+    Выдает подключение из пула на время блока with.
+
+    При успешном выходе из блока транзакция фиксируется,
+    при исключении - откатывается.
+
+    Args:
+        database_dir (str): Директория базы данных
+
+    Yields:
+        sqlite3.Connection: Подключение к базе данных.
+    """
+    pool = get_pool(database_dir)
+    conn = pool.acquire()
+    try:
+        with conn:
+            yield conn
+    finally:
+        pool.release(conn)
+
+
+def close_all_pools() -> None:
+    """Закрывает все пулы подключений (вызывается при остановке бота)."""
+    with _pools_lock:
+        pools = list(_pools.values())
+        _pools.clear()
+    for pool in pools:
+        pool.close()
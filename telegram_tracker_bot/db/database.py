@@ -4,64 +4,181 @@
 
 Включает функции для:
 - Инициализации базы данных и создания необходимых таблиц
-  (сон, калории, тренировки)
+  (сон, калории, тренировки) через систему миграций
 - Добавления записей о сне, калориях и тренировках
 - Получения записей за последние N дней для указанного пользователя
+  (из одной таблицы или сразу из всех трех одним запросом)
+- Получения дневных сводок (см. модуль rollup) и итогов за период,
+  агрегируемых в SQLite
+- Получения статистики за все время (см. модуль running_stats)
+- Получения квантильных скетчей всех пользователей (см. модуль
+  quantiles)
+- Пакетной выборки сводок и статистики группы пользователей
+  и отметок прогресса рассылки недельной сводки
+
+Выборки за период сравнивают целые номера дней (столбец day,
+см. модуль days), строки дат нужны только для вывода.
+
+Записи старше горизонта архивации дочитываются из архива
+(см. модуль archive).
 
 Используется база данных с именем, заданным в конфигурации
-(переменная DATABASE_NAME).
+(переменная DATABASE_NAME). При DATABASE_SHARDS > 1 данные каждого
+пользователя хранятся в своем файле-шарде, который выбирается
+автоматически (см. модуль sharding). Подключения берутся из пула
+(см. модуль connection).
 """
 
 
 import sqlite3
-import datetime
-from typing import Union, Any
+from typing import Iterable, Optional
+from .connection import connection
+from .archive import reaches_archive, read_archived_records
+from .days import date_to_day, day_window, format_day
+from .records import (Record, SleepRecord, CaloriesRecord, WorkoutRecord,
+                      record_columns, record_factory)
+from .migrations import apply_migrations
+from .sharding import shard_path, all_shard_paths
+from .rollup import (add_sleep_to_summary, add_calories_to_summary,
+                     add_workout_to_summary)
+from .running_stats import RunningStats, add_to_running_stats
+from .quantiles import QuantileSketch, add_to_sketch, load_sketches
+
+# Дневные сводки и активности пользователей; {} - условие на user_id.
+_SUMMARY_QUERY = (
+    "SELECT s.user_id, s.day, s.sleep_hours, s.sleep_count, s.calories,"
+    " s.calories_count, s.workout_hours, s.workout_count,"
+    " a.activity_type, a.duration_hours"
+    " FROM daily_summary AS s"
+    " LEFT JOIN daily_activity_summary AS a"
+    " ON a.user_id = s.user_id AND a.day = s.day"
+    " WHERE {} AND s.day >= ? AND s.day <= ?"
+    " ORDER BY s.user_id, s.day")
 
 
 def initialize_db(database_dir: str) -> None:
     """
-    Инициализирует базу данных и создает таблицы, если их нет.
+    Инициализирует базу данных: создает таблицы, если их нет,
+    и применяет недостающие миграции схемы во всех шардах.
 
     Args:
         database_dir (str): Директория базы данных
     """
-    conn = sqlite3.connect(database_dir)
+    for path in all_shard_paths(database_dir):
+        with connection(path) as conn:
+            apply_migrations(conn)
+
+
+def _inserted(conn: sqlite3.Connection, table: str,
+              record_id: int) -> Record:
+    """
+    Читает только что вставленную запись (со значениями по умолчанию).
+
+    Args:
+        conn (sqlite3.Connection): Подключение к базе данных.
+        table (str): sleep, calories или workouts.
+        record_id (int): id вставленной строки.
+
+    Returns:
+        Record: Запись таблицы.
+    """
     cursor = conn.cursor()
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS sleep (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            user_id INTEGER NOT NULL,
-            date TEXT NOT NULL,
-            hours REAL NOT NULL,
-            timestamp DATETIME DEFAULT CURRENT_TIMESTAMP
-        )
-    ''')
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS calories (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            user_id INTEGER NOT NULL,
-            date TEXT NOT NULL,
-            amount INTEGER NOT NULL,
-            timestamp DATETIME DEFAULT CURRENT_TIMESTAMP
-        )
-    ''')
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS workouts (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            user_id INTEGER NOT NULL,
-            date TEXT NOT NULL,
-            duration_hours REAL NOT NULL,
-            activity_type TEXT NOT NULL,
-            timestamp DATETIME DEFAULT CURRENT_TIMESTAMP
-        )
-    ''')
-
-    conn.commit()
-    conn.close()
+    cursor.row_factory = record_factory(table)
+    return cursor.execute(
+        f"SELECT {record_columns(table)} FROM {table} WHERE id = ?",
+        (record_id,)).fetchone()
+
+
+def insert_sleep(conn: sqlite3.Connection, user_id: int,
+                 date: str, hours: float) -> SleepRecord:
+    """
+    Вставляет запись о сне и обновляет дневную сводку
+    в рамках уже открытой транзакции.
+
+    Args:
+        conn (sqlite3.Connection): Подключение к базе данных.
+        user_id (int): ID-пользователя
+        date (str): Дата
+        hours (float): Время
+
+    Returns:
+        SleepRecord: Вставленная запись.
+    """
+    day = date_to_day(date)
+    cursor = conn.execute(
+        "INSERT INTO sleep (user_id, date, day, hours) VALUES (?, ?, ?, ?)",
+        (user_id, date, day, hours))
+    add_sleep_to_summary(conn, user_id, day, hours)
+    add_to_running_stats(conn, user_id, "sleep", hours)
+    add_to_sketch(conn, "sleep", hours)
+    return _inserted(conn, "sleep", cursor.lastrowid)
+
+
+def insert_calories(conn: sqlite3.Connection, user_id: int,
+                    date: str, amount: int) -> CaloriesRecord:
+    """
+    Вставляет запись о калориях и обновляет дневную сводку
+    в рамках уже открытой транзакции.
+
+    Args:
+        conn (sqlite3.Connection): Подключение к базе данных.
+        user_id (int): ID-пользователя
+        date (str): Дата
+        amount (int): Количество калорий
+
+    Returns:
+        CaloriesRecord: Вставленная запись.
+    """
+    day = date_to_day(date)
+    cursor = conn.execute(
+        "INSERT INTO calories (user_id, date, day, amount)"
+        " VALUES (?, ?, ?, ?)",
+        (user_id,
+         date,
+         day,
+         amount))
+    add_calories_to_summary(conn, user_id, day, amount)
+    add_to_running_stats(conn, user_id, "calories", amount)
+    add_to_sketch(conn, "calories", amount)
+    return _inserted(conn, "calories", cursor.lastrowid)
+
+
+def insert_workout(conn: sqlite3.Connection, user_id: int, date: str,
+                   duration_hours: float,
+                   activity_type: str) -> WorkoutRecord:
+    """
+    Вставляет запись о тренировке и обновляет дневные сводки
+    в рамках уже открытой транзакции.
+
+    Args:
+        conn (sqlite3.Connection): Подключение к базе данных.
+        user_id (int): ID пользователя.
+        date (str): Дата тренировки в формате ГГГГ-ММ-ДД.
+        duration_hours (float): Длительность тренировки в часах.
+        activity_type (str): Тип активности.
+
+    Returns:
+        WorkoutRecord: Вставленная запись.
+    """
+    day = date_to_day(date)
+    cursor = conn.execute(
+        "INSERT INTO workouts"
+        " (user_id, date, day, duration_hours, activity_type)"
+        " VALUES (?, ?, ?, ?, ?)",
+        (user_id,
+         date,
+         day,
+         duration_hours,
+         activity_type))
+    add_workout_to_summary(conn, user_id, day, duration_hours,
+                           activity_type)
+    add_to_running_stats(conn, user_id, "workouts", duration_hours)
+    add_to_sketch(conn, "workouts", duration_hours)
+    return _inserted(conn, "workouts", cursor.lastrowid)
 
 
 def add_sleep_record(user_id: int, date: str,
-                     hours: float, database_dir: str) -> None:
+                     hours: float, database_dir: str) -> SleepRecord:
     """
     Добавляет запись о сне.
 
@@ -70,17 +187,16 @@ def add_sleep_record(user_id: int, date: str,
         user_id (int): ID-пользователя
         date (str): Дата
         hours (float): Время
+
+    Returns:
+        SleepRecord: Сохраненная запись.
     """
-    conn = sqlite3.connect(database_dir)
-    cursor = conn.cursor()
-    cursor.execute("INSERT INTO sleep (user_id, date, hours) VALUES (?, ?, ?)",
-                   (user_id, date, hours))
-    conn.commit()
-    conn.close()
+    with connection(shard_path(database_dir, user_id)) as conn:
+        return insert_sleep(conn, user_id, date, hours)
 
 
 def add_calories_record(user_id: int, date: str,
-                        amount: int, database_dir: str) -> None:
+                        amount: int, database_dir: str) -> CaloriesRecord:
     """
     Добавляет запись о калориях.
 
@@ -89,23 +205,19 @@ def add_calories_record(user_id: int, date: str,
         user_id (int): ID-пользователя
         date (str): Дата
         amount (int): Количество калорий
+
+    Returns:
+        CaloriesRecord: Сохраненная запись.
     """
-    conn = sqlite3.connect(database_dir)
-    cursor = conn.cursor()
-    cursor.execute(
-        "INSERT INTO calories (user_id, date, amount) VALUES (?, ?, ?)",
-        (user_id,
-         date,
-         amount))
-    conn.commit()
-    conn.close()
+    with connection(shard_path(database_dir, user_id)) as conn:
+        return insert_calories(conn, user_id, date, amount)
 
 
 def add_workout_record(
         user_id: int,
         date: str,
         duration_hours: float,
-        activity_type: str, database_name: str) -> None:
+        activity_type: str, database_name: str) -> WorkoutRecord:
     """
 Добавляет запись о тренировке.
 
@@ -116,24 +228,17 @@ Args:
     duration_hours (float): Длительность тренировки в часах.
     activity_type (str): Тип активности.
 
+Returns:
+    WorkoutRecord: Сохраненная запись.
 """
-    conn = sqlite3.connect(database_name)
-    cursor = conn.cursor()
-    cursor.execute(
-        "INSERT INTO workouts (user_id, date, duration_hours, activity_type)"
-        " VALUES (?, ?, ?, ?)",
-        (user_id,
-         date,
-         duration_hours,
-         activity_type))
-    conn.commit()
-    conn.close()
+    with connection(shard_path(database_name, user_id)) as conn:
+        return insert_workout(conn, user_id, date, duration_hours,
+                              activity_type)
 
 
 def get_records_last_n_days(user_id: int,
                             table_name: str, n_days: int, database_name: str)\
-        -> list[Union[dict[Any, Any], dict[str, Any],
-                dict[str, str], dict[bytes, bytes]]]:
+        -> list[Record]:
     """
         Получает записи пользователя за последние N дней из указанной таблицы.
 
@@ -144,27 +249,415 @@ def get_records_last_n_days(user_id: int,
             n_days (int): Количество последних дней для выборки.
 
         Returns:
-            list[Union[dict[Any, Any], dict[str, Any],
-             dict[str, str], dict[bytes, bytes]]]:
-                Список записей в виде словарей с
-                 разными типами ключей и значений.
+            list[Record]: Записи таблицы (SleepRecord, CaloriesRecord
+             или WorkoutRecord) по убыванию даты.
 
         Raises:
             ValueError: Если переданы некорректные параметры.
         """
-    conn = sqlite3.connect(database_name)
-    conn.row_factory = sqlite3.Row
-    cursor = conn.cursor()
-    today = datetime.date.today()
-    start_date = today - datetime.timedelta(days=n_days - 1)
-    start_date_str = start_date.strftime('%Y-%m-%d')
-    today_str = today.strftime('%Y-%m-%d')
+    start_day, today = day_window(n_days)
     if table_name not in ["sleep", "calories", "workouts"]:
         raise ValueError("Invalid table name")
-    query = (f"SELECT * FROM {table_name}"
-             " WHERE user_id = ? AND date >= ? "
-             "AND date <= ? ORDER BY date DESC")
-    cursor.execute(query, (user_id, start_date_str, today_str))
-    records = cursor.fetchall()
-    conn.close()
-    return [dict(row) for row in records]
+    query = (f"SELECT {record_columns(table_name)} FROM {table_name}"
+             " WHERE user_id = ? AND day >= ? "
+             "AND day <= ? ORDER BY day DESC")
+    with connection(shard_path(database_name, user_id)) as conn:
+        cursor = conn.cursor()
+        cursor.row_factory = record_factory(table_name)
+        cursor.execute(query, (user_id, start_day, today))
+        records = cursor.fetchall()
+        archived = []
+        if reaches_archive(start_day):
+            archived = list(read_archived_records(
+                conn, table_name, user_id, format_day(start_day),
+                format_day(today)))
+    if archived:
+        records.extend(archived)
+        records.sort(key=lambda record: record.day, reverse=True)
+    return records
+
+
+def get_all_records_last_n_days(user_id: int, n_days: int,
+                                database_name: str) -> dict[str, list[dict]]:
+    """
+    Получает записи сна, калорий и тренировок за последние N дней
+    одним запросом (UNION ALL с признаком таблицы).
+
+    Args:
+        database_name (str): Директория базы данных
+        user_id (int): ID пользователя.
+        n_days (int): Количество последних дней для выборки.
+
+    Returns:
+        dict[str, list[dict]]: Записи по ключам "sleep", "calories"
+         и "workouts" в том же виде, что у get_records_last_n_days,
+         отсортированные по убыванию даты.
+    """
+    start_day, today = day_window(n_days)
+    start_date_str, today_str = format_day(start_day), format_day(today)
+    query = (
+        "SELECT 'sleep' AS kind, date, hours AS value,"
+        " NULL AS activity_type FROM sleep"
+        " WHERE user_id = ? AND day >= ? AND day <= ?"
+        " UNION ALL "
+        "SELECT 'calories', date, amount, NULL FROM calories"
+        " WHERE user_id = ? AND day >= ? AND day <= ?"
+        " UNION ALL "
+        "SELECT 'workouts', date, duration_hours, activity_type"
+        " FROM workouts"
+        " WHERE user_id = ? AND day >= ? AND day <= ?"
+        " ORDER BY date DESC")
+    params = (user_id, start_day, today) * 3
+    with connection(shard_path(database_name, user_id)) as conn:
+        rows = conn.execute(query, params).fetchall()
+        if reaches_archive(start_day):
+            for table, value_field in (("sleep", "hours"),
+                                       ("calories", "amount"),
+                                       ("workouts", "duration_hours")):
+                rows.extend(
+                    (table, record.date, getattr(record, value_field),
+                     getattr(record, "activity_type", None))
+                    for record in read_archived_records(
+                        conn, table, user_id, start_date_str, today_str))
+            rows.sort(key=lambda row: row[1], reverse=True)
+
+    bundle: dict[str, list[dict]] = {"sleep": [], "calories": [],
+                                     "workouts": []}
+    for kind, date, value, activity_type in rows:
+        if kind == "sleep":
+            bundle["sleep"].append({"date": date, "hours": value})
+        elif kind == "calories":
+            bundle["calories"].append({"date": date, "amount": value})
+        else:
+            bundle["workouts"].append({"date": date,
+                                       "duration_hours": value,
+                                       "activity_type": activity_type})
+    return bundle
+
+
+def get_daily_summary_last_n_days(user_id: int, n_days: int,
+                                  database_name: str) -> list[dict]:
+    """
+    Получает дневные сводки пользователя за последние N дней.
+
+    Читается не больше одной строки сводки на день (и по строке
+    на каждый тип активности за день) независимо от числа записей.
+
+    Args:
+        database_name (str): Директория базы данных
+        user_id (int): ID пользователя.
+        n_days (int): Количество последних дней для выборки.
+
+    Returns:
+        list[dict]: Сводки по возрастанию даты. Каждая содержит ключи
+         day (номер дня, см. модуль days), sleep_hours, sleep_count,
+         calories, calories_count,
+         workout_hours, workout_count и activities - словарь
+         {тип активности: часы}. Дни без записей не возвращаются.
+    """
+    start_day, today = day_window(n_days)
+    query = _SUMMARY_QUERY.format("s.user_id = ?")
+    with connection(shard_path(database_name, user_id)) as conn:
+        rows = conn.execute(query, (user_id, start_day, today)).fetchall()
+
+    days: list[dict] = []
+    for row in rows:
+        _add_summary_row(days, row[1:])
+    return days
+
+
+def _add_summary_row(days: list[dict], row: tuple) -> None:
+    """
+    Добавляет строку выборки _SUMMARY_QUERY (без user_id) к сводкам.
+
+    Args:
+        days (list[dict]): Сводки пользователя по возрастанию дня.
+        row (tuple): Строка сводки дня и одной активности.
+    """
+    (day, sleep_hours, sleep_count, calories, calories_count,
+     workout_hours, workout_count, activity_type, duration) = row
+    if not days or days[-1]["day"] != day:
+        days.append({"day": day,
+                     "sleep_hours": sleep_hours,
+                     "sleep_count": sleep_count,
+                     "calories": calories,
+                     "calories_count": calories_count,
+                     "workout_hours": workout_hours,
+                     "workout_count": workout_count,
+                     "activities": {}})
+    if activity_type is not None:
+        days[-1]["activities"][activity_type] = duration
+
+
+def _by_shard(database_name: str,
+              user_ids: Iterable[int]) -> dict[str, list[int]]:
+    """
+    Группирует пользователей по файлам-шардам.
+
+    Args:
+        database_name (str): Директория базы данных
+        user_ids (Iterable[int]): ID пользователей.
+
+    Returns:
+        dict[str, list[int]]: ID пользователей по путям шардов.
+    """
+    shards: dict[str, list[int]] = {}
+    for user_id in user_ids:
+        shards.setdefault(shard_path(database_name, user_id),
+                          []).append(user_id)
+    return shards
+
+
+def get_active_user_ids(n_days: int, database_name: str) -> list[int]:
+    """
+    Получает пользователей, у которых есть записи за последние N дней.
+
+    Args:
+        database_name (str): Директория базы данных
+        n_days (int): Количество последних дней.
+
+    Returns:
+        list[int]: ID пользователей по возрастанию.
+    """
+    start_day, today = day_window(n_days)
+    user_ids: list[int] = []
+    for path in all_shard_paths(database_name):
+        with connection(path) as conn:
+            user_ids += [user_id for (user_id,) in conn.execute(
+                "SELECT DISTINCT user_id FROM daily_summary"
+                " WHERE day >= ? AND day <= ?", (start_day, today))]
+    return sorted(user_ids)
+
+
+def get_daily_summaries_for_users(user_ids: list[int], n_days: int,
+                                  database_name: str) \
+        -> dict[int, list[dict]]:
+    """
+    Получает дневные сводки группы пользователей за последние N дней
+    одним запросом на шард.
+
+    Args:
+        database_name (str): Директория базы данных
+        user_ids (list[int]): ID пользователей (не больше нескольких
+         сотен - они передаются параметрами запроса).
+        n_days (int): Количество последних дней для выборки.
+
+    Returns:
+        dict[int, list[dict]]: Сводки в формате
+         get_daily_summary_last_n_days для каждого пользователя
+         (пустой список, если записей нет).
+    """
+    start_day, today = day_window(n_days)
+    summaries: dict[int, list[dict]] = {user_id: [] for user_id in user_ids}
+    for path, shard_users in _by_shard(database_name, user_ids).items():
+        query = _SUMMARY_QUERY.format(
+            f"s.user_id IN ({', '.join('?' * len(shard_users))})")
+        with connection(path) as conn:
+            rows = conn.execute(query, (*shard_users, start_day,
+                                        today)).fetchall()
+        for row in rows:
+            _add_summary_row(summaries[row[0]], row[1:])
+    return summaries
+
+
+def totals_from_summary(days: list[dict]) -> dict:
+    """
+    Суммирует дневные сводки за период.
+
+    Args:
+        days (list[dict]): Сводки в формате get_daily_summary_last_n_days.
+
+    Returns:
+        dict: Итоги в формате get_window_totals_last_n_days.
+    """
+    totals = {"sleep_days": 0, "sleep_count": 0, "sleep_hours": 0.0,
+              "calories_days": 0, "calories_count": 0, "calories": 0,
+              "workout_days": 0, "workout_count": 0, "workout_hours": 0.0,
+              "activities": {}}
+    activities: dict[str, float] = {}
+    for day in days:
+        if day["sleep_count"]:
+            totals["sleep_days"] += 1
+            totals["sleep_count"] += day["sleep_count"]
+            totals["sleep_hours"] += day["sleep_hours"]
+        if day["calories_count"]:
+            totals["calories_days"] += 1
+            totals["calories_count"] += day["calories_count"]
+            totals["calories"] += day["calories"]
+        if day["workout_count"]:
+            totals["workout_days"] += 1
+            totals["workout_count"] += day["workout_count"]
+            totals["workout_hours"] += day["workout_hours"]
+        for activity, duration in day["activities"].items():
+            activities[activity] = activities.get(activity, 0.0) + duration
+    totals["activities"] = dict(sorted(activities.items(),
+                                       key=lambda item: item[1],
+                                       reverse=True))
+    return totals
+
+
+def get_window_totals_last_n_days(user_id: int, n_days: int,
+                                  database_name: str) -> dict:
+    """
+    Получает итоги пользователя за последние N дней одним
+    агрегирующим запросом к дневным сводкам (GROUP BY в SQLite).
+
+    Args:
+        database_name (str): Директория базы данных
+        user_id (int): ID пользователя.
+        n_days (int): Количество последних дней.
+
+    Returns:
+        dict: sleep_days и calories_days - число дней с записями сна
+         и калорий, sleep_hours и calories - их суммы, workout_days
+         и workout_hours - число дней с тренировками и их часы,
+         sleep_count, calories_count и workout_count - число записей,
+         activities - словарь {тип активности: часы} по убыванию часов.
+    """
+    start_day, today = day_window(n_days)
+    query = (
+        "SELECT NULL, COUNT(sleep_hours), TOTAL(sleep_count),"
+        " TOTAL(sleep_hours), COUNT(calories), TOTAL(calories_count),"
+        " TOTAL(calories), COUNT(CASE WHEN workout_count > 0 THEN 1 END),"
+        " TOTAL(workout_count), TOTAL(workout_hours)"
+        " FROM daily_summary"
+        " WHERE user_id = ? AND day >= ? AND day <= ?"
+        " UNION ALL "
+        "SELECT activity_type, NULL, NULL, NULL, NULL, NULL, NULL, NULL,"
+        " NULL, TOTAL(duration_hours)"
+        " FROM daily_activity_summary"
+        " WHERE user_id = ? AND day >= ? AND day <= ?"
+        " GROUP BY activity_type")
+    params = (user_id, start_day, today) * 2
+    with connection(shard_path(database_name, user_id)) as conn:
+        rows = conn.execute(query, params).fetchall()
+
+    (_, sleep_days, sleep_count, sleep_hours, calories_days,
+     calories_count, calories, workout_days, workout_count,
+     workout_hours) = rows[0]
+    activities = sorted(((activity, duration)
+                         for activity, *_, duration in rows[1:]),
+                        key=lambda item: item[1], reverse=True)
+    return {"sleep_days": sleep_days, "sleep_count": int(sleep_count),
+            "sleep_hours": sleep_hours,
+            "calories_days": calories_days,
+            "calories_count": int(calories_count),
+            "calories": int(calories),
+            "workout_days": workout_days,
+            "workout_count": int(workout_count),
+            "workout_hours": workout_hours,
+            "activities": dict(activities)}
+
+
+def get_running_stats(user_id: int,
+                      database_name: str) -> dict[str, RunningStats]:
+    """
+    Получает статистику пользователя за все время одной выборкой
+    по первичному ключу.
+
+    Args:
+        database_name (str): Директория базы данных
+        user_id (int): ID пользователя.
+
+    Returns:
+        dict[str, RunningStats]: Статистика записей по показателям
+         sleep, calories и workouts (только показатели с записями).
+    """
+    with connection(shard_path(database_name, user_id)) as conn:
+        rows = conn.execute(
+            "SELECT metric, count, mean, m2, min, max FROM running_stats"
+            " WHERE user_id = ?", (user_id,)).fetchall()
+    return {metric: RunningStats(*values) for metric, *values in rows}
+
+
+def get_running_stats_for_users(user_ids: list[int], database_name: str) \
+        -> dict[int, dict[str, RunningStats]]:
+    """
+    Получает статистику за все время группы пользователей одним
+    запросом на шард.
+
+    Args:
+        database_name (str): Директория базы данных
+        user_ids (list[int]): ID пользователей.
+
+    Returns:
+        dict[int, dict[str, RunningStats]]: Статистика в формате
+         get_running_stats для каждого пользователя.
+    """
+    stats: dict[int, dict[str, RunningStats]] = {
+        user_id: {} for user_id in user_ids}
+    for path, shard_users in _by_shard(database_name, user_ids).items():
+        with connection(path) as conn:
+            rows = conn.execute(
+                "SELECT user_id, metric, count, mean, m2, min, max"
+                " FROM running_stats WHERE user_id IN"
+                f" ({', '.join('?' * len(shard_users))})",
+                shard_users).fetchall()
+        for user_id, metric, *values in rows:
+            stats[user_id][metric] = RunningStats(*values)
+    return stats
+
+
+def get_quantile_sketches(database_name: str) -> dict[str, QuantileSketch]:
+    """
+    Получает квантильные скетчи показателей всех пользователей,
+    объединяя скетчи всех шардов.
+
+    Args:
+        database_name (str): Директория базы данных
+
+    Returns:
+        dict[str, QuantileSketch]: Скетчи по показателям sleep,
+         calories и workouts (только показатели с записями).
+    """
+    sketches: dict[str, QuantileSketch] = {}
+    for path in all_shard_paths(database_name):
+        with connection(path) as conn:
+            for metric, sketch in load_sketches(conn).items():
+                sketches.setdefault(metric, QuantileSketch()).merge(sketch)
+    return sketches
+
+
+def get_digest_progress(week: int, database_name: str) \
+        -> Optional[tuple[int, int, bool]]:
+    """
+    Получает отметку прогресса рассылки недельной сводки.
+
+    Отметки хранятся в первом шарде базы.
+
+    Args:
+        database_name (str): Директория базы данных
+        week (int): Номер дня понедельника недели рассылки.
+
+    Returns:
+        Optional[tuple[int, int, bool]]: ID последнего пользователя,
+         которому отправлена сводка, число отправленных сводок и признак
+         завершения рассылки; None, если рассылка не начиналась.
+    """
+    with connection(all_shard_paths(database_name)[0]) as conn:
+        row = conn.execute(
+            "SELECT last_user_id, sent, finished FROM digest_progress"
+            " WHERE week = ?", (week,)).fetchone()
+    if row is None:
+        return None
+    return row[0], row[1], bool(row[2])
+
+
+def save_digest_progress(week: int, last_user_id: int, sent: int,
+                         finished: bool, database_name: str) -> None:
+    """
+    Сохраняет отметку прогресса рассылки недельной сводки.
+
+    Args:
+        database_name (str): Директория базы данных
+        week (int): Номер дня понедельника недели рассылки.
+        last_user_id (int): ID последнего пользователя, которому
+         отправлена сводка.
+        sent (int): Число отправленных сводок.
+        finished (bool): Завершена ли рассылка.
+    """
+    with connection(all_shard_paths(database_name)[0]) as conn:
+        conn.execute(
+            "INSERT OR REPLACE INTO digest_progress"
+            " (week, last_user_id, sent, finished) VALUES (?, ?, ?, ?)",
+            (week, last_user_id, sent, int(finished)))
@@ -0,0 +1,76 @@
+"""
+Модуль номеров дней.
+
+Дата хранится в таблицах не только строкой ГГГГ-ММ-ДД, но и целым
+номером дня от 1970-01-01 (столбец day). Выборки за период сравнивают
+целые числа по индексам (user_id, day), а в строку дата превращается
+только при выводе пользователю. Номер дня совпадает с внутренним
+представлением numpy.datetime64[D].
+"""
+
+import datetime
+from typing import Union
+
+EPOCH = datetime.date(1970, 1, 1)
+EPOCH_ORDINAL = EPOCH.toordinal()
+SQL_DAY = "CAST(julianday({}) - 2440587.5 AS INTEGER)"
+
+
+def date_to_day(date: Union[str, datetime.date]) -> int:
+    """
+    Переводит дату в номер дня.
+
+    Args:
+        date (Union[str, datetime.date]): Дата или строка ГГГГ-ММ-ДД.
+
+    Returns:
+        int: Количество дней от 1970-01-01.
+
+    Raises:
+        TypeError: Если дата не строка и не datetime.date.
+        ValueError: Если строка не в формате ГГГГ-ММ-ДД.
+    """
+    if not isinstance(date, datetime.date):
+        date = datetime.date.fromisoformat(date)
+    return date.toordinal() - EPOCH_ORDINAL
+
+
+def day_to_date(day: int) -> datetime.date:
+    """
+    Переводит номер дня в дату.
+
+    Args:
+        day (int): Количество дней от 1970-01-01.
+
+    Returns:
+        datetime.date: Дата.
+    """
+    return datetime.date.fromordinal(day + EPOCH_ORDINAL)
+
+
+def format_day(day: int) -> str:
+    """
+    Форматирует номер дня строкой ГГГГ-ММ-ДД.
+
+    Args:
+        day (int): Количество дней от 1970-01-01.
+
+    Returns:
+        str: Дата в формате ГГГГ-ММ-ДД.
+    """
+    return day_to_date(day).isoformat()
+
+
+def day_window(n_days: int) -> tuple[int, int]:
+    """
+    Возвращает номера первого и последнего дней окна из N последних
+    дней, включая сегодня.
+
+    Args:
+        n_days (int): Количество последних дней.
+
+    Returns:
+        tuple[int, int]: Номера первого дня и сегодняшнего дня.
+    """
+    today = date_to_day(datetime.date.today())
+    return today - n_days + 1, today
@@ -0,0 +1,275 @@
+"""
+Модуль кэша последних дней пользователей (горячее окно).
+
+/stats, /plot и /advice читают одни и те же последние дни одного
+пользователя, часто с разницей в несколько секунд. Кэш хранит в памяти
+записи каждого активного пользователя за последние HOT_WINDOW_DAYS дней
+и отвечает из них на выборки записей, дневных сводок и дневных
+столбцов, не обращаясь к SQLite.
+
+Кэш заполняется при первом чтении пользователя и обновляется сквозной
+записью (write-through): хранилище передает в него каждую
+зафиксированную запись. Пользователи вытесняются по принципу LRU при
+превышении MAX_USERS и после IDLE_SECONDS без обращений.
+
+Кэш видит только записи, сделанные через хранилище этого процесса;
+после загрузки данных в базу командой transfer бота нужно перезапустить.
+"""
+
+import threading
+import time
+from bisect import bisect_left, bisect_right
+from collections import OrderedDict
+from typing import Callable, Optional
+import numpy as np
+from .columnar import columns_from_summary
+from .days import day_window
+from .records import Record
+
+HOT_WINDOW_DAYS = 35
+MAX_USERS = 1024
+IDLE_SECONDS = 1800.0
+
+_TABLES = ("sleep", "calories", "workouts")
+_BUNDLE_FIELDS = {"sleep": ("date", "hours"),
+                  "calories": ("date", "amount"),
+                  "workouts": ("date", "duration_hours", "activity_type")}
+
+# Загружает записи пользователя за N последних дней: {таблица: записи}
+_Loader = Callable[[int, int], dict[str, list[Record]]]
+
+
+class _Window:
+    """Записи одного пользователя начиная с дня start_day."""
+
+    __slots__ = ("start_day", "days", "records", "ids", "used")
+
+    def __init__(self, start_day: int,
+                 records: dict[str, list[Record]]) -> None:
+        self.start_day = start_day
+        self.records = {table: sorted(records[table],
+                                      key=lambda record: record.day)
+                        for table in _TABLES}
+        self.days = {table: [record.day for record in self.records[table]]
+                     for table in _TABLES}
+        self.ids = {table: {record.id for record in self.records[table]}
+                    for table in _TABLES}
+        self.used = time.monotonic()
+
+    def add(self, table: str, record: Record) -> None:
+        """
+        Вставляет запись после всех записей того же дня.
+
+        Запись, уже прочитанная загрузкой окна (загрузка могла пройти
+        между фиксацией записи и ее передачей в кэш), пропускается.
+        """
+        if record.id in self.ids[table]:
+            return
+        self.ids[table].add(record.id)
+        position = bisect_right(self.days[table], record.day)
+        self.days[table].insert(position, record.day)
+        self.records[table].insert(position, record)
+
+    def since(self, table: str, start_day: int) -> list[Record]:
+        """Возвращает записи таблицы с дня start_day по возрастанию дня."""
+        return self.records[table][bisect_left(self.days[table], start_day):]
+
+    def newest_first(self, table: str, start_day: int) -> list[Record]:
+        """Возвращает записи таблицы с дня start_day по убыванию дня."""
+        return sorted(self.since(table, start_day),
+                      key=lambda record: record.day, reverse=True)
+
+
+class HotWindowCache:
+    """
+    LRU-кэш записей пользователей за последние дни.
+
+    Методы чтения возвращают данные в форматах одноименных функций
+    модулей database и columnar или None, если окно длиннее кэша.
+    """
+
+    def __init__(self, loader: _Loader,
+                 window_days: int = HOT_WINDOW_DAYS,
+                 max_users: int = MAX_USERS,
+                 idle_seconds: float = IDLE_SECONDS) -> None:
+        """
+        Args:
+            loader (Callable): Функция (user_id, n_days) -> записи
+             пользователя по таблицам, читающая базу данных.
+            window_days (int): Сколько последних дней хранить.
+            max_users (int): Максимальное число пользователей в кэше.
+            idle_seconds (float): Время без обращений до вытеснения, сек.
+        """
+        self.window_days = window_days
+        self.max_users = max_users
+        self.idle_seconds = idle_seconds
+        self._loader = loader
+        self._lock = threading.Lock()
+        self._windows: OrderedDict[int, _Window] = OrderedDict()
+        # Пользователи, которые сейчас загружаются: [число загрузок,
+        # была ли запись во время загрузки]
+        self._loading: dict[int, list] = {}
+
+    def add(self, table: str, record: Record) -> None:
+        """
+        Добавляет зафиксированную запись в окно пользователя.
+
+        Args:
+            table (str): sleep, calories или workouts.
+            record (Record): Сохраненная запись.
+        """
+        with self._lock:
+            loading = self._loading.get(record.user_id)
+            if loading is not None:
+                loading[1] = True
+            window = self._windows.get(record.user_id)
+            if window is not None and record.day >= window.start_day:
+                window.add(table, record)
+
+    def clear(self) -> None:
+        """Удаляет из кэша всех пользователей."""
+        with self._lock:
+            self._windows.clear()
+
+    def __len__(self) -> int:
+        return len(self._windows)
+
+    def _evict(self, now: float) -> None:
+        """Вытесняет лишних и давно не использованных пользователей."""
+        while self._windows:
+            window = next(iter(self._windows.values()))
+            if (len(self._windows) <= self.max_users
+                    and now - window.used <= self.idle_seconds):
+                break
+            self._windows.popitem(last=False)
+
+    def _window(self, user_id: int, start_day: int) -> _Window:
+        """
+        Возвращает окно пользователя, загружая его при промахе.
+
+        Args:
+            user_id (int): ID пользователя.
+            start_day (int): Первый нужный день.
+
+        Returns:
+            _Window: Окно, начинающееся не позже start_day.
+        """
+        now = time.monotonic()
+        with self._lock:
+            self._evict(now)
+            window = self._windows.get(user_id)
+            if window is not None and window.start_day <= start_day:
+                window.used = now
+                self._windows.move_to_end(user_id)
+                return window
+            loading = self._loading.setdefault(user_id, [0, False])
+            loading[0] += 1
+
+        window_start, _ = day_window(self.window_days)
+        try:
+            window = _Window(window_start,
+                             self._loader(user_id, self.window_days))
+        finally:
+            with self._lock:
+                loading[0] -= 1
+                if loading[0] == 0:
+                    del self._loading[user_id]
+        with self._lock:
+            # Запись, зафиксированная во время загрузки, могла не попасть
+            # в прочитанные данные: такое окно не сохраняется.
+            if not loading[1]:
+                self._windows[user_id] = window
+                self._windows.move_to_end(user_id)
+                self._evict(now)
+        return window
+
+    def get_records_last_n_days(self, user_id: int, table_name: str,
+                                n_days: int) -> Optional[list[Record]]:
+        """Записи таблицы за N дней по убыванию даты или None."""
+        if table_name not in _TABLES:
+            raise ValueError("Invalid table name")
+        if n_days > self.window_days:
+            return None
+        start_day, _ = day_window(n_days)
+        window = self._window(user_id, start_day)
+        with self._lock:
+            return window.newest_first(table_name, start_day)
+
+    def get_all_records_last_n_days(self, user_id: int, n_days: int)\
+            -> Optional[dict[str, list[dict]]]:
+        """Записи всех таблиц за N дней (как в database) или None."""
+        if n_days > self.window_days:
+            return None
+        start_day, _ = day_window(n_days)
+        window = self._window(user_id, start_day)
+        with self._lock:
+            return {table: [{field: getattr(record, field)
+                             for field in _BUNDLE_FIELDS[table]}
+                            for record in window.newest_first(table,
+                                                              start_day)]
+                    for table in _TABLES}
+
+    def get_daily_summary_last_n_days(self, user_id: int, n_days: int)\
+            -> Optional[list[dict]]:
+        """Дневные сводки за N дней (как в database) или None."""
+        if n_days > self.window_days:
+            return None
+        start_day, _ = day_window(n_days)
+        window = self._window(user_id, start_day)
+        with self._lock:
+            return _summarize(window, start_day)
+
+    def get_daily_columns_last_n_days(self, user_id: int, n_days: int)\
+            -> Optional[dict[str, np.ndarray]]:
+        """Дневные столбцы за N дней (как в columnar) или None."""
+        if n_days > self.window_days:
+            return None
+        start_day, _ = day_window(n_days)
+        window = self._window(user_id, start_day)
+        with self._lock:
+            days = _summarize(window, start_day)
+        rows = [(day["day"],
+                 day["sleep_hours"] if day["sleep_count"] else None,
+                 day["calories"] if day["calories_count"] else None,
+                 day["workout_hours"])
+                for day in days]
+        return columns_from_summary(start_day, n_days, rows)
+
+
+def _summarize(window: _Window, start_day: int) -> list[dict]:
+    """
+    Собирает дневные сводки окна с дня start_day.
+
+    Args:
+        window (_Window): Окно пользователя.
+        start_day (int): Первый день.
+
+    Returns:
+        list[dict]: Сводки по возрастанию дня в формате
+         get_daily_summary_last_n_days.
+    """
+    days: dict[int, dict] = {}
+
+    def summary(day: int) -> dict:
+        return days.setdefault(day, {
+            "day": day, "sleep_hours": None, "sleep_count": 0,
+            "calories": None, "calories_count": 0,
+            "workout_hours": 0.0, "workout_count": 0, "activities": {}})
+
+    for record in window.since("sleep", start_day):
+        day = summary(record.day)
+        day["sleep_hours"] = (day["sleep_hours"] or 0) + record.hours
+        day["sleep_count"] += 1
+    for record in window.since("calories", start_day):
+        day = summary(record.day)
+        day["calories"] = (day["calories"] or 0) + record.amount
+        day["calories_count"] += 1
+    for record in window.since("workouts", start_day):
+        day = summary(record.day)
+        day["workout_hours"] += record.duration_hours
+        day["workout_count"] += 1
+        activities = day["activities"]
+        activities[record.activity_type] = (
+            activities.get(record.activity_type, 0.0)
+            + record.duration_hours)
+    return [days[day] for day in sorted(days)]
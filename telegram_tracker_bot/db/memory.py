@@ -0,0 +1,252 @@
+"""
+Модуль хранилища в памяти процесса.
+
+Записи каждого пользователя хранятся в массивах, отсортированных
+по номеру дня (см. модуль days), отдельно для сна, калорий
+и тренировок; дневные сводки - в таком же массиве дней. Выборка
+окна - два двоичных поиска (bisect) и срез, поэтому время ответа
+не зависит от объема истории.
+
+Данные не сохраняются между запусками; хранилище предназначено для
+нагрузочных тестов и замеров производительности бота без диска.
+"""
+
+import datetime
+import threading
+from bisect import bisect_left, bisect_right
+from typing import Optional
+import numpy as np
+from .backend import StorageBackend, notify_record_added
+from .columnar import columns_from_summary
+from .days import date_to_day, day_window
+from .records import RECORD_TYPES, Record
+from .running_stats import RunningStats, merge_stats
+from .quantiles import QuantileSketch
+
+_TABLES = ("sleep", "calories", "workouts")
+_VALUE_FIELDS = {"sleep": "hours", "calories": "amount",
+                 "workouts": "duration_hours"}
+
+
+def _newest_first(records: list[Record]) -> list[Record]:
+    """
+    Упорядочивает записи по убыванию дня, сохраняя порядок
+    добавления внутри дня (как ORDER BY day DESC в SQLite).
+
+    Args:
+        records (list[Record]): Записи по возрастанию дня.
+
+    Returns:
+        list[Record]: Записи по убыванию дня.
+    """
+    return sorted(records, key=lambda record: record.day, reverse=True)
+
+
+class _SortedByDay:
+    """Пара параллельных массивов: номера дней по возрастанию и значения."""
+
+    __slots__ = ("days", "items")
+
+    def __init__(self) -> None:
+        self.days: list[int] = []
+        self.items: list = []
+
+    def insert(self, day: int, item) -> None:
+        """Вставляет значение после всех значений того же дня."""
+        position = bisect_right(self.days, day)
+        self.days.insert(position, day)
+        self.items.insert(position, item)
+
+    def find(self, day: int):
+        """Возвращает значение за день или None."""
+        position = bisect_left(self.days, day)
+        if position < len(self.days) and self.days[position] == day:
+            return self.items[position]
+        return None
+
+    def between(self, start_day: int, end_day: int) -> list:
+        """Возвращает значения за период по возрастанию дня."""
+        return self.items[bisect_left(self.days, start_day):
+                          bisect_right(self.days, end_day)]
+
+
+class MemoryBackend(StorageBackend):
+    """Хранилище в памяти на отсортированных массивах пользователей."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._records: dict[str, dict[int, _SortedByDay]] = {
+            table: {} for table in _TABLES}
+        self._summaries: dict[int, _SortedByDay] = {}
+        self._next_id = {table: 1 for table in _TABLES}
+        self._running: dict[tuple[int, str], RunningStats] = {}
+        self._sketches = {table: QuantileSketch() for table in _TABLES}
+        self._digest_progress: dict[int, tuple[int, int, bool]] = {}
+
+    def _insert(self, table: str, user_id: int, date: str,
+                values: dict) -> dict:
+        """
+        Сохраняет запись и возвращает сводку ее дня.
+
+        Args:
+            table (str): sleep, calories или workouts.
+            user_id (int): ID пользователя.
+            date (str): Дата в формате ГГГГ-ММ-ДД.
+            values (dict): Значения записи.
+
+        Returns:
+            dict: Дневная сводка (создается при первой записи дня).
+        """
+        day = date_to_day(date)
+        record = RECORD_TYPES[table](
+            id=self._next_id[table], user_id=user_id, date=date, day=day,
+            timestamp=datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+            **values)
+        self._next_id[table] += 1
+        self._records[table].setdefault(
+            user_id, _SortedByDay()).insert(day, record)
+        value = getattr(record, _VALUE_FIELDS[table])
+        key = (user_id, table)
+        self._running[key] = merge_stats(
+            self._running.get(key, RunningStats(0, 0.0, 0.0, 0.0, 0.0)),
+            RunningStats(1, value, 0.0, value, value))
+        self._sketches[table].add(value)
+
+        summaries = self._summaries.setdefault(user_id, _SortedByDay())
+        summary = summaries.find(day)
+        if summary is None:
+            summary = {"day": day, "sleep_hours": None, "sleep_count": 0,
+                       "calories": None, "calories_count": 0,
+                       "workout_hours": 0.0, "workout_count": 0,
+                       "activities": {}}
+            summaries.insert(day, summary)
+        return summary
+
+    def add_sleep_record(self, user_id: int, date: str,
+                         hours: float) -> None:
+        with self._lock:
+            summary = self._insert("sleep", user_id, date, {"hours": hours})
+            summary["sleep_hours"] = (summary["sleep_hours"] or 0) + hours
+            summary["sleep_count"] += 1
+        notify_record_added(user_id)
+
+    def add_calories_record(self, user_id: int, date: str,
+                            amount: int) -> None:
+        with self._lock:
+            summary = self._insert("calories", user_id, date,
+                                   {"amount": amount})
+            summary["calories"] = (summary["calories"] or 0) + amount
+            summary["calories_count"] += 1
+        notify_record_added(user_id)
+
+    def add_workout_record(self, user_id: int, date: str,
+                           duration_hours: float,
+                           activity_type: str) -> None:
+        with self._lock:
+            summary = self._insert("workouts", user_id, date,
+                                   {"duration_hours": duration_hours,
+                                    "activity_type": activity_type})
+            summary["workout_hours"] += duration_hours
+            summary["workout_count"] += 1
+            activities = summary["activities"]
+            activities[activity_type] = (activities.get(activity_type, 0.0)
+                                         + duration_hours)
+        notify_record_added(user_id)
+
+    async def async_add_sleep_record(self, user_id: int, date: str,
+                                     hours: float) -> None:
+        self.add_sleep_record(user_id, date, hours)
+
+    async def async_add_calories_record(self, user_id: int, date: str,
+                                        amount: int) -> None:
+        self.add_calories_record(user_id, date, amount)
+
+    async def async_add_workout_record(self, user_id: int, date: str,
+                                       duration_hours: float,
+                                       activity_type: str) -> None:
+        self.add_workout_record(user_id, date, duration_hours,
+                                activity_type)
+
+    def _between(self, table: str, user_id: int, start_day: int,
+                 end_day: int) -> list[Record]:
+        """Возвращает записи таблицы за период по возрастанию дня."""
+        records = self._records[table].get(user_id)
+        if records is None:
+            return []
+        return records.between(start_day, end_day)
+
+    def get_records_last_n_days(self, user_id: int, table_name: str,
+                                n_days: int) -> list[Record]:
+        if table_name not in _TABLES:
+            raise ValueError("Invalid table name")
+        start_day, end_day = day_window(n_days)
+        with self._lock:
+            return _newest_first(self._between(table_name, user_id,
+                                               start_day, end_day))
+
+    def get_all_records_last_n_days(self, user_id: int,
+                                    n_days: int) -> dict[str, list[dict]]:
+        start_day, end_day = day_window(n_days)
+        fields = {"sleep": ("date", "hours"),
+                  "calories": ("date", "amount"),
+                  "workouts": ("date", "duration_hours", "activity_type")}
+        with self._lock:
+            return {table: [{field: getattr(record, field)
+                             for field in fields[table]}
+                            for record in _newest_first(self._between(
+                                table, user_id, start_day, end_day))]
+                    for table in _TABLES}
+
+    def _summary_between(self, user_id: int, start_day: int,
+                         end_day: int) -> list[dict]:
+        """Возвращает копии дневных сводок за период."""
+        with self._lock:
+            summaries = self._summaries.get(user_id)
+            if summaries is None:
+                return []
+            return [{**summary, "activities": dict(summary["activities"])}
+                    for summary in summaries.between(start_day, end_day)]
+
+    def get_daily_summary_last_n_days(self, user_id: int,
+                                      n_days: int) -> list[dict]:
+        return self._summary_between(user_id, *day_window(n_days))
+
+    def get_daily_columns_last_n_days(self, user_id: int, n_days: int)\
+            -> dict[str, np.ndarray]:
+        start_day, end_day = day_window(n_days)
+        rows = [(summary["day"],
+                 summary["sleep_hours"] if summary["sleep_count"] else None,
+                 summary["calories"] if summary["calories_count"] else None,
+                 summary["workout_hours"])
+                for summary in self._summary_between(user_id, start_day,
+                                                     end_day)]
+        return columns_from_summary(start_day, n_days, rows)
+
+    def get_running_stats(self, user_id: int) -> dict[str, RunningStats]:
+        with self._lock:
+            return {table: self._running[(user_id, table)]
+                    for table in _TABLES
+                    if (user_id, table) in self._running}
+
+    def get_quantile_sketches(self) -> dict[str, QuantileSketch]:
+        with self._lock:
+            return {table: QuantileSketch(sketch.counts)
+                    for table, sketch in self._sketches.items()
+                    if sketch.counts}
+
+    def get_active_user_ids(self, n_days: int) -> list[int]:
+        start_day, end_day = day_window(n_days)
+        with self._lock:
+            return sorted(user_id
+                          for user_id, summaries in self._summaries.items()
+                          if summaries.between(start_day, end_day))
+
+    def get_digest_progress(self, week: int) \
+            -> Optional[tuple[int, int, bool]]:
+        with self._lock:
+            return self._digest_progress.get(week)
+
+    def save_digest_progress(self, week: int, last_user_id: int, sent: int,
+                             finished: bool) -> None:
+        with self._lock:
+            self._digest_progress[week] = (last_user_id, sent, finished)
@@ -0,0 +1,343 @@
+"""
+Модуль версионных миграций схемы базы данных.
+
+Версия схемы хранится в таблице schema_version. При запуске бота
+apply_migrations применяет по порядку все миграции из списка
+MIGRATIONS, номер которых больше текущей версии, - так существующие
+базы обновляются на месте без ручного SQL.
+
+Чтобы изменить схему, добавьте в конец MIGRATIONS новую функцию
+со следующим номером версии. Уже выпущенные миграции не меняются.
+"""
+
+import sqlite3
+from typing import Callable
+from .days import SQL_DAY
+from .rollup import rebuild_daily_summary
+from .running_stats import add_batch_to_running_stats
+from .quantiles import add_batch_to_sketch
+
+
+def _create_base_tables(conn: sqlite3.Connection) -> None:
+    """
+    Создает таблицы сна, калорий и тренировок, если их нет.
+
+    Args:
+        conn (sqlite3.Connection): Подключение к базе данных.
+    """
+    cursor = conn.cursor()
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS sleep (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER NOT NULL,
+            date TEXT NOT NULL,
+            hours REAL NOT NULL,
+            timestamp DATETIME DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS calories (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER NOT NULL,
+            date TEXT NOT NULL,
+            amount INTEGER NOT NULL,
+            timestamp DATETIME DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS workouts (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER NOT NULL,
+            date TEXT NOT NULL,
+            duration_hours REAL NOT NULL,
+            activity_type TEXT NOT NULL,
+            timestamp DATETIME DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+
+
+def _add_user_date_indexes(conn: sqlite3.Connection) -> None:
+    """
+    Создает покрывающие индексы (user_id, date) для выборок за период.
+
+    Args:
+        conn (sqlite3.Connection): Подключение к базе данных.
+    """
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_sleep_user_date"
+                 " ON sleep (user_id, date, hours)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_calories_user_date"
+                 " ON calories (user_id, date, amount)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_workouts_user_date"
+                 " ON workouts (user_id, date, duration_hours,"
+                 " activity_type)")
+
+
+def _create_daily_summary(conn: sqlite3.Connection) -> None:
+    """
+    Создает таблицы дневных сводок и заполняет их по имеющимся записям.
+
+    Args:
+        conn (sqlite3.Connection): Подключение к базе данных.
+    """
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS daily_summary (
+            user_id INTEGER NOT NULL,
+            date TEXT NOT NULL,
+            sleep_hours REAL,
+            sleep_count INTEGER NOT NULL DEFAULT 0,
+            calories INTEGER,
+            calories_count INTEGER NOT NULL DEFAULT 0,
+            workout_hours REAL NOT NULL DEFAULT 0,
+            workout_count INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (user_id, date)
+        ) WITHOUT ROWID
+    ''')
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS daily_activity_summary (
+            user_id INTEGER NOT NULL,
+            date TEXT NOT NULL,
+            activity_type TEXT NOT NULL,
+            duration_hours REAL NOT NULL,
+            PRIMARY KEY (user_id, date, activity_type)
+        ) WITHOUT ROWID
+    ''')
+    rebuild_daily_summary(conn)
+
+
+def _create_archive(conn: sqlite3.Connection) -> None:
+    """
+    Создает таблицу помесячных блоков архива.
+
+    Args:
+        conn (sqlite3.Connection): Подключение к базе данных.
+    """
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS archive_chunks (
+            table_name TEXT NOT NULL,
+            user_id INTEGER NOT NULL,
+            month TEXT NOT NULL,
+            row_count INTEGER NOT NULL,
+            payload BLOB NOT NULL,
+            compressed INTEGER NOT NULL,
+            PRIMARY KEY (table_name, user_id, month)
+        ) WITHOUT ROWID
+    ''')
+
+
+def _add_day_numbers(conn: sqlite3.Connection) -> None:
+    """
+    Добавляет целый номер дня (см. модуль days) в таблицы записей,
+    переводит индексы записей и ключи дневных сводок на него.
+
+    Args:
+        conn (sqlite3.Connection): Подключение к базе данных.
+    """
+    for table in ("sleep", "calories", "workouts"):
+        conn.execute(f"ALTER TABLE {table} ADD COLUMN day INTEGER")
+        conn.execute(f"UPDATE {table} SET day = {SQL_DAY.format('date')}")
+        conn.execute(f"DROP INDEX IF EXISTS idx_{table}_user_date")
+    conn.execute("CREATE INDEX idx_sleep_user_day"
+                 " ON sleep (user_id, day, date, hours)")
+    conn.execute("CREATE INDEX idx_calories_user_day"
+                 " ON calories (user_id, day, date, amount)")
+    conn.execute("CREATE INDEX idx_workouts_user_day"
+                 " ON workouts (user_id, day, date, duration_hours,"
+                 " activity_type)")
+
+    conn.execute('''
+        CREATE TABLE daily_summary_by_day (
+            user_id INTEGER NOT NULL,
+            day INTEGER NOT NULL,
+            sleep_hours REAL,
+            sleep_count INTEGER NOT NULL DEFAULT 0,
+            calories INTEGER,
+            calories_count INTEGER NOT NULL DEFAULT 0,
+            workout_hours REAL NOT NULL DEFAULT 0,
+            workout_count INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (user_id, day)
+        ) WITHOUT ROWID
+    ''')
+    conn.execute(f'''
+        INSERT INTO daily_summary_by_day
+        SELECT user_id, {SQL_DAY.format('date')}, sleep_hours, sleep_count,
+               calories, calories_count, workout_hours, workout_count
+        FROM daily_summary
+    ''')
+    conn.execute("DROP TABLE daily_summary")
+    conn.execute("ALTER TABLE daily_summary_by_day RENAME TO daily_summary")
+
+    conn.execute('''
+        CREATE TABLE daily_activity_summary_by_day (
+            user_id INTEGER NOT NULL,
+            day INTEGER NOT NULL,
+            activity_type TEXT NOT NULL,
+            duration_hours REAL NOT NULL,
+            PRIMARY KEY (user_id, day, activity_type)
+        ) WITHOUT ROWID
+    ''')
+    conn.execute(f'''
+        INSERT INTO daily_activity_summary_by_day
+        SELECT user_id, {SQL_DAY.format('date')}, activity_type,
+               duration_hours
+        FROM daily_activity_summary
+    ''')
+    conn.execute("DROP TABLE daily_activity_summary")
+    conn.execute("ALTER TABLE daily_activity_summary_by_day"
+                 " RENAME TO daily_activity_summary")
+
+
+def _create_running_stats(conn: sqlite3.Connection) -> None:
+    """
+    Создает таблицу статистики за все время (см. модуль running_stats)
+    и заполняет ее по записям основных таблиц и архива.
+
+    Args:
+        conn (sqlite3.Connection): Подключение к базе данных.
+    """
+    # archive импортирует sharding, который импортирует этот модуль
+    from .archive import iter_archived_records
+
+    conn.execute('''
+        CREATE TABLE running_stats (
+            user_id INTEGER NOT NULL,
+            metric TEXT NOT NULL,
+            count INTEGER NOT NULL,
+            mean REAL NOT NULL,
+            m2 REAL NOT NULL,
+            min REAL NOT NULL,
+            max REAL NOT NULL,
+            PRIMARY KEY (user_id, metric)
+        ) WITHOUT ROWID
+    ''')
+    for table, value in (("sleep", "hours"), ("calories", "amount"),
+                         ("workouts", "duration_hours")):
+        conn.execute(f'''
+            INSERT INTO running_stats
+            SELECT t.user_id, '{table}', COUNT(*), a.mean,
+                   TOTAL((t.{value} - a.mean) * (t.{value} - a.mean)),
+                   MIN(t.{value}), MAX(t.{value})
+            FROM {table} AS t
+            JOIN (SELECT user_id, AVG({value}) AS mean FROM {table}
+                  GROUP BY user_id) AS a ON a.user_id = t.user_id
+            GROUP BY t.user_id
+        ''')
+        add_batch_to_running_stats(
+            conn, table,
+            ((user_id, record["date"], record[value])
+             for user_id, record in iter_archived_records(conn, table)))
+
+
+def _create_quantile_sketch(conn: sqlite3.Connection) -> None:
+    """
+    Создает таблицу квантильных скетчей (см. модуль quantiles)
+    и заполняет ее по записям основных таблиц и архива.
+
+    Args:
+        conn (sqlite3.Connection): Подключение к базе данных.
+    """
+    # archive импортирует sharding, который импортирует этот модуль
+    from .archive import iter_archived_records
+
+    conn.execute('''
+        CREATE TABLE quantile_sketch (
+            metric TEXT NOT NULL,
+            bucket INTEGER NOT NULL,
+            count INTEGER NOT NULL,
+            PRIMARY KEY (metric, bucket)
+        ) WITHOUT ROWID
+    ''')
+    for table, value in (("sleep", "hours"), ("calories", "amount"),
+                         ("workouts", "duration_hours")):
+        add_batch_to_sketch(
+            conn, table,
+            conn.execute(f"SELECT user_id, date, {value} FROM {table}"))
+        add_batch_to_sketch(
+            conn, table,
+            ((user_id, record["date"], record[value])
+             for user_id, record in iter_archived_records(conn, table)))
+
+
+def _create_digest_progress(conn: sqlite3.Connection) -> None:
+    """
+    Создает таблицу отметок прогресса рассылки недельной сводки.
+
+    Args:
+        conn (sqlite3.Connection): Подключение к базе данных.
+    """
+    conn.execute('''
+        CREATE TABLE digest_progress (
+            week INTEGER PRIMARY KEY,
+            last_user_id INTEGER NOT NULL,
+            sent INTEGER NOT NULL,
+            finished INTEGER NOT NULL
+        )
+    ''')
+
+
+MIGRATIONS: list[tuple[int, str, Callable[[sqlite3.Connection], None]]] = [
+    (1, "Таблицы сна, калорий и тренировок", _create_base_tables),
+    (2, "Индексы (user_id, date)", _add_user_date_indexes),
+    (3, "Дневные сводки", _create_daily_summary),
+    (4, "Архив старых записей", _create_archive),
+    (5, "Целые номера дней", _add_day_numbers),
+    (6, "Статистика за все время", _create_running_stats),
+    (7, "Квантильные скетчи показателей", _create_quantile_sketch),
+    (8, "Прогресс рассылки недельной сводки", _create_digest_progress),
+]
+
+
+def get_schema_version(conn: sqlite3.Connection) -> int:
+    """
+    Возвращает текущую версию схемы базы данных.
+
+    Args:
+        conn (sqlite3.Connection): Подключение к базе данных.
+
+    Returns:
+        int: Номер последней примененной миграции (0 для новой базы).
+    """
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS schema_version (
+            version INTEGER PRIMARY KEY,
+            description TEXT NOT NULL,
+            applied_at DATETIME DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    row = conn.execute("SELECT MAX(version) FROM schema_version").fetchone()
+    return row[0] or 0
+
+
+def apply_migrations(conn: sqlite3.Connection) -> int:
+    """
+    Применяет все недостающие миграции по порядку.
+
+    Каждая миграция выполняется в отдельной транзакции вместе с записью
+    в schema_version, поэтому прерванный запуск не оставляет схему
+    в промежуточном состоянии.
+
+    Args:
+        conn (sqlite3.Connection): Подключение к базе данных.
+
+    Returns:
+        int: Версия схемы после применения миграций.
+    """
+    conn.commit()
+    version = get_schema_version(conn)
+    for number, description, migrate in MIGRATIONS:
+        if number <= version:
+            continue
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            if get_schema_version(conn) >= number:
+                conn.rollback()
+                continue
+            migrate(conn)
+            conn.execute(
+                "INSERT INTO schema_version (version, description)"
+                " VALUES (?, ?)", (number, description))
+        except sqlite3.Error:
+            conn.rollback()
+            raise
+        conn.commit()
+        version = number
+    return version
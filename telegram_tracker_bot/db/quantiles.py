@@ -0,0 +1,198 @@
+"""
+Модуль квантильных скетчей показателей всех пользователей.
+
+Скетч - логарифмическая гистограмма (в духе DDSketch): значение
+попадает в корзину с номером ceil(log_gamma(значение)), где
+gamma = (1 + RELATIVE_ACCURACY) / (1 - RELATIVE_ACCURACY), поэтому
+любой квантиль восстанавливается с относительной ошибкой не больше
+RELATIVE_ACCURACY. Скетч хранит только счетчики корзин (несколько
+сотен на показатель независимо от числа записей), а два скетча
+объединяются сложением счетчиков - так объединяются шарды базы
+и пакеты импорта.
+
+Таблица quantile_sketch хранит по строке на (metric, bucket)
+в каждом файле-шарде. Счетчик корзины увеличивается в той же
+транзакции, что и вставка записи (см. insert_* в модуле database).
+Чтение скетча всех пользователей - get_quantile_sketches в модуле
+database (сумма по шардам).
+"""
+
+import math
+import sqlite3
+from collections import Counter
+from typing import Iterable, Optional
+
+RELATIVE_ACCURACY = 0.01
+# Значения меньше MIN_VALUE попадают в корзину MIN_VALUE.
+MIN_VALUE = 1e-3
+
+_GAMMA = (1 + RELATIVE_ACCURACY) / (1 - RELATIVE_ACCURACY)
+_LOG_GAMMA = math.log(_GAMMA)
+
+_ADD_UPSERT = (
+    "INSERT INTO quantile_sketch (metric, bucket, count) VALUES (?, ?, ?)"
+    " ON CONFLICT (metric, bucket) DO UPDATE SET"
+    " count = count + excluded.count")
+
+
+def bucket_of(value: float) -> int:
+    """
+    Возвращает номер корзины значения.
+
+    Args:
+        value (float): Значение записи.
+
+    Returns:
+        int: Номер корзины.
+    """
+    return math.ceil(math.log(max(value, MIN_VALUE)) / _LOG_GAMMA)
+
+
+def bucket_value(bucket: int) -> float:
+    """
+    Возвращает значение-представителя корзины.
+
+    Args:
+        bucket (int): Номер корзины.
+
+    Returns:
+        float: Значение с относительной ошибкой не больше
+         RELATIVE_ACCURACY для любого значения корзины.
+    """
+    return 2 * _GAMMA ** bucket / (_GAMMA + 1)
+
+
+class QuantileSketch:
+    """Логарифмическая гистограмма значений одного показателя."""
+
+    def __init__(self, counts: Optional[dict[int, int]] = None) -> None:
+        self.counts: Counter = Counter(counts or {})
+
+    @property
+    def count(self) -> int:
+        """Число значений в скетче."""
+        return sum(self.counts.values())
+
+    def add(self, value: float, count: int = 1) -> None:
+        """
+        Добавляет значение.
+
+        Args:
+            value (float): Значение записи.
+            count (int): Сколько раз добавить.
+        """
+        self.counts[bucket_of(value)] += count
+
+    def merge(self, other: "QuantileSketch") -> "QuantileSketch":
+        """
+        Добавляет к скетчу значения другого скетча.
+
+        Args:
+            other (QuantileSketch): Скетч того же показателя.
+
+        Returns:
+            QuantileSketch: Этот скетч.
+        """
+        self.counts.update(other.counts)
+        return self
+
+    def quantile(self, q: float) -> float:
+        """
+        Возвращает квантиль значений.
+
+        Args:
+            q (float): Уровень от 0 до 1.
+
+        Returns:
+            float: Квантиль (NaN для пустого скетча).
+        """
+        total = self.count
+        if not total:
+            return math.nan
+        rank = q * (total - 1)
+        seen = 0
+        for bucket in sorted(self.counts):
+            seen += self.counts[bucket]
+            if seen > rank:
+                return bucket_value(bucket)
+        return bucket_value(max(self.counts))
+
+    def percentile_of(self, value: float) -> float:
+        """
+        Возвращает долю значений меньше данного (процентиль).
+
+        Значения той же корзины считаются меньшими наполовину.
+
+        Args:
+            value (float): Значение.
+
+        Returns:
+            float: Процентиль от 0 до 100 (NaN для пустого скетча).
+        """
+        total = self.count
+        if not total:
+            return math.nan
+        target = bucket_of(value)
+        below = sum(count for bucket, count in self.counts.items()
+                    if bucket < target)
+        return 100 * (below + self.counts.get(target, 0) / 2) / total
+
+
+def add_to_sketch(conn: sqlite3.Connection, metric: str,
+                  value: float) -> None:
+    """
+    Добавляет значение записи к скетчу показателя.
+
+    Args:
+        conn (sqlite3.Connection): Подключение к базе данных.
+        metric (str): sleep, calories или workouts.
+        value (float): Значение записи.
+    """
+    conn.execute(_ADD_UPSERT, (metric, bucket_of(value), 1))
+
+
+def add_batch_to_sketch(conn: sqlite3.Connection, metric: str,
+                        rows: Iterable[tuple]) -> None:
+    """
+    Добавляет к скетчу пакет записей одной таблицы.
+
+    Args:
+        conn (sqlite3.Connection): Подключение к базе данных.
+        metric (str): sleep, calories или workouts.
+        rows (Iterable[tuple]): Значения записей в порядке столбцов
+         (user_id, date, значение[, activity_type]).
+    """
+    counts = Counter(bucket_of(row[2]) for row in rows)
+    add_sketch_buckets(conn, ((metric, bucket, count)
+                              for bucket, count in counts.items()))
+
+
+def add_sketch_buckets(conn: sqlite3.Connection,
+                       rows: Iterable[tuple[str, int, int]]) -> None:
+    """
+    Объединяет с хранимыми скетчами счетчики корзин.
+
+    Args:
+        conn (sqlite3.Connection): Подключение к базе данных.
+        rows (Iterable[tuple[str, int, int]]): Строки
+         (metric, bucket, count).
+    """
+    conn.executemany(_ADD_UPSERT, rows)
+
+
+def load_sketches(conn: sqlite3.Connection) -> dict[str, QuantileSketch]:
+    """
+    Читает скетчи всех показателей одного файла базы.
+
+    Args:
+        conn (sqlite3.Connection): Подключение к базе данных.
+
+    Returns:
+        dict[str, QuantileSketch]: Скетчи по показателям (только
+         показатели с записями).
+    """
+    sketches: dict[str, QuantileSketch] = {}
+    for metric, bucket, count in conn.execute(
+            "SELECT metric, bucket, count FROM quantile_sketch"):
+        sketches.setdefault(metric, QuantileSketch()).counts[bucket] = count
+    return sketches
@@ -0,0 +1,86 @@
+"""
+Модуль типизированных записей о сне, калориях и тренировках.
+
+Выборки записей возвращают не словари, а именованные кортежи
+(NamedTuple): они занимают меньше памяти, чем dict на строку,
+доступ к полю - обращение к атрибуту, а поля проверяются
+анализаторами типов. Кортежи создаются прямо фабрикой строк
+курсора SQLite (record_factory), без промежуточных sqlite3.Row.
+"""
+
+import sqlite3
+from typing import Callable, NamedTuple, Union
+
+
+class SleepRecord(NamedTuple):
+    """Запись о сне."""
+
+    id: int
+    user_id: int
+    date: str
+    day: int
+    hours: float
+    timestamp: str
+
+
+class CaloriesRecord(NamedTuple):
+    """Запись о калориях."""
+
+    id: int
+    user_id: int
+    date: str
+    day: int
+    amount: int
+    timestamp: str
+
+
+class WorkoutRecord(NamedTuple):
+    """Запись о тренировке."""
+
+    id: int
+    user_id: int
+    date: str
+    day: int
+    duration_hours: float
+    activity_type: str
+    timestamp: str
+
+
+Record = Union[SleepRecord, CaloriesRecord, WorkoutRecord]
+
+RECORD_TYPES: dict[str, type] = {
+    "sleep": SleepRecord,
+    "calories": CaloriesRecord,
+    "workouts": WorkoutRecord,
+}
+
+
+def record_columns(table: str) -> str:
+    """
+    Возвращает список столбцов таблицы в порядке полей ее записи.
+
+    Args:
+        table (str): sleep, calories или workouts.
+
+    Returns:
+        str: Столбцы через запятую для SELECT.
+    """
+    return ", ".join(RECORD_TYPES[table]._fields)
+
+
+def record_factory(table: str)\
+        -> Callable[[sqlite3.Cursor, tuple], Record]:
+    """
+    Возвращает фабрику строк курсора, создающую записи таблицы.
+
+    Запрос должен выбирать столбцы в порядке record_columns(table).
+
+    Args:
+        table (str): sleep, calories или workouts.
+
+    Returns:
+        Callable[[sqlite3.Cursor, tuple], Record]: Значение для
+         cursor.row_factory.
+    """
+    make = RECORD_TYPES[table]._make
+    return lambda cursor, row: make(row)
@@ -0,0 +1,184 @@
+"""
+Модуль поддержки дневных сводок пользователя.
+
+Таблица daily_summary хранит по одной строке на (user_id, day):
+суммарный сон, суммарные калории, часы тренировок и число записей
+каждого вида. Таблица daily_activity_summary хранит часы тренировок
+по каждому типу активности за день. День задается целым номером
+(см. модуль days).
+
+Сводки обновляются в той же транзакции, что и вставка исходной
+записи (см. insert_* в модуле database), поэтому отчеты и графики
+читают не больше одной строки на день вместо всех записей.
+"""
+
+import sqlite3
+from typing import Iterable, Optional
+from .days import date_to_day
+
+
+_SLEEP_UPSERT = (
+    "INSERT INTO daily_summary (user_id, day, sleep_hours, sleep_count)"
+    " VALUES (?, ?, ?, ?)"
+    " ON CONFLICT (user_id, day) DO UPDATE SET"
+    " sleep_hours = COALESCE(sleep_hours, 0) + excluded.sleep_hours,"
+    " sleep_count = sleep_count + excluded.sleep_count")
+_CALORIES_UPSERT = (
+    "INSERT INTO daily_summary (user_id, day, calories, calories_count)"
+    " VALUES (?, ?, ?, ?)"
+    " ON CONFLICT (user_id, day) DO UPDATE SET"
+    " calories = COALESCE(calories, 0) + excluded.calories,"
+    " calories_count = calories_count + excluded.calories_count")
+_WORKOUT_UPSERT = (
+    "INSERT INTO daily_summary"
+    " (user_id, day, workout_hours, workout_count)"
+    " VALUES (?, ?, ?, ?)"
+    " ON CONFLICT (user_id, day) DO UPDATE SET"
+    " workout_hours = workout_hours + excluded.workout_hours,"
+    " workout_count = workout_count + excluded.workout_count")
+_ACTIVITY_UPSERT = (
+    "INSERT INTO daily_activity_summary"
+    " (user_id, day, activity_type, duration_hours)"
+    " VALUES (?, ?, ?, ?)"
+    " ON CONFLICT (user_id, day, activity_type) DO UPDATE SET"
+    " duration_hours = duration_hours + excluded.duration_hours")
+
+
+def add_sleep_to_summary(conn: sqlite3.Connection, user_id: int,
+                         day: int, hours: float) -> None:
+    """
+    Прибавляет сон к дневной сводке.
+
+    Args:
+        conn (sqlite3.Connection): Подключение к базе данных.
+        user_id (int): ID пользователя.
+        day (int): Номер дня.
+        hours (float): Продолжительность сна в часах.
+    """
+    conn.execute(_SLEEP_UPSERT, (user_id, day, hours, 1))
+
+
+def add_calories_to_summary(conn: sqlite3.Connection, user_id: int,
+                            day: int, amount: int) -> None:
+    """
+    Прибавляет калории к дневной сводке.
+
+    Args:
+        conn (sqlite3.Connection): Подключение к базе данных.
+        user_id (int): ID пользователя.
+        day (int): Номер дня.
+        amount (int): Количество калорий.
+    """
+    conn.execute(_CALORIES_UPSERT, (user_id, day, amount, 1))
+
+
+def add_workout_to_summary(conn: sqlite3.Connection, user_id: int,
+                           day: int, duration_hours: float,
+                           activity_type: str) -> None:
+    """
+    Прибавляет тренировку к дневной сводке и к сводке по активности.
+
+    Args:
+        conn (sqlite3.Connection): Подключение к базе данных.
+        user_id (int): ID пользователя.
+        day (int): Номер дня.
+        duration_hours (float): Длительность тренировки в часах.
+        activity_type (str): Тип активности.
+    """
+    conn.execute(_WORKOUT_UPSERT, (user_id, day, duration_hours, 1))
+    conn.execute(_ACTIVITY_UPSERT,
+                 (user_id, day, activity_type, duration_hours))
+
+
+def add_batch_to_summary(conn: sqlite3.Connection, table: str,
+                         rows: Iterable[tuple]) -> None:
+    """
+    Прибавляет к дневным сводкам пакет записей одной таблицы.
+
+    Записи сначала суммируются по дням, затем сводки обновляются
+    одним executemany на пакет.
+
+    Args:
+        conn (sqlite3.Connection): Подключение к базе данных.
+        table (str): Таблица записей: sleep, calories или workouts.
+        rows (Iterable[tuple]): Значения записей в порядке столбцов
+         (user_id, date, значение[, activity_type]), где date - строка
+         ГГГГ-ММ-ДД.
+    """
+    totals: dict[tuple, list] = {}
+    activities: dict[tuple, float] = {}
+    days: dict[str, int] = {}
+    for row in rows:
+        day = days.get(row[1])
+        if day is None:
+            day = days[row[1]] = date_to_day(row[1])
+        total = totals.setdefault((row[0], day), [0, 0])
+        total[0] += row[2]
+        total[1] += 1
+        if table == "workouts":
+            key = (row[0], day, row[3])
+            activities[key] = activities.get(key, 0.0) + row[2]
+    upsert = {"sleep": _SLEEP_UPSERT, "calories": _CALORIES_UPSERT,
+              "workouts": _WORKOUT_UPSERT}[table]
+    conn.executemany(upsert, [(user_id, day, value, count)
+                              for (user_id, day), (value, count)
+                              in totals.items()])
+    if activities:
+        conn.executemany(_ACTIVITY_UPSERT,
+                         [key + (duration,)
+                          for key, duration in activities.items()])
+
+
+def rebuild_daily_summary(conn: sqlite3.Connection,
+                          user_ids: Optional[Iterable[int]] = None) -> None:
+    """
+    Пересчитывает дневные сводки по исходным записям.
+
+    Используется миграцией 3 при создании таблиц сводок и работает
+    со схемой этой версии (ключ сводок - строка date). Учитываются
+    только записи в основных таблицах (без архива).
+
+    Args:
+        conn (sqlite3.Connection): Подключение к базе данных.
+        user_ids (Optional[Iterable[int]]): Пользователи, сводки которых
+         нужно пересчитать (по умолчанию - все).
+    """
+    if user_ids is None:
+        where, params = "", ()
+    else:
+        ids = list(user_ids)
+        if not ids:
+            return
+        where = f" WHERE user_id IN ({', '.join('?' * len(ids))})"
+        params = tuple(ids)
+    conn.execute(f"DELETE FROM daily_summary{where}", params)
+    conn.execute(f"DELETE FROM daily_activity_summary{where}", params)
+    conn.execute(f'''
+        INSERT INTO daily_summary
+            (user_id, date, sleep_hours, sleep_count, calories,
+             calories_count, workout_hours, workout_count)
+        SELECT user_id, date,
+               SUM(sleep_hours), SUM(sleep_count),
+               SUM(calories), SUM(calories_count),
+               COALESCE(SUM(workout_hours), 0), SUM(workout_count)
+        FROM (
+            SELECT user_id, date, hours AS sleep_hours, 1 AS sleep_count,
+                   NULL AS calories, 0 AS calories_count,
+                   NULL AS workout_hours, 0 AS workout_count
+            FROM sleep{where}
+            UNION ALL
+            SELECT user_id, date, NULL, 0, amount, 1, NULL, 0
+            FROM calories{where}
+            UNION ALL
+            SELECT user_id, date, NULL, 0, NULL, 0, duration_hours, 1
+            FROM workouts{where}
+        )
+        GROUP BY user_id, date
+    ''', params * 3)
+    conn.execute(f'''
+        INSERT INTO daily_activity_summary
+            (user_id, date, activity_type, duration_hours)
+        SELECT user_id, date, activity_type, SUM(duration_hours)
+        FROM workouts{where}
+        GROUP BY user_id, date, activity_type
+    ''', params)
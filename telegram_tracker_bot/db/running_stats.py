@@ -0,0 +1,139 @@
+"""
+Модуль накопленной статистики пользователя за все время.
+
+Таблица running_stats хранит по одной строке на (user_id, metric):
+число записей, среднее, сумму квадратов отклонений M2 (алгоритм
+Уэлфорда), минимум и максимум значений. Показатели: sleep (часы сна
+записи), calories (калории записи) и workouts (часы тренировки).
+
+Строка обновляется за O(1) в той же транзакции, что и вставка записи
+(см. insert_* в модуле database), поэтому среднее и разброс за всю
+историю читаются одной строкой независимо от ее длины. Пакеты
+записей (импорт из файла) объединяются с накопленной статистикой
+по формуле Чана для параллельных дисперсий.
+
+Чтение статистики - get_running_stats в модуле database.
+"""
+
+import math
+import sqlite3
+from typing import Iterable, NamedTuple
+
+METRICS = ("sleep", "calories", "workouts")
+
+# Объединение накопленной статистики (count, mean, m2) с новой частью
+# (excluded.*): для одной записи это шаг алгоритма Уэлфорда.
+_MERGE_UPSERT = (
+    "INSERT INTO running_stats"
+    " (user_id, metric, count, mean, m2, min, max)"
+    " VALUES (?, ?, ?, ?, ?, ?, ?)"
+    " ON CONFLICT (user_id, metric) DO UPDATE SET"
+    " count = count + excluded.count,"
+    " mean = mean + (excluded.mean - mean) * excluded.count"
+    " / (count + excluded.count),"
+    " m2 = m2 + excluded.m2 + (excluded.mean - mean)"
+    " * (excluded.mean - mean) * count * excluded.count"
+    " / (count + excluded.count),"
+    " min = MIN(min, excluded.min),"
+    " max = MAX(max, excluded.max)")
+
+
+class RunningStats(NamedTuple):
+    """Накопленная статистика одного показателя."""
+
+    count: int
+    mean: float
+    m2: float
+    min: float
+    max: float
+
+    @property
+    def variance(self) -> float:
+        """Выборочная дисперсия (NaN, если записей меньше двух)."""
+        if self.count < 2:
+            return math.nan
+        return self.m2 / (self.count - 1)
+
+    @property
+    def std(self) -> float:
+        """Выборочное стандартное отклонение."""
+        return math.sqrt(self.variance)
+
+
+def merge_stats(stats: RunningStats, other: RunningStats) -> RunningStats:
+    """
+    Объединяет две накопленные статистики (формула Чана).
+
+    Args:
+        stats (RunningStats): Первая часть.
+        other (RunningStats): Вторая часть.
+
+    Returns:
+        RunningStats: Статистика по обеим частям.
+    """
+    if not stats.count:
+        return other
+    if not other.count:
+        return stats
+    count = stats.count + other.count
+    delta = other.mean - stats.mean
+    return RunningStats(
+        count, stats.mean + delta * other.count / count,
+        stats.m2 + other.m2 + delta * delta * stats.count * other.count
+        / count,
+        min(stats.min, other.min), max(stats.max, other.max))
+
+
+def stats_of(values: Iterable[float]) -> RunningStats:
+    """
+    Считает статистику набора значений алгоритмом Уэлфорда.
+
+    Args:
+        values (Iterable[float]): Значения.
+
+    Returns:
+        RunningStats: Статистика значений (count = 0 для пустого набора).
+    """
+    count, mean, m2 = 0, 0.0, 0.0
+    low, high = math.inf, -math.inf
+    for value in values:
+        count += 1
+        delta = value - mean
+        mean += delta / count
+        m2 += delta * (value - mean)
+        low, high = min(low, value), max(high, value)
+    return RunningStats(count, mean, m2, low, high)
+
+
+def add_to_running_stats(conn: sqlite3.Connection, user_id: int,
+                         metric: str, value: float) -> None:
+    """
+    Добавляет значение записи к накопленной статистике.
+
+    Args:
+        conn (sqlite3.Connection): Подключение к базе данных.
+        user_id (int): ID пользователя.
+        metric (str): sleep, calories или workouts.
+        value (float): Значение записи.
+    """
+    conn.execute(_MERGE_UPSERT,
+                 (user_id, metric, 1, value, 0.0, value, value))
+
+
+def add_batch_to_running_stats(conn: sqlite3.Connection, metric: str,
+                               rows: Iterable[tuple]) -> None:
+    """
+    Добавляет к накопленной статистике пакет записей одной таблицы.
+
+    Args:
+        conn (sqlite3.Connection): Подключение к базе данных.
+        metric (str): sleep, calories или workouts.
+        rows (Iterable[tuple]): Значения записей в порядке столбцов
+         (user_id, date, значение[, activity_type]).
+    """
+    values: dict[int, list[float]] = {}
+    for row in rows:
+        values.setdefault(row[0], []).append(row[2])
+    conn.executemany(_MERGE_UPSERT,
+                     [(user_id, metric) + tuple(stats_of(user_values))
+                      for user_id, user_values in values.items()])
@@ -0,0 +1,253 @@
+"""
+Модуль распределения пользователей по нескольким файлам SQLite.
+
+SQLite допускает только одного пишущего на файл, поэтому при
+DATABASE_SHARDS > 1 данные хранятся в N файлах-шардах, а файл
+пользователя выбирается по стабильному хешу его ID. Все функции
+модуля database принимают путь к базе как раньше и сами выбирают
+нужный шард; при одном шарде используется исходный файл.
+
+Шард i из N для базы tracker_data_base.db называется
+tracker_data_base.shard{i}of{N}.db.
+
+Для перераспределения существующей базы на другое число шардов
+(бот при этом должен быть остановлен):
+    python -m telegram_tracker_bot.db.sharding --from 1 --to 4
+
+При возврате к одному шарду данные собираются в исходный файл
+tracker_data_base.db, поэтому старую копию этого файла (оставшуюся
+от перехода на шарды) нужно предварительно удалить или переименовать.
+"""
+
+import argparse
+import os
+import sqlite3
+import sys
+import zlib
+from typing import Optional
+from .migrations import apply_migrations
+from .quantiles import add_sketch_buckets
+
+# Число шардов по умолчанию; None - взять DATABASE_SHARDS из конфигурации
+# при первом обращении.
+SHARDS: Optional[int] = None
+
+USER_TABLES = ("sleep", "calories", "workouts", "daily_summary",
+               "daily_activity_summary", "running_stats", "archive_chunks")
+COPY_BATCH = 10000
+
+
+def default_shards() -> int:
+    """
+    Возвращает число шардов по умолчанию.
+
+    Returns:
+        int: SHARDS или, если он не задан, DATABASE_SHARDS из конфигурации.
+    """
+    global SHARDS
+    if SHARDS is None:
+        from telegram_tracker_bot.config import DATABASE_SHARDS
+        SHARDS = DATABASE_SHARDS
+    return SHARDS
+
+
+def shard_index(user_id: int, shards: int) -> int:
+    """
+    Возвращает номер шарда пользователя.
+
+    Args:
+        user_id (int): ID пользователя.
+        shards (int): Число шардов.
+
+    Returns:
+        int: Номер шарда от 0 до shards - 1.
+    """
+    return zlib.crc32(str(user_id).encode("ascii")) % shards
+
+
+def shard_file(database_dir: str, index: int, shards: int) -> str:
+    """
+    Возвращает имя файла шарда.
+
+    Args:
+        database_dir (str): Директория базы данных
+        index (int): Номер шарда.
+        shards (int): Число шардов.
+
+    Returns:
+        str: Путь к файлу шарда (исходный путь при одном шарде).
+    """
+    if shards == 1:
+        return database_dir
+    root, ext = os.path.splitext(database_dir)
+    return f"{root}.shard{index}of{shards}{ext}"
+
+
+def shard_path(database_dir: str, user_id: int,
+               shards: Optional[int] = None) -> str:
+    """
+    Возвращает файл шарда, в котором хранятся данные пользователя.
+
+    Args:
+        database_dir (str): Директория базы данных
+        user_id (int): ID пользователя.
+        shards (Optional[int]): Число шардов (по умолчанию из конфигурации).
+
+    Returns:
+        str: Путь к файлу шарда.
+    """
+    shards = shards or default_shards()
+    return shard_file(database_dir, shard_index(user_id, shards), shards)
+
+
+def all_shard_paths(database_dir: str,
+                    shards: Optional[int] = None) -> list[str]:
+    """
+    Возвращает файлы всех шардов базы.
+
+    Args:
+        database_dir (str): Директория базы данных
+        shards (Optional[int]): Число шардов (по умолчанию из конфигурации).
+
+    Returns:
+        list[str]: Пути к файлам шардов по порядку номеров.
+    """
+    shards = shards or default_shards()
+    return [shard_file(database_dir, index, shards)
+            for index in range(shards)]
+
+
+def _columns(conn: sqlite3.Connection, table: str) -> list[str]:
+    """
+    Возвращает столбцы таблицы для копирования (без суррогатного id).
+
+    Args:
+        conn (sqlite3.Connection): Подключение к базе данных.
+        table (str): Имя таблицы.
+
+    Returns:
+        list[str]: Имена столбцов.
+    """
+    columns = [row[1] for row in conn.execute(f"PRAGMA table_info({table})")]
+    if table in ("sleep", "calories", "workouts"):
+        columns.remove("id")
+    return columns
+
+
+def reshard(database_dir: str, old_shards: int, new_shards: int) -> int:
+    """
+    Перераспределяет данные пользователей на новое число шардов.
+
+    Исходные файлы не изменяются; новые файлы создаются заново и
+    не должны содержать данных. После проверки нужно указать
+    DATABASE_SHARDS = new_shards и удалить старые файлы. При
+    new_shards = 1 новым файлом является исходный путь базы, поэтому
+    его прежнюю копию нужно удалить или переименовать заранее.
+
+    Args:
+        database_dir (str): Директория базы данных
+        old_shards (int): Текущее число шардов.
+        new_shards (int): Новое число шардов.
+
+    Returns:
+        int: Количество скопированных строк.
+
+    Raises:
+        ValueError: Если число шардов не меняется или новые файлы
+         уже содержат данные.
+    """
+    if old_shards == new_shards:
+        raise ValueError("Число шардов не меняется")
+    targets_paths = all_shard_paths(database_dir, new_shards)
+    for path in targets_paths:
+        if os.path.exists(path) and os.path.getsize(path) > 0:
+            raise ValueError(f"Файл {path} уже существует; удалите или"
+                             " переименуйте его перед перераспределением")
+
+    targets = [sqlite3.connect(path) for path in targets_paths]
+    copied = 0
+    try:
+        for target in targets:
+            apply_migrations(target)
+        for source_index, source_path in enumerate(
+                all_shard_paths(database_dir, old_shards)):
+            source = sqlite3.connect(source_path)
+            try:
+                for table in USER_TABLES:
+                    columns = _columns(source, table)
+                    user_position = columns.index("user_id")
+                    insert = (f"INSERT INTO {table} ({', '.join(columns)})"
+                              f" VALUES ({', '.join('?' * len(columns))})")
+                    cursor = source.execute(
+                        f"SELECT {', '.join(columns)} FROM {table}")
+                    while True:
+                        rows = cursor.fetchmany(COPY_BATCH)
+                        if not rows:
+                            break
+                        batches: dict[int, list] = {}
+                        for row in rows:
+                            index = shard_index(row[user_position],
+                                                new_shards)
+                            batches.setdefault(index, []).append(row)
+                        for index, batch in batches.items():
+                            targets[index].executemany(insert, batch)
+                        copied += len(rows)
+                # скетчи общие для всех пользователей шарда: счетчики
+                # старых шардов складываются в первом новом шарде
+                add_sketch_buckets(targets[0], source.execute(
+                    "SELECT metric, bucket, count FROM quantile_sketch"))
+                if source_index == 0:
+                    # отметки рассылки хранятся в первом шарде; без них
+                    # прерванная рассылка началась бы заново
+                    targets[0].executemany(
+                        "INSERT INTO digest_progress"
+                        " (week, last_user_id, sent, finished)"
+                        " VALUES (?, ?, ?, ?)",
+                        source.execute(
+                            "SELECT week, last_user_id, sent, finished"
+                            " FROM digest_progress"))
+            finally:
+                source.close()
+        for target in targets:
+            target.commit()
+    finally:
+        for target in targets:
+            target.close()
+    return copied
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    """
+    Точка входа командной строки.
+
+    Args:
+        argv (Optional[list[str]]): Аргументы (по умолчанию sys.argv).
+
+    Returns:
+        int: Код завершения.
+    """
+    from telegram_tracker_bot.config import DATABASE_NAME, DATABASE_SHARDS
+
+    parser = argparse.ArgumentParser(
+        prog="python -m telegram_tracker_bot.db.sharding",
+        description="Перераспределение базы на другое число шардов.")
+    parser.add_argument("--from", dest="old", type=int,
+                        default=DATABASE_SHARDS,
+                        help="Текущее число шардов")
+    parser.add_argument("--to", dest="new", type=int, required=True,
+                        help="Новое число шардов")
+    parser.add_argument("--database", default=DATABASE_NAME,
+                        help="Файл базы данных")
+    args = parser.parse_args(argv)
+    try:
+        copied = reshard(args.database, args.old, args.new)
+    except ValueError as e:
+        print(f"Ошибка: {e}", file=sys.stderr)
+        return 1
+    print(f"Скопировано строк: {copied}. Укажите DATABASE_SHARDS={args.new}"
+          " и удалите старые файлы.", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,361 @@
+"""
+Модуль массового импорта и экспорта истории пользователей.
+
+Записи сна, калорий и тренировок переносятся потоком в формате CSV
+или JSON Lines, поэтому расход памяти не зависит от объема истории.
+Импорт вставляет записи пакетами через executemany в крупных
+транзакциях и в тех же транзакциях обновляет дневные сводки.
+Если база разделена на шарды, каждая запись попадает в шард
+своего пользователя, а экспорт обходит все шарды.
+
+Запуск из командной строки:
+    python -m telegram_tracker_bot.db.transfer export backup.jsonl
+    python -m telegram_tracker_bot.db.transfer import data.csv --user 42
+
+Каждая строка JSON Lines - объект с ключом table и полями таблицы,
+например {"table": "sleep", "user_id": 1, "date": "2024-05-01",
+"hours": 7.5}. CSV использует те же имена столбцов.
+"""
+
+import argparse
+import csv
+import datetime
+import json
+import math
+import sys
+from contextlib import ExitStack
+from typing import Iterable, Iterator, Optional, TextIO
+from .archive import iter_archived_records
+from .connection import connection
+from .database import initialize_db
+from .days import date_to_day
+from .rollup import add_batch_to_summary
+from .running_stats import add_batch_to_running_stats
+from .quantiles import add_batch_to_sketch
+from .sharding import all_shard_paths, shard_path
+
+TABLE_FIELDS = {
+    "sleep": ("user_id", "date", "hours"),
+    "calories": ("user_id", "date", "amount"),
+    "workouts": ("user_id", "date", "duration_hours", "activity_type"),
+}
+CSV_FIELDS = ("table", "user_id", "date", "hours", "amount",
+              "duration_hours", "activity_type")
+FETCH_SIZE = 5000
+BATCH_SIZE = 10000
+TRANSACTION_SIZE = 100000
+MAX_HOURS = 24
+
+
+def _user_filter(user_ids: Optional[Iterable[int]]) -> tuple[str, tuple]:
+    """
+    Формирует условие WHERE по списку пользователей.
+
+    Args:
+        user_ids (Optional[Iterable[int]]): ID пользователей или None.
+
+    Returns:
+        tuple[str, tuple]: Условие (пустое, если фильтра нет) и параметры.
+    """
+    if user_ids is None:
+        return "", ()
+    ids = tuple(user_ids)
+    return f" WHERE user_id IN ({', '.join('?' * len(ids))})", ids
+
+
+def iter_records(database_name: str,
+                 user_ids: Optional[Iterable[int]] = None)\
+        -> Iterator[dict]:
+    """
+    Потоково перебирает записи всех таблиц, включая архив.
+
+    Args:
+        database_name (str): Директория базы данных
+        user_ids (Optional[Iterable[int]]): Выгружать только этих
+         пользователей (по умолчанию - всех).
+
+    Yields:
+        dict: Запись с ключом table и полями таблицы.
+    """
+    where, params = _user_filter(user_ids)
+    for path in all_shard_paths(database_name):
+        with connection(path) as conn:
+            for table, fields in TABLE_FIELDS.items():
+                cursor = conn.execute(
+                    f"SELECT {', '.join(fields)} FROM {table}{where}"
+                    " ORDER BY user_id, date, id", params)
+                while True:
+                    rows = cursor.fetchmany(FETCH_SIZE)
+                    if not rows:
+                        break
+                    for row in rows:
+                        record = {"table": table}
+                        record.update(zip(fields, row))
+                        yield record
+                # пустой фильтр в архиве, как и в таблицах, не выбирает
+                # ни одной записи
+                for user_id, archived in iter_archived_records(
+                        conn, table, params if where else None):
+                    record = {"table": table, "user_id": user_id}
+                    record.update((field, archived[field])
+                                  for field in fields[1:])
+                    yield record
+
+
+def export_records(database_name: str, out: TextIO, fmt: str,
+                   user_ids: Optional[Iterable[int]] = None) -> int:
+    """
+    Выгружает записи в поток CSV или JSON Lines.
+
+    Args:
+        database_name (str): Директория базы данных
+        out (TextIO): Поток для записи.
+        fmt (str): Формат: "csv" или "jsonl".
+        user_ids (Optional[Iterable[int]]): Фильтр по пользователям.
+
+    Returns:
+        int: Количество выгруженных записей.
+    """
+    count = 0
+    if fmt == "csv":
+        writer = csv.DictWriter(out, fieldnames=CSV_FIELDS)
+        writer.writeheader()
+        for record in iter_records(database_name, user_ids):
+            writer.writerow(record)
+            count += 1
+    else:
+        for record in iter_records(database_name, user_ids):
+            out.write(json.dumps(record, ensure_ascii=False))
+            out.write("\n")
+            count += 1
+    return count
+
+
+def _positive(record: dict, field: str,
+              upper: Optional[float] = None) -> float:
+    """
+    Читает числовое поле записи и проверяет, что оно конечно и больше 0.
+
+    Args:
+        record (dict): Запись из файла импорта.
+        field (str): Имя поля.
+        upper (Optional[float]): Значение должно быть меньше upper.
+
+    Returns:
+        float: Значение поля.
+
+    Raises:
+        ValueError: Если значение не число, бесконечно, NaN, не больше 0
+         или не меньше upper.
+    """
+    value = float(record[field])
+    if (not math.isfinite(value) or value <= 0
+            or (upper is not None and value >= upper)):
+        raise ValueError(f"Некорректное значение {field}: {record[field]!r}")
+    return value
+
+
+def _positive_int(record: dict, field: str) -> int:
+    """
+    Читает целочисленное поле записи и проверяет, что оно больше 0.
+
+    Args:
+        record (dict): Запись из файла импорта.
+        field (str): Имя поля.
+
+    Returns:
+        int: Значение поля.
+
+    Raises:
+        ValueError: Если значение не целое число или не больше 0.
+    """
+    value = _positive(record, field)
+    if not value.is_integer():
+        raise ValueError(f"Некорректное значение {field}: {record[field]!r}")
+    return int(value)
+
+
+def _parse_record(record: dict) -> tuple[str, tuple]:
+    """
+    Проверяет запись и приводит значения к типам столбцов.
+
+    Args:
+        record (dict): Запись из файла импорта.
+
+    Returns:
+        tuple[str, tuple]: Имя таблицы и значения для вставки.
+
+    Raises:
+        ValueError: Если таблица неизвестна или значения некорректны.
+    """
+    table = record.get("table")
+    if table not in TABLE_FIELDS:
+        raise ValueError(f"Неизвестная таблица: {table!r}")
+    user_id = int(record["user_id"])
+    date = datetime.date.fromisoformat(str(record["date"])).isoformat()
+    # границы те же, что у команд /sleep, /calories и /workout
+    if table == "sleep":
+        return table, (user_id, date,
+                       _positive(record, "hours", MAX_HOURS))
+    if table == "calories":
+        return table, (user_id, date, _positive_int(record, "amount"))
+    activity_type = str(record["activity_type"]).strip()
+    if not activity_type:
+        raise ValueError("Пустой тип активности")
+    return table, (user_id, date,
+                   _positive(record, "duration_hours", MAX_HOURS),
+                   activity_type)
+
+
+def _read_records(src: TextIO, fmt: str) -> Iterator[dict]:
+    """
+    Потоково читает записи из CSV или JSON Lines.
+
+    Args:
+        src (TextIO): Поток для чтения.
+        fmt (str): Формат: "csv" или "jsonl".
+
+    Yields:
+        dict: Запись из файла.
+    """
+    if fmt == "csv":
+        yield from csv.DictReader(src)
+    else:
+        for line in src:
+            if line.strip():
+                yield json.loads(line)
+
+
+def import_records(database_name: str, src: TextIO, fmt: str,
+                   user_ids: Optional[Iterable[int]] = None) -> int:
+    """
+    Загружает записи из потока CSV или JSON Lines.
+
+    Записи вставляются пакетами по BATCH_SIZE через executemany
+    вместе с обновлением дневных сводок, транзакция фиксируется
+    каждые TRANSACTION_SIZE записей.
+
+    Args:
+        database_name (str): Директория базы данных
+        src (TextIO): Поток для чтения.
+        fmt (str): Формат: "csv" или "jsonl".
+        user_ids (Optional[Iterable[int]]): Загружать только этих
+         пользователей (по умолчанию - всех).
+
+    Returns:
+        int: Количество загруженных записей.
+
+    Raises:
+        ValueError: Если в файле встретилась некорректная запись
+         (ее номер указывается в сообщении). Записи из уже
+         зафиксированных транзакций при этом сохраняются.
+    """
+    initialize_db(database_name)
+    allowed = None if user_ids is None else set(user_ids)
+    batches: dict[tuple[str, str], list[tuple]] = {}
+    count = 0
+
+    with ExitStack() as stack:
+        conns = {path: stack.enter_context(connection(path))
+                 for path in all_shard_paths(database_name)}
+
+        def flush(path: str, table: str) -> None:
+            fields = TABLE_FIELDS[table] + ("day",)
+            batch = batches.pop((path, table))
+            conns[path].executemany(
+                f"INSERT INTO {table} ({', '.join(fields)})"
+                f" VALUES ({', '.join('?' * len(fields))})",
+                [values + (date_to_day(values[1]),) for values in batch])
+            add_batch_to_summary(conns[path], table, batch)
+            add_batch_to_running_stats(conns[path], table, batch)
+            add_batch_to_sketch(conns[path], table, batch)
+
+        for number, record in enumerate(_read_records(src, fmt), 1):
+            try:
+                table, values = _parse_record(record)
+            except (KeyError, TypeError, ValueError) as e:
+                raise ValueError(f"Запись {number}: {e}") from e
+            if allowed is not None and values[0] not in allowed:
+                continue
+            key = (shard_path(database_name, values[0]), table)
+            batch = batches.setdefault(key, [])
+            batch.append(values)
+            count += 1
+            if len(batch) >= BATCH_SIZE:
+                flush(*key)
+            if count % TRANSACTION_SIZE == 0:
+                for conn in conns.values():
+                    conn.commit()
+        for key in list(batches):
+            flush(*key)
+    return count
+
+
+def _detect_format(path: str, fmt: Optional[str]) -> str:
+    """
+    Определяет формат файла по явному указанию или расширению.
+
+    Args:
+        path (str): Путь к файлу ("-" для stdin/stdout).
+        fmt (Optional[str]): Явно указанный формат.
+
+    Returns:
+        str: "csv" или "jsonl".
+    """
+    if fmt:
+        return fmt
+    return "csv" if path.lower().endswith(".csv") else "jsonl"
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    """
+    Точка входа командной строки.
+
+    Args:
+        argv (Optional[list[str]]): Аргументы (по умолчанию sys.argv).
+
+    Returns:
+        int: Код завершения.
+    """
+    from telegram_tracker_bot.config import DATABASE_NAME
+
+    parser = argparse.ArgumentParser(
+        prog="python -m telegram_tracker_bot.db.transfer",
+        description="Импорт и экспорт истории пользователей.")
+    parser.add_argument("command", choices=("export", "import"))
+    parser.add_argument("path", help='Файл или "-" для stdin/stdout')
+    parser.add_argument("--format", choices=("csv", "jsonl"),
+                        help="Формат файла (по умолчанию - по расширению)")
+    parser.add_argument("--user", type=int, action="append", dest="users",
+                        help="ID пользователя (можно указать несколько раз)")
+    parser.add_argument("--database", default=DATABASE_NAME,
+                        help="Файл базы данных")
+    args = parser.parse_args(argv)
+    fmt = _detect_format(args.path, args.format)
+
+    if args.command == "export":
+        if args.path == "-":
+            count = export_records(args.database, sys.stdout, fmt,
+                                   args.users)
+        else:
+            with open(args.path, "w", encoding="utf-8", newline="") as out:
+                count = export_records(args.database, out, fmt, args.users)
+        print(f"Выгружено записей: {count}", file=sys.stderr)
+    else:
+        try:
+            if args.path == "-":
+                count = import_records(args.database, sys.stdin, fmt,
+                                       args.users)
+            else:
+                with open(args.path, encoding="utf-8", newline="") as src:
+                    count = import_records(args.database, src, fmt,
+                                           args.users)
+        except ValueError as e:
+            print(f"Ошибка импорта: {e}", file=sys.stderr)
+            return 1
+        print(f"Загружено записей: {count}", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
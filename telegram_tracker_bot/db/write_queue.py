@@ -0,0 +1,307 @@
+"""
+Модуль очереди отложенной записи с групповой фиксацией (group commit).
+
+Обработчики /sleep, /calories и /workout не открывают собственную
+транзакцию, а ставят запись в асинхронную очередь. Фоновая задача
+собирает записи всех пользователей в пакет (до MAX_BATCH записей или
+MAX_DELAY секунд ожидания) и фиксирует пакет одной транзакцией
+в пуле потоков базы данных. Каждый вызывающий получает сохраненную
+запись только после того, как транзакция с ней зафиксирована.
+
+Ошибка одной записи не отменяет остальные записи пакета: каждая
+вставка выполняется внутри собственной точки сохранения (SAVEPOINT).
+Если база разделена на шарды, пакет фиксируется отдельной транзакцией
+в каждом затронутом шарде.
+"""
+
+import asyncio
+import logging
+import os
+import sqlite3
+from typing import Any, Callable, Optional, Union
+from .async_api import run_in_db_executor
+from .connection import connection
+from .database import insert_sleep, insert_calories, insert_workout
+from .records import Record, SleepRecord, CaloriesRecord, WorkoutRecord
+from .sharding import shard_path
+
+MAX_BATCH = 256
+MAX_DELAY = 0.005
+
+logger = logging.getLogger(__name__)
+
+_Writer = Callable[..., Record]
+
+
+class WriteQueueStopped(sqlite3.OperationalError):
+    """
+    Очередь записи остановилась раньше, чем запись была сохранена.
+
+    Наследует sqlite3.DatabaseError, поэтому обработчики команд
+    отвечают пользователю так же, как при ошибке самой базы.
+    """
+
+
+def _drain(queue: asyncio.Queue) -> list:
+    """
+    Извлекает из очереди все оставшиеся записи.
+
+    Args:
+        queue (asyncio.Queue): Очередь остановленной фоновой задачи.
+
+    Returns:
+        list: Элементы очереди (функция, аргументы, future).
+    """
+    items = []
+    while not queue.empty():
+        item = queue.get_nowait()
+        if item is not None:
+            items.append(item)
+    return items
+
+
+def _fail_pending(items: list) -> None:
+    """
+    Завершает ошибкой ожидание записей, которые не будут сохранены.
+
+    Вызывается при остановке фоновой задачи, в том числе аварийной,
+    чтобы вызывающие не ждали ответа бесконечно, а записи, попавшие
+    в очередь после остановки, не терялись молча.
+
+    Args:
+        items (list): Элементы очереди (функция, аргументы, future).
+    """
+    for _, _, future in items:
+        if not future.done():
+            future.set_exception(
+                WriteQueueStopped("Очередь записи остановлена"))
+
+
+class WriteQueue:
+    """
+    Очередь записей в одну базу данных с групповой фиксацией.
+
+    Фоновая задача запускается при первой записи и работает в том
+    цикле событий, из которого эта запись была сделана.
+    """
+
+    def __init__(self, database_dir: str, max_batch: int = MAX_BATCH,
+                 max_delay: float = MAX_DELAY) -> None:
+        """
+        Args:
+            database_dir (str): Директория базы данных
+            max_batch (int): Максимальное число записей в транзакции.
+            max_delay (float): Максимальное ожидание пополнения пакета, сек.
+        """
+        self.database_dir = database_dir
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+
+    async def add_sleep_record(self, user_id: int, date: str,
+                               hours: float) -> SleepRecord:
+        """
+        Ставит запись о сне в очередь и ждет ее фиксации.
+
+        Args:
+            user_id (int): ID-пользователя
+            date (str): Дата
+            hours (float): Время
+
+        Returns:
+            SleepRecord: Сохраненная запись.
+        """
+        return await self._submit(insert_sleep, user_id, date, hours)
+
+    async def add_calories_record(self, user_id: int, date: str,
+                                  amount: int) -> CaloriesRecord:
+        """
+        Ставит запись о калориях в очередь и ждет ее фиксации.
+
+        Args:
+            user_id (int): ID-пользователя
+            date (str): Дата
+            amount (int): Количество калорий
+
+        Returns:
+            CaloriesRecord: Сохраненная запись.
+        """
+        return await self._submit(insert_calories, user_id, date, amount)
+
+    async def add_workout_record(self, user_id: int, date: str,
+                                 duration_hours: float,
+                                 activity_type: str) -> WorkoutRecord:
+        """
+        Ставит запись о тренировке в очередь и ждет ее фиксации.
+
+        Args:
+            user_id (int): ID пользователя.
+            date (str): Дата тренировки в формате ГГГГ-ММ-ДД.
+            duration_hours (float): Длительность тренировки в часах.
+            activity_type (str): Тип активности.
+
+        Returns:
+            WorkoutRecord: Сохраненная запись.
+        """
+        return await self._submit(insert_workout, user_id, date,
+                                  duration_hours, activity_type)
+
+    async def _submit(self, writer: _Writer, *args: Any) -> Record:
+        """
+        Добавляет операцию записи в очередь и ждет подтверждения.
+
+        Args:
+            writer (Callable): Функция вставки из модуля database.
+            *args: Аргументы функции вставки (кроме подключения).
+
+        Returns:
+            Record: Сохраненная запись.
+
+        Raises:
+            sqlite3.DatabaseError: Если запись не удалось сохранить.
+            WriteQueueStopped: Если очередь остановилась раньше записи.
+        """
+        if self._task is None or self._task.done():
+            queue: asyncio.Queue = asyncio.Queue()
+            self._queue = queue
+            self._task = asyncio.create_task(self._run(queue))
+            self._task.add_done_callback(
+                lambda _: _fail_pending(_drain(queue)))
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((writer, args, future))
+        return await future
+
+    async def _run(self, queue: asyncio.Queue) -> None:
+        """
+        Собирает пакеты из очереди и фиксирует их до остановки.
+
+        Args:
+            queue (asyncio.Queue): Очередь этой фоновой задачи.
+        """
+        loop = asyncio.get_running_loop()
+        batch: list = []
+        stopping = False
+        try:
+            while not stopping:
+                item = await queue.get()
+                if item is None:
+                    break
+                batch = [item]
+                deadline = loop.time() + self.max_delay
+                while len(batch) < self.max_batch:
+                    try:
+                        item = queue.get_nowait()
+                    except asyncio.QueueEmpty:
+                        timeout = deadline - loop.time()
+                        if timeout <= 0:
+                            break
+                        try:
+                            item = await asyncio.wait_for(queue.get(),
+                                                          timeout)
+                        except asyncio.TimeoutError:
+                            break
+                    if item is None:
+                        stopping = True
+                        break
+                    batch.append(item)
+                await self._flush(batch)
+        finally:
+            _fail_pending(batch)
+
+    async def _flush(self, batch: list) -> None:
+        """
+        Фиксирует пакет в пуле потоков базы и оповещает вызывающих.
+
+        Args:
+            batch (list): Элементы очереди (функция, аргументы, future).
+        """
+        try:
+            outcomes = await run_in_db_executor(
+                self._write_batch,
+                [(writer, args) for writer, args, _ in batch])
+        except Exception as e:
+            logger.error("Ошибка фиксации пакета из %s записей: %s",
+                         len(batch), e)
+            outcomes = [e] * len(batch)
+        for (_, _, future), outcome in zip(batch, outcomes):
+            if future.done():
+                continue
+            if isinstance(outcome, Exception):
+                future.set_exception(outcome)
+            else:
+                future.set_result(outcome)
+
+    def _write_batch(self, operations: list[tuple[_Writer, tuple]])\
+            -> list[Union[Record, Exception]]:
+        """
+        Записывает пакет одной транзакцией на каждый шард.
+
+        Args:
+            operations (list): Пары (функция вставки, аргументы);
+             первый аргумент - ID пользователя.
+
+        Returns:
+            list[Union[Record, Exception]]: Для каждой записи
+             сохраненная запись или ошибка.
+        """
+        shards: dict[str, list[int]] = {}
+        for position, (_, args) in enumerate(operations):
+            path = shard_path(self.database_dir, args[0])
+            shards.setdefault(path, []).append(position)
+
+        outcomes: list[Union[Record, Exception]] = [None] * len(operations)
+        for path, positions in shards.items():
+            try:
+                with connection(path) as conn:
+                    conn.execute("BEGIN")
+                    for position in positions:
+                        writer, args = operations[position]
+                        conn.execute("SAVEPOINT record")
+                        try:
+                            outcomes[position] = writer(conn, *args)
+                        except Exception as e:
+                            conn.execute("ROLLBACK TO record")
+                            outcomes[position] = e
+                        conn.execute("RELEASE record")
+            except sqlite3.Error as e:
+                logger.error("Ошибка фиксации пакета в %s: %s", path, e)
+                for position in positions:
+                    outcomes[position] = e
+        return outcomes
+
+    async def close(self) -> None:
+        """Дописывает оставшиеся записи и останавливает фоновую задачу."""
+        if self._task is None or self._task.done():
+            return
+        await self._queue.put(None)
+        await self._task
+
+
+_queues: dict[str, WriteQueue] = {}
+
+
+def get_write_queue(database_dir: str) -> WriteQueue:
+    """
+    Возвращает очередь записи для файла базы данных.
+
+    Args:
+        database_dir (str): Директория базы данных
+
+    Returns:
+        WriteQueue: Очередь, общая для всех обработчиков.
+    """
+    key = os.path.abspath(database_dir)
+    write_queue = _queues.get(key)
+    if write_queue is None:
+        write_queue = WriteQueue(database_dir)
+        _queues[key] = write_queue
+    return write_queue
+
+
+async def close_write_queues() -> None:
+    """Дописывает и останавливает все очереди (при остановке бота)."""
+    queues = list(_queues.values())
+    _queues.clear()
+    for write_queue in queues:
+        await write_queue.close()
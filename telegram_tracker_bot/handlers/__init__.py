@@ -9,12 +9,15 @@ from .handlers import (
     record_calories,
     record_workout,
     show_stats,
+    show_trends,
+    show_percentiles,
     send_plot,
     send_advice,
     send_motivation,
     error_handler,
     parse_duration
 )
+from .jobs import archive_job, weekly_digest_job, resume_digest_job
 
 __all__ = [
     'start',
@@ -23,9 +26,14 @@ __all__ = [
     'record_calories',
     'record_workout',
     'show_stats',
+    'show_trends',
+    'show_percentiles',
     'send_plot',
     'send_advice',
     'send_motivation',
     'error_handler',
-    'parse_duration'
+    'parse_duration',
+    'archive_job',
+    'weekly_digest_job',
+    'resume_digest_job'
 ]
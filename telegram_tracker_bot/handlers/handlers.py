@@ -6,7 +6,10 @@
 - Запись данных о сне (/sleep)
 - Запись данных о потребленных калориях (/calories)
 - Запись данных о тренировках (/workout)
-- Отправка текстовой статистики за последние 7 дней (/stats)
+- Отправка текстовой статистики за последние N дней (/stats [ДНИ])
+- Отправка трендов за последние 30 дней (/trends)
+- Отправка квантилей записей всех пользователей администраторам
+  (/percentiles)
 - Генерация и отправка графика активности (/plot)
 - Получение и отправка советов от ИИ (/advice)
 - Отправка мотивационных сообщений (/motivation)
@@ -14,21 +17,38 @@
 - Логирование ошибок
 
 Используются внешние модули для работы с данными и интеграции с GigaChat.
+Запросы к базе данных выполняются в отдельном пуле потоков, а графики
+строятся в пуле процессов (модуль render_pool), чтобы не блокировать
+цикл событий бота.
 """
+import asyncio
 import logging
 import datetime
 import re
+from io import BytesIO
+from concurrent.futures.process import BrokenProcessPool
 from sqlite3 import DatabaseError
 from typing import Optional
 from telegram import Update, InputFile
+from telegram.error import BadRequest
 from telegram.ext import ContextTypes
 from telegram_tracker_bot.logic import format_timedelta
-from telegram_tracker_bot.db import (add_sleep_record, add_calories_record,
-                                     add_workout_record)
-from telegram_tracker_bot.logic import (get_weekly_stats_text,
-                                        plot_weekly_data,
+from telegram_tracker_bot.db import (get_storage, run_in_db_executor,
+                                     has_data)
+from telegram_tracker_bot.logic import (get_stats_text,
+                                        get_data_for_advice,
+                                        get_trends_text,
+                                        get_percentiles_text,
                                         get_random_motivation)
+from telegram_tracker_bot.logic.stats import MAX_STATS_DAYS
+from telegram_tracker_bot.logic.render_pool import (render_in_pool,
+                                                    RenderPoolBusy)
+from telegram_tracker_bot.logic.plot_cache import get_plot_cache
+from telegram_tracker_bot.logic.plotting import (get_weekly_renderer,
+                                                 weekly_plot_key)
 from telegram_tracker_bot.integrations import get_gigachat_advice
+from telegram_tracker_bot.config import (ADMIN_IDS, PLOT_ANNOTATIONS,
+                                         PLOT_RENDERER)
 
 logging.basicConfig(
     format='%(asctime)s'
@@ -87,7 +107,9 @@ async def start(update: Update) -> None:
         "🍎 /calories КОЛ-ВО - Записать калории\n (например /calories 1800)\n"
         "💪 /workout ЧАСЫ АКТИВНОСТЬ - Записать тренировку\n"
         " (например /workout 2:30 Вольная борьба)\n"
-        "📊 /stats - Показать статистику за 7 дней\n"
+        "📊 /stats [ДНИ] - Показать статистику (по умолчанию за 7 дней)\n"
+        " (например /stats 30)\n"
+        "📉 /trends - Показать тренды за 30 дней\n"
         "📈 /plot - Показать график за 7 дней\n"
         "💡 /advice - Получить совет от ИИ\n"
         "🚀 /motivation - Получить мотивационное сообщение\n"
@@ -111,7 +133,9 @@ async def help_command(update: Update,
         "/calories КОЛ-ВО - Записать калории (напр. /calories 1800)\n"
         "/workout ЧАСЫ АКТИВНОСТЬ - Записать тренировку"
         " (напр., /workout 1:30 Бег)\n"
-        "/stats - Показать статистику за 7 дней\n"
+        "/stats [ДНИ] - Показать статистику за N дней"
+        " (по умолчанию 7, напр. /stats 30)\n"
+        "/trends - Показать тренды за 30 дней\n"
         "/plot - Показать график за 7 дней\n"
         "/advice - Получить совет от ИИ\n"
         "/motivation - Получить мотивационное сообщение\n"
@@ -151,9 +175,8 @@ async def record_sleep(update: Update,
         return
 
     try:
-        add_sleep_record(user_id, today_str,
-                         hours,
-                         'telegram_tracker_bot/db/tracker_data_base.db')
+        await get_storage().async_add_sleep_record(user_id, today_str,
+                                                   hours)
         await update.message.reply_text(
             f"✅ Запись о сне ({format_timedelta(hours)})"
             f" на {today_str} добавлена!")
@@ -203,10 +226,8 @@ async def record_calories(update: Update,
         return
 
     try:
-        add_calories_record(user_id,
-                            today_str,
-                            amount,
-                            'telegram_tracker_bot/db/tracker_data_base.db')
+        await get_storage().async_add_calories_record(user_id, today_str,
+                                                      amount)
         await update.message.reply_text(
             f"✅ Запись о калориях ({amount} ккал)"
             f" на {today_str} добавлена!")
@@ -256,11 +277,8 @@ async def record_workout(update: Update,
         return
 
     try:
-        add_workout_record(user_id,
-                           today_str,
-                           duration_hours,
-                           activity_type,
-                           'telegram_tracker_bot/db/tracker_data_base.db')
+        await get_storage().async_add_workout_record(
+            user_id, today_str, duration_hours, activity_type)
         await update.message.reply_text(
             f"✅ Тренировка '{activity_type}'"
             f" ({format_timedelta(duration_hours)})"
@@ -279,16 +297,28 @@ async def record_workout(update: Update,
 async def show_stats(update: Update,
                      context: ContextTypes.DEFAULT_TYPE) -> None:
     """
-    Отправляет пользователю текстовую статистику за последние 7 дней.
+    Отправляет пользователю текстовую статистику за последние N дней
+    (по умолчанию 7).
 
     Args:
         update (Update): Объект обновления Telegram.
         context (ContextTypes.DEFAULT_TYPE) : объект состояния.
     """
-    _ = context
     user_id = update.effective_user.id
+    n_days = 7
+    if context.args:
+        try:
+            n_days = int(context.args[0])
+        except ValueError:
+            n_days = 0
+        if not 1 <= n_days <= MAX_STATS_DAYS:
+            await update.message.reply_text(
+                "Укажите количество дней от 1 до"
+                f" {MAX_STATS_DAYS}. Пример: /stats 30")
+            return
     try:
-        stats_text = get_weekly_stats_text(user_id)
+        stats_text = await run_in_db_executor(get_stats_text, user_id,
+                                              n_days)
         await update.message.reply_text(stats_text, parse_mode='HTML')
     except DatabaseError as e:
         logger.error("Ошибка при получении статистики"
@@ -298,6 +328,102 @@ async def show_stats(update: Update,
             " Попробуйте позже.")
 
 
+async def show_trends(update: Update,
+                      context: ContextTypes.DEFAULT_TYPE) -> None:
+    """
+    Отправляет пользователю тренды за последние 30 дней: скользящие
+    средние, изменение к прошлой неделе и серию дней с записями.
+
+    Args:
+        update (Update): Объект обновления Telegram.
+        context (ContextTypes.DEFAULT_TYPE) : объект состояния.
+    """
+    _ = context
+    user_id = update.effective_user.id
+    try:
+        trends_text = await run_in_db_executor(get_trends_text, user_id)
+        await update.message.reply_text(trends_text)
+    except DatabaseError as e:
+        logger.error("Ошибка при получении трендов"
+                     " для user %s: %s", user_id, e)
+        await update.message.reply_text(
+            "Не удалось получить тренды."
+            " Попробуйте позже.")
+
+
+async def show_percentiles(update: Update,
+                           context: ContextTypes.DEFAULT_TYPE) -> None:
+    """
+    Отправляет администратору квантили сна, калорий и тренировок
+    по записям всех пользователей.
+
+    Args:
+        update (Update): Объект обновления Telegram.
+        context (ContextTypes.DEFAULT_TYPE) : объект состояния.
+    """
+    _ = context
+    user_id = update.effective_user.id
+    if user_id not in ADMIN_IDS:
+        await update.message.reply_text(
+            "Команда доступна только администраторам.")
+        return
+    try:
+        percentiles_text = await run_in_db_executor(get_percentiles_text)
+        await update.message.reply_text(percentiles_text)
+    except DatabaseError as e:
+        logger.error("Ошибка при получении процентилей"
+                     " для user %s: %s", user_id, e)
+        await update.message.reply_text(
+            "Не удалось получить процентили."
+            " Попробуйте позже.")
+
+
+PLOT_CAPTION = "Ваш график активности за последние 7 дней."
+
+
+async def _reply_weekly_plot(update: Update, user_id: int,
+                             columns: dict) -> None:
+    """
+    Отправляет недельный график: по file_id, если такое же изображение
+    уже отправлялось, иначе загружает PNG из кэша изображений или
+    построенный в пуле процессов и запоминает полученный file_id.
+
+    Args:
+        update (Update): Объект обновления Telegram.
+        user_id (int): ID пользователя.
+        columns (dict): Дневные столбцы за 7 дней.
+    """
+    cache = get_plot_cache()
+    key = weekly_plot_key(user_id, columns, PLOT_ANNOTATIONS, PLOT_RENDERER)
+    file_id = await asyncio.to_thread(cache.get_file_id, key)
+    if file_id is not None:
+        try:
+            await update.message.reply_photo(photo=file_id,
+                                             caption=PLOT_CAPTION)
+            return
+        except BadRequest as e:
+            logger.warning("file_id графика больше не принимается: %s", e)
+            await asyncio.to_thread(cache.forget_file_id, key)
+
+    image = await asyncio.to_thread(cache.get, key)
+    if image is None:
+        plot_buffer = await render_in_pool(
+            get_weekly_renderer(PLOT_RENDERER), user_id, columns,
+            PLOT_ANNOTATIONS)
+        image = plot_buffer.getvalue()
+        await asyncio.to_thread(cache.put, key, image)
+    message = await update.message.reply_photo(
+        photo=InputFile(
+            BytesIO(image),
+            filename=f'stats_{user_id}_{datetime.date.today()}.png'
+        ),
+        caption=PLOT_CAPTION)
+    if message.photo:
+        # последний размер - исходное изображение
+        await asyncio.to_thread(cache.put_file_id, key,
+                                message.photo[-1].file_id)
+
+
 async def send_plot(update: Update,
                     context: ContextTypes.DEFAULT_TYPE) -> None:
     """
@@ -313,20 +439,20 @@ async def send_plot(update: Update,
     await update.message.reply_text("📈 Генерирую график...")
 
     try:
-        plot_buffer = plot_weekly_data(user_id)
-        if plot_buffer:
-            await update.message.reply_photo(
-                photo=InputFile(
-                    plot_buffer,
-                    filename=f'stats_{user_id}_{datetime.date.today()}.png'
-                ),
-                caption="Ваш график активности за последние 7 дней.")
+        columns = await run_in_db_executor(
+            get_storage().get_daily_columns_last_n_days, user_id, 7)
+        if has_data(columns):
+            await _reply_weekly_plot(update, user_id, columns)
         else:
             await update.message.reply_text(
                 "Нет данных для построения графика за последние 7 дней."
                 " Запишите данные с помощью команд"
                 " /sleep, /calories, /workout.")
-    except DatabaseError as e:
+    except RenderPoolBusy:
+        await update.message.reply_text(
+            "⏳ Сейчас строится много графиков."
+            " Попробуйте через минуту.")
+    except (DatabaseError, BrokenProcessPool) as e:
         logger.error("Ошибка при генерации"
                      " графика для user %s: %s", user_id, e)
         await update.message.reply_text(
@@ -349,7 +475,8 @@ async def send_advice(update: Update,
     await update.message.reply_text("💡 Запрашиваю совет у ИИ...")
 
     try:
-        advice = get_gigachat_advice(user_id)
+        data = await run_in_db_executor(get_data_for_advice, user_id)
+        advice = await asyncio.to_thread(get_gigachat_advice, user_id, data)
         if advice:
             await update.message.reply_text(
                 f"🧠 Совет от GigaChat:"
@@ -0,0 +1,140 @@
+"""
+Модуль фоновых задач бота, запускаемых по расписанию через JobQueue.
+
+Задачи:
+- archive_job: ежедневный перенос старых записей в архив
+- weekly_digest_job: еженедельная рассылка сводки активным
+  пользователям
+- resume_digest_job: продолжение прерванной рассылки при запуске бота
+
+Рассылка отправляет не больше DIGEST_MESSAGES_PER_SECOND сообщений
+в секунду (лимит Telegram - около 30) и после каждого сообщения
+сохраняет отметку прогресса, поэтому после перезапуска бота она
+продолжается со следующего пользователя, а не начинается заново.
+"""
+
+import asyncio
+import datetime
+import logging
+from typing import Optional
+from telegram import Bot
+from telegram.error import Forbidden, RetryAfter, TelegramError
+from telegram.ext import ContextTypes
+from telegram_tracker_bot.config import (ARCHIVE_HORIZON_DAYS,
+                                         ARCHIVE_COMPRESS)
+from telegram_tracker_bot.db import get_storage, run_in_db_executor
+from telegram_tracker_bot.logic.digest import (DIGEST_BATCH_SIZE,
+                                               digest_week,
+                                               get_digest_user_ids,
+                                               build_digest_batch)
+
+DIGEST_MESSAGES_PER_SECOND = 25
+
+logger = logging.getLogger(__name__)
+
+
+async def archive_job(context: ContextTypes.DEFAULT_TYPE) -> None:
+    """
+    Переносит записи старше горизонта в архив.
+
+    Args:
+        context (ContextTypes.DEFAULT_TYPE) : объект состояния.
+    """
+    _ = context
+    moved = await run_in_db_executor(get_storage().archive_old_records,
+                                     ARCHIVE_HORIZON_DAYS, ARCHIVE_COMPRESS)
+    logger.info("Перенесено в архив записей: %s", moved)
+
+
+async def _send_digest(bot: Bot, user_id: int, text: str) -> bool:
+    """
+    Отправляет сводку пользователю, повторяя попытку один раз после
+    ответа Telegram о превышении лимита.
+
+    Args:
+        bot (Bot): Бот.
+        user_id (int): ID пользователя (совпадает с ID личного чата).
+        text (str): Текст сводки.
+
+    Returns:
+        bool: Отправлено ли сообщение.
+    """
+    for _ in range(2):
+        try:
+            await bot.send_message(chat_id=user_id, text=text)
+            return True
+        except RetryAfter as e:
+            delay = e.retry_after
+            if isinstance(delay, datetime.timedelta):
+                delay = delay.total_seconds()
+            await asyncio.sleep(delay)
+        except Forbidden:
+            logger.info("Пользователь %s заблокировал бота", user_id)
+            return False
+        except TelegramError as e:
+            logger.warning("Не удалось отправить сводку"
+                           " user %s: %s", user_id, e)
+            return False
+    return False
+
+
+async def run_digest(bot: Bot, resume_only: bool = False) -> int:
+    """
+    Рассылает недельную сводку, продолжая с последней отметки.
+
+    Args:
+        bot (Bot): Бот.
+        resume_only (bool): Только продолжить начатую и незавершенную
+         рассылку этой недели.
+
+    Returns:
+        int: Количество сводок, отправленных за этот запуск.
+    """
+    storage = get_storage()
+    week = digest_week()
+    progress = await run_in_db_executor(storage.get_digest_progress, week)
+    last_user_id: Optional[int] = None
+    sent = 0
+    if progress is not None:
+        last_user_id, sent, finished = progress
+        if finished:
+            return 0
+    elif resume_only:
+        return 0
+
+    user_ids = await run_in_db_executor(get_digest_user_ids, last_user_id)
+    sent_now = 0
+    for start in range(0, len(user_ids), DIGEST_BATCH_SIZE):
+        batch = await run_in_db_executor(
+            build_digest_batch, user_ids[start:start + DIGEST_BATCH_SIZE])
+        for user_id, text in batch:
+            if await _send_digest(bot, user_id, text):
+                sent_now += 1
+            last_user_id = user_id
+            await run_in_db_executor(storage.save_digest_progress, week,
+                                     last_user_id, sent + sent_now, False)
+            await asyncio.sleep(1 / DIGEST_MESSAGES_PER_SECOND)
+    await run_in_db_executor(storage.save_digest_progress, week,
+                             last_user_id or 0, sent + sent_now, True)
+    logger.info("Недельная сводка отправлена: %s", sent + sent_now)
+    return sent_now
+
+
+async def weekly_digest_job(context: ContextTypes.DEFAULT_TYPE) -> None:
+    """
+    Рассылает недельную сводку активным пользователям.
+
+    Args:
+        context (ContextTypes.DEFAULT_TYPE) : объект состояния.
+    """
+    await run_digest(context.bot)
+
+
+async def resume_digest_job(context: ContextTypes.DEFAULT_TYPE) -> None:
+    """
+    Продолжает рассылку этой недели, если она была прервана.
+
+    Args:
+        context (ContextTypes.DEFAULT_TYPE) : объект состояния.
+    """
+    await run_digest(context.bot, resume_only=True)
@@ -2,6 +2,7 @@
 Оформляет модуль логики интеграции GigaChat в ТГ-Бота.
 """
 
+from typing import Optional
 from langchain_gigachat import GigaChat
 from langchain_core.prompts import PromptTemplate
 from telegram_tracker_bot.logic import get_data_for_advice
@@ -37,17 +38,20 @@ ID пользователя: {user_id}
 )
 
 
-def get_gigachat_advice(user_id: int) -> str:
+def get_gigachat_advice(user_id: int, data: Optional[dict] = None) -> str:
     """
     Получает ответ AI для пользователя на основе его данных.
 
     Args:
         user_id: int - ID пользователя
+        data: Optional[dict] - данные из get_data_for_advice, если они
+         уже получены (иначе запрашиваются из базы)
 
     Returns:
         str: совет для пользователя
     """
-    data = get_data_for_advice(user_id)
+    if data is None:
+        data = get_data_for_advice(user_id)
 
     sleep_data = (
         "\n".join(f"- {date}:"
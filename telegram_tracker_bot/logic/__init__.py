@@ -2,15 +2,33 @@
 Оформляет модуль с логикой команд ТГ-Бота.
 """
 
-from .plotting import plot_weekly_data
+from .plotting import plot_weekly_data, render_weekly_plot
+from .fast_plotting import render_weekly_plot_fast
 from .motivation import get_random_motivation
+from .trends import (rolling_mean, logging_streaks, compute_trends,
+                     get_trends_text)
+from .digest import digest_week, get_digest_user_ids, build_digest_batch
 
 from .stats import (
     format_timedelta,
+    format_calories,
+    format_change,
     get_weekly_stats_text,
+    get_stats_text,
+    format_stats_text,
     get_data_for_advice,
+    get_percentiles_text,
+    stats_cache_info,
 )
 
-__all__ = ['plot_weekly_data', 'get_random_motivation',
-           'format_timedelta', 'get_weekly_stats_text',
-           'get_data_for_advice']
+__all__ = ['plot_weekly_data', 'render_weekly_plot',
+           'render_weekly_plot_fast',
+           'get_random_motivation',
+           'rolling_mean', 'logging_streaks', 'compute_trends',
+           'get_trends_text',
+           'digest_week', 'get_digest_user_ids', 'build_digest_batch',
+           'format_timedelta', 'format_calories', 'format_change',
+           'get_weekly_stats_text', 'get_stats_text',
+           'format_stats_text',
+           'get_data_for_advice', 'get_percentiles_text',
+           'stats_cache_info']
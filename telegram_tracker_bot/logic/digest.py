@@ -0,0 +1,81 @@
+"""
+Модуль недельной сводки для всех активных пользователей.
+
+Отчеты строятся пакетами по DIGEST_BATCH_SIZE пользователей: сводки
+дней и статистика за все время пакета читаются одним запросом
+на шард (см. get_daily_summaries_for_users), а не по запросу
+на пользователя. Отправку сообщений и отметки прогресса выполняет
+задача weekly_digest_job модуля jobs.
+
+Функции:
+- digest_week(today) -> int:
+    Номер дня понедельника недели рассылки.
+- get_digest_user_ids(after_user_id) -> list[int]:
+    Активные за DIGEST_DAYS дней пользователи с ID больше данного.
+- build_digest_batch(user_ids) -> list[tuple[int, str]]:
+    Тексты сводок пакета пользователей.
+"""
+
+import datetime
+from typing import Optional
+from telegram_tracker_bot.db import (get_storage, date_to_day,
+                                     totals_from_summary)
+from .stats import format_stats_text
+
+DIGEST_DAYS = 7
+DIGEST_BATCH_SIZE = 500
+DIGEST_TITLE = "🗓 Итоги недели\n\n"
+
+
+def digest_week(today: Optional[datetime.date] = None) -> int:
+    """
+    Возвращает неделю рассылки - номер дня ее понедельника.
+
+    Args:
+        today (Optional[datetime.date]): Дата (по умолчанию сегодня).
+
+    Returns:
+        int: Номер дня (см. модуль days).
+    """
+    today = today or datetime.date.today()
+    return date_to_day(today - datetime.timedelta(days=today.weekday()))
+
+
+def get_digest_user_ids(after_user_id: Optional[int] = None) -> list[int]:
+    """
+    Возвращает получателей сводки: пользователей с записями
+    за последние DIGEST_DAYS дней.
+
+    Args:
+        after_user_id (Optional[int]): Пропустить пользователей с ID
+         не больше данного (уже получивших сводку).
+
+    Returns:
+        list[int]: ID пользователей по возрастанию.
+    """
+    user_ids = get_storage().get_active_user_ids(DIGEST_DAYS)
+    if after_user_id is None:
+        return user_ids
+    return [user_id for user_id in user_ids if user_id > after_user_id]
+
+
+def build_digest_batch(user_ids: list[int]) -> list[tuple[int, str]]:
+    """
+    Строит сводки за последние DIGEST_DAYS дней для пакета
+    пользователей.
+
+    Args:
+        user_ids (list[int]): ID пользователей пакета.
+
+    Returns:
+        list[tuple[int, str]]: Пары (ID пользователя, текст сводки)
+         в порядке user_ids.
+    """
+    storage = get_storage()
+    summaries = storage.get_daily_summaries_for_users(user_ids, DIGEST_DAYS)
+    usual = storage.get_running_stats_for_users(user_ids)
+    sketches = storage.get_quantile_sketches()
+    return [(user_id, DIGEST_TITLE + format_stats_text(
+                DIGEST_DAYS, totals_from_summary(summaries[user_id]),
+                summaries[user_id], usual[user_id], sketches))
+            for user_id in user_ids]
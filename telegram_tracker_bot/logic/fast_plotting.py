@@ -0,0 +1,362 @@
+"""
+Быстрая отрисовка недельного графика без matplotlib.
+
+График из семи точек рисуется напрямую библиотекой Pillow: те же
+три панели (сон, калории, тренировки), что и у plot_weekly_data,
+с тем же размером изображения, полями, пределами осей и подписями.
+Вместо сглаживания и раскладки matplotlib здесь только прямые
+вызовы ImageDraw, поэтому график строится в несколько раз быстрее,
+а matplotlib не нужно импортировать.
+
+Расположение осей повторяет шаблон модуля plotting: фигура 10x12
+дюймов при 100 точках на дюйм, поля subplots_adjust и пределы осей
+по правилам autoscale matplotlib (поля 5% от диапазона данных,
+у столбцов нижний предел 0). Совпадение раскладки проверяют тесты
+tests/test_fast_plotting.py. Отличия: линии без сглаживания,
+легенда выбирает угол оси только по маркерам и столбцам.
+
+Функции:
+- render_weekly_plot_fast(user_id: int, columns: dict,
+                          annotate: bool) -> BytesIO | None:
+    Строит недельный график по дневным столбцам пользователя.
+"""
+
+import functools
+from io import BytesIO
+from typing import Optional
+import numpy as np
+from PIL import Image, ImageDraw, ImageFont
+from telegram_tracker_bot.db import has_data
+from .stats import format_timedelta
+
+# Параметры отрисовки входят в ключ кэша; version нужно увеличить
+# при любом изменении внешнего вида графика.
+FAST_RENDER_OPTIONS = {"size": (1000, 1200), "format": "png",
+                       "renderer": "pillow", "version": 1}
+FONT_NAME = "DejaVuSans.ttf"
+
+# Раскладка как у шаблона plotting._WeeklyFigure (в пикселях при 100 dpi)
+_WIDTH, _HEIGHT = FAST_RENDER_OPTIONS["size"]
+_LEFT, _RIGHT = 0.1 * _WIDTH, 0.97 * _WIDTH
+_TOP, _BOTTOM = (1 - 0.94) * _HEIGHT, (1 - 0.08) * _HEIGHT
+_HSPACE = 0.1
+_AXES_HEIGHT = (_BOTTOM - _TOP) / (3 + 2 * _HSPACE)
+_MARGIN = 0.05
+_BAR_WIDTH = 0.8
+_TICK = 5
+_PAD = 5
+
+_BLACK = (0, 0, 0)
+_WHITE = (255, 255, 255)
+_GRID = (208, 208, 208)
+_LEGEND_EDGE = (204, 204, 204)
+_BLUE = (0, 0, 255)
+_RED = (255, 0, 0)
+# цвет green с прозрачностью 0.7 на белом фоне
+_BAR = (77, 166, 77)
+
+
+@functools.lru_cache(maxsize=None)
+def _font(size: int) -> ImageFont.ImageFont:
+    """Возвращает шрифт с кириллицей (или встроенный шрифт Pillow)."""
+    try:
+        return ImageFont.truetype(FONT_NAME, size)
+    except OSError:
+        return ImageFont.load_default(size)
+
+
+def _limits(values: np.ndarray,
+            sticky: Optional[float] = None) -> tuple[float, float]:
+    """
+    Вычисляет пределы оси как autoscale matplotlib.
+
+    Args:
+        values (np.ndarray): Значения на оси (NaN пропускаются).
+        sticky (Optional[float]): Значение, за которое поле
+         не выходит (у столбцов - 0).
+
+    Returns:
+        tuple[float, float]: Нижний и верхний пределы.
+    """
+    finite = values[np.isfinite(values)]
+    if sticky is not None:
+        # столбцы начинаются от sticky, он входит в пределы данных
+        finite = np.append(finite, sticky)
+    if finite.size:
+        low, high = float(finite.min()), float(finite.max())
+    else:
+        low = high = 0.0
+    if high - low <= max(abs(low), abs(high)) * 1e-12:
+        if high == 0:
+            low, high = -_MARGIN, _MARGIN
+        else:
+            low, high = low - _MARGIN * abs(low), high + _MARGIN * abs(high)
+    delta = (high - low) * _MARGIN
+    bottom = low - delta
+    if sticky is not None and sticky <= low:
+        bottom = max(bottom, sticky)
+    return bottom, high + delta
+
+
+def _ticks(low: float, high: float, max_ticks: int = 9) -> np.ndarray:
+    """Возвращает круглые значения делений в пределах оси."""
+    raw = (high - low) / max_ticks
+    magnitude = 10 ** np.floor(np.log10(raw))
+    step = next(magnitude * step for step in (1, 2, 2.5, 5, 10)
+                if magnitude * step >= raw)
+    first = np.ceil(low / step - 1e-9) * step
+    return np.arange(first, high + step * 1e-9, step)
+
+
+def _format_hours(value: float) -> str:
+    """Форматирует часы для оси и подписей (пусто для NaN)."""
+    return format_timedelta(value) if not np.isnan(value) else ""
+
+
+def _format_number(value: float) -> str:
+    """Форматирует деление оси калорий."""
+    return f"{value:.0f}" if float(value).is_integer() else f"{value:g}"
+
+
+class _Panel:
+    """Одна ось графика: перевод значений в пиксели и отрисовка."""
+
+    def __init__(self, image: Image.Image, row: int,
+                 y_limits: tuple[float, float]) -> None:
+        self.image = image
+        self.draw = ImageDraw.Draw(image)
+        self.top = _TOP + row * _AXES_HEIGHT * (1 + _HSPACE)
+        self.bottom = self.top + _AXES_HEIGHT
+        self.y_low, self.y_high = y_limits
+        # Занятые данными прямоугольники: легенда их по возможности обходит
+        self.occupied: list[tuple[float, float, float, float]] = []
+
+    @staticmethod
+    def x(day: float) -> float:
+        """Пиксель по X для номера дня (0..6)."""
+        low = -_BAR_WIDTH / 2 - (6 + _BAR_WIDTH) * _MARGIN
+        high = 6 - low
+        return _LEFT + (day - low) / (high - low) * (_RIGHT - _LEFT)
+
+    def y(self, value: float) -> float:
+        """Пиксель по Y для значения."""
+        share = (value - self.y_low) / (self.y_high - self.y_low)
+        return self.bottom - share * _AXES_HEIGHT
+
+    def frame(self, ylabel: str, formatter) -> None:
+        """Рисует сетку, деления и подписи делений оси Y."""
+        image = self.image
+        widest = 0
+        top = round(self.top)
+        vertical = _dashes(round(self.bottom) - top, vertical=True)
+        for day in range(7):
+            x = self.x(day)
+            image.paste(_GRID, (round(x), top), vertical)
+            self.draw.line([(x, self.bottom), (x, self.bottom + _TICK)],
+                           fill=_BLACK)
+        for value in _ticks(self.y_low, self.y_high):
+            y = self.y(value)
+            image.paste(_GRID, (round(_LEFT), round(y)),
+                        _dashes(round(_RIGHT - _LEFT), vertical=False))
+            self.draw.line([(_LEFT - _TICK, y), (_LEFT, y)], fill=_BLACK)
+            text = formatter(value)
+            width, _ = _text(image, text, _LEFT - _TICK - _PAD, y, "rm")
+            widest = max(widest, width)
+        _text(image, ylabel, _LEFT - _TICK - 2 * _PAD - widest,
+              (self.top + self.bottom) / 2, "rm", angle=90)
+
+    def line(self, values: np.ndarray, color: tuple[int, int, int],
+             marker: str) -> None:
+        """Рисует линию с маркерами (NaN разрывает линию)."""
+        points = [(self.x(day), self.y(value)) if np.isfinite(value)
+                  else None for day, value in enumerate(values)]
+        for start, end in zip(points, points[1:]):
+            if start is not None and end is not None:
+                self.draw.line([start, end], fill=color, width=2)
+        for point in points:
+            if point is not None:
+                _marker(self.draw, point, color, marker)
+                self.occupied.append((point[0] - 4, point[1] - 4,
+                                      point[0] + 4, point[1] + 4))
+
+    def bars(self, values: np.ndarray) -> None:
+        """Рисует столбцы тренировок."""
+        for day, value in enumerate(values):
+            if np.isfinite(value) and value > 0:
+                box = (self.x(day - _BAR_WIDTH / 2), self.y(value),
+                       self.x(day + _BAR_WIDTH / 2), self.y(0))
+                self.draw.rectangle(box, fill=_BAR)
+                self.occupied.append(box)
+
+    def border(self) -> None:
+        """Рисует рамку оси поверх линий и столбцов."""
+        self.draw.rectangle([_LEFT, self.top, _RIGHT, self.bottom],
+                            outline=_BLACK)
+
+    def labels(self, values: np.ndarray, texts: list[str]) -> None:
+        """Подписывает значения над точками."""
+        for day, (value, text) in enumerate(zip(values, texts)):
+            if text:
+                _text(self.image, text, self.x(day), self.y(value) - 7,
+                      "mb")
+
+    def _overlap(self, box: tuple[float, float, float, float]) -> int:
+        """Считает элементы данных, которые закрыла бы легенда."""
+        left, top, right, bottom = box
+        return sum(1 for x0, y0, x1, y1 in self.occupied
+                   if x0 < right and left < x1 and y0 < bottom and top < y1)
+
+    def legend(self, label: str, color: tuple[int, int, int],
+               marker: Optional[str]) -> None:
+        """
+        Рисует легенду в том углу оси, где она закрывает меньше данных
+        (углы перебираются в порядке loc="best" matplotlib).
+        """
+        width = 48 + _text_mask(label, 14, 0).width
+        corners = [(_RIGHT - 7 - width, self.top + 7),
+                   (_LEFT + 7, self.top + 7),
+                   (_LEFT + 7, self.bottom - 33),
+                   (_RIGHT - 7 - width, self.bottom - 33)]
+        left, top = min(corners, key=lambda corner: self._overlap(
+            (corner[0], corner[1], corner[0] + width, corner[1] + 26)))
+        self.draw.rectangle([left, top, left + width, top + 26],
+                            fill=_WHITE, outline=_LEGEND_EDGE)
+        middle = top + 13
+        if marker is None:
+            self.draw.rectangle([left + 8, middle - 5, left + 36,
+                                 middle + 5], fill=_BAR)
+        else:
+            self.draw.line([(left + 8, middle), (left + 36, middle)],
+                           fill=color, width=2)
+            _marker(self.draw, (left + 22, middle), color, marker)
+        _text(self.image, label, left + 42, middle, "lm")
+
+
+@functools.lru_cache(maxsize=None)
+def _dashes(length: int, vertical: bool) -> Image.Image:
+    """Маска пунктирной линии сетки: штрихи по 4 пикселя через 2."""
+    mask = np.where(np.arange(length) % 6 < 4, 255, 0).astype(np.uint8)
+    return Image.fromarray(mask.reshape((length, 1) if vertical
+                                        else (1, length)))
+
+
+def _marker(draw: ImageDraw.ImageDraw, point: tuple[float, float],
+            color: tuple[int, int, int], marker: str) -> None:
+    """Рисует круглый ("o") или квадратный ("s") маркер."""
+    x, y = point
+    box = [x - 4, y - 4, x + 4, y + 4]
+    if marker == "o":
+        draw.ellipse(box, fill=color)
+    else:
+        draw.rectangle(box, fill=color)
+
+
+@functools.lru_cache(maxsize=1024)
+def _text_mask(text: str, size: int, angle: float) -> Image.Image:
+    """
+    Возвращает маску текста, обрезанную по его границам.
+
+    Подписи (даты, деления, значения) повторяются от графика
+    к графику, поэтому готовые маски кэшируются.
+    """
+    font = _font(size)
+    left, top, right, bottom = font.getbbox(text)
+    mask = Image.new("L", (max(right - left, 1), max(bottom - top, 1)))
+    ImageDraw.Draw(mask).text((-left, -top), text, fill=255, font=font)
+    if angle:
+        mask = mask.rotate(angle, resample=Image.Resampling.BICUBIC,
+                           expand=True)
+    return mask
+
+
+def _text(image: Image.Image, text: str, x: float, y: float, anchor: str,
+          size: int = 14, angle: float = 0) -> tuple[int, int]:
+    """
+    Рисует черный текст.
+
+    Args:
+        image (Image.Image): Изображение графика.
+        text (str): Текст.
+        x (float): Координата X точки привязки.
+        y (float): Координата Y точки привязки.
+        anchor (str): Привязка границ текста к точке: по горизонтали
+         "l", "m" или "r", по вертикали "t", "m" или "b" (как у Pillow).
+        size (int): Размер шрифта в пикселях.
+        angle (float): Угол поворота против часовой стрелки.
+
+    Returns:
+        tuple[int, int]: Ширина и высота текста в пикселях.
+    """
+    mask = _text_mask(text, size, angle)
+    width, height = mask.size
+    shift = {"l": 0, "m": 0.5, "r": 1, "t": 0, "b": 1}
+    image.paste(_BLACK, (round(x - width * shift[anchor[0]]),
+                         round(y - height * shift[anchor[1]])), mask)
+    return width, height
+
+
+def render_weekly_plot_fast(user_id: int, columns: dict[str, np.ndarray],
+                            annotate: bool = True) -> Optional[BytesIO]:
+    """
+    Строит недельный график по дневным столбцам пользователя
+    средствами Pillow.
+
+    Args:
+        user_id (int): Идентификатор пользователя.
+        columns (dict[str, np.ndarray]): Столбцы date, sleep, calories
+         и workouts за 7 дней (результат get_daily_columns_last_n_days).
+        annotate (bool): Подписывать ли значения над точками.
+
+    Returns:
+        Optional[BytesIO]: График в формате PNG или None,
+         если данных нет.
+    """
+    if not has_data(columns):
+        return None
+    sleep_values = np.asarray(columns["sleep"], dtype=float)
+    calories_values = np.asarray(columns["calories"], dtype=float)
+    workout_values = np.asarray(columns["workouts"], dtype=float)
+
+    image = Image.new("RGB", (_WIDTH, _HEIGHT), _WHITE)
+    _text(image, f"Недельная активность (ID: {user_id})", _WIDTH / 2,
+          0.02 * _HEIGHT, "mt", size=22)
+
+    sleep = _Panel(image, 0, _limits(sleep_values))
+    sleep.frame("Часы сна", _format_hours)
+    sleep.line(sleep_values, _BLUE, "o")
+    calories = _Panel(image, 1, _limits(calories_values))
+    calories.frame("Калории (ккал)", _format_number)
+    calories.line(calories_values, _RED, "s")
+    workouts = _Panel(image, 2, _limits(workout_values, sticky=0.0))
+    workouts.frame("Часы тренировок", _format_hours)
+    workouts.bars(workout_values)
+    for panel in (sleep, calories, workouts):
+        panel.border()
+    if annotate:
+        sleep.labels(sleep_values,
+                     [_format_hours(value) for value in sleep_values])
+        calories.labels(calories_values,
+                        [f"{int(value)}" if not np.isnan(value) else ""
+                         for value in calories_values])
+        workouts.labels(workout_values,
+                        [_format_hours(value) if value > 0 else ""
+                         for value in workout_values])
+    sleep.legend("Сон (часы)", _BLUE, "o")
+    calories.legend("Калории (ккал)", _RED, "s")
+    workouts.legend("Тренировки (часы)", _BAR, None)
+
+    # Даты под нижней осью повернуты на 30 градусов, как autofmt_xdate
+    dates_top = workouts.bottom + _TICK + _PAD
+    dates_height = max(
+        _text(image, str(np.datetime64(date, "D")), _Panel.x(day),
+              dates_top, "rt", angle=30)[1]
+        for day, date in enumerate(columns["date"]))
+    _text(image, "Дата", (_LEFT + _RIGHT) / 2,
+          dates_top + dates_height + _PAD, "mt")
+
+    buf = BytesIO()
+    # Быстрое сжатие: на плоских заливках графика файл лишь немного
+    # больше, чем при уровне по умолчанию, а кодирование вдвое быстрее
+    image.save(buf, format=FAST_RENDER_OPTIONS["format"], compress_level=1)
+    buf.seek(0)
+    return buf
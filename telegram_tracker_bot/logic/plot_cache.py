@@ -0,0 +1,291 @@
+"""
+Кэш готовых изображений графиков.
+
+Ключ изображения - хеш SHA-256 от всего, что влияет на картинку:
+ID пользователя (он есть в заголовке), длины окна, дневных столбцов
+графика (даты и значения, выровненные по дням) и параметров
+отрисовки. Пока неделя пользователя не изменилась, повторный /plot
+(в том числе в групповом чате) отдает уже построенный PNG без
+отрисовки, а любая новая запись меняет столбцы и тем самым ключ -
+явная инвалидация не нужна.
+
+Два уровня:
+- память процесса: до max_items изображений, вытесняется давно
+  не запрошенное (LRU);
+- каталог на диске: файл <ключ>.png, общий для перезапусков бота;
+  при превышении max_disk_bytes удаляются файлы с самым старым
+  временем последнего обращения (mtime обновляется при чтении).
+
+Для каждого изображения, уже отправленного в Telegram, кэш хранит
+file_id фотографии (в памяти и в файле <ключ>.fileid рядом с PNG):
+повторная отправка по file_id не загружает файл заново. Файл file_id
+удаляется вместе с изображением.
+
+Общий кэш возвращает get_plot_cache: каталог и его размер задаются
+переменными PLOT_CACHE_DIR (пустая строка отключает диск)
+и PLOT_CACHE_MAX_BYTES в конфигурации.
+"""
+
+import hashlib
+import logging
+import os
+import threading
+from collections import OrderedDict
+from typing import Optional
+import numpy as np
+
+MAX_MEMORY_PLOTS = 256
+MAX_MEMORY_FILE_IDS = 4096
+
+logger = logging.getLogger(__name__)
+
+
+def plot_cache_key(user_id: int, n_days: int,
+                   columns: dict[str, np.ndarray], options: dict) -> str:
+    """
+    Вычисляет ключ изображения графика.
+
+    Args:
+        user_id (int): Идентификатор пользователя.
+        n_days (int): Длина окна в днях.
+        columns (dict[str, np.ndarray]): Дневные столбцы графика.
+        options (dict): Параметры отрисовки (размер, формат и т. п.).
+
+    Returns:
+        str: Шестнадцатеричный хеш SHA-256.
+    """
+    digest = hashlib.sha256()
+    digest.update(repr((user_id, n_days, sorted(options.items()))).encode())
+    for name in sorted(columns):
+        values = np.ascontiguousarray(columns[name])
+        digest.update(f"{name}:{values.dtype.str}:{values.shape}".encode())
+        digest.update(values.tobytes())
+    return digest.hexdigest()
+
+
+class PlotCache:
+    """Кэш изображений в памяти с дополнительным уровнем на диске."""
+
+    def __init__(self, directory: Optional[str] = None,
+                 max_items: int = MAX_MEMORY_PLOTS,
+                 max_disk_bytes: int = 64 * 1024 * 1024) -> None:
+        self.directory = directory
+        self.max_items = max_items
+        self.max_disk_bytes = max_disk_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._memory: OrderedDict[str, bytes] = OrderedDict()
+        self._file_ids: OrderedDict[str, str] = OrderedDict()
+        # Размер каталога считается при первом обращении к диску
+        self._disk_bytes: Optional[int] = None
+
+    def __len__(self) -> int:
+        return len(self._memory)
+
+    def _path(self, key: str, ext: str = "png") -> str:
+        """Возвращает путь к файлу изображения (или его file_id)."""
+        return os.path.join(self.directory, f"{key}.{ext}")
+
+    def _remember(self, key: str, image: bytes) -> None:
+        """Помещает изображение в память, вытесняя самое старое."""
+        self._memory[key] = image
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_items:
+            self._memory.popitem(last=False)
+
+    def get(self, key: str) -> Optional[bytes]:
+        """
+        Возвращает изображение по ключу.
+
+        Args:
+            key (str): Ключ из plot_cache_key.
+
+        Returns:
+            Optional[bytes]: PNG или None, если изображения нет.
+        """
+        with self._lock:
+            image = self._memory.get(key)
+            if image is not None:
+                self._memory.move_to_end(key)
+                self.hits += 1
+                return image
+            if self.directory is not None:
+                try:
+                    with open(self._path(key), "rb") as file:
+                        image = file.read()
+                    os.utime(self._path(key))
+                except OSError:
+                    image = None
+            if image is None:
+                self.misses += 1
+                return None
+            self._remember(key, image)
+            self.hits += 1
+            return image
+
+    def put(self, key: str, image: bytes) -> None:
+        """
+        Сохраняет изображение в памяти и на диске.
+
+        Args:
+            key (str): Ключ из plot_cache_key.
+            image (bytes): PNG.
+        """
+        with self._lock:
+            self._remember(key, image)
+            if self.directory is None:
+                return
+            try:
+                self._write_file(key, image)
+            except OSError as e:
+                # без диска кэш продолжает работать в памяти
+                logger.warning("Не удалось сохранить график в кэш: %s", e)
+
+    def _write_file(self, key: str, image: bytes) -> None:
+        """Записывает файл изображения и соблюдает лимит каталога."""
+        os.makedirs(self.directory, exist_ok=True)
+        if self._disk_bytes is None:
+            self._disk_bytes = sum(size for _, size, _ in self._files())
+        path = self._path(key)
+        if os.path.exists(path):
+            return
+        temporary = f"{path}.{threading.get_ident()}.tmp"
+        with open(temporary, "wb") as file:
+            file.write(image)
+        os.replace(temporary, path)
+        self._disk_bytes += len(image)
+        if self._disk_bytes > self.max_disk_bytes:
+            self._evict_files()
+
+    def get_file_id(self, key: str) -> Optional[str]:
+        """
+        Возвращает file_id уже отправленного изображения.
+
+        Args:
+            key (str): Ключ из plot_cache_key.
+
+        Returns:
+            Optional[str]: file_id фотографии в Telegram или None,
+             если изображение еще не отправлялось.
+        """
+        with self._lock:
+            file_id = self._file_ids.get(key)
+            if file_id is None and self.directory is not None:
+                try:
+                    with open(self._path(key, "fileid"),
+                              encoding="ascii") as file:
+                        file_id = file.read().strip() or None
+                except OSError:
+                    file_id = None
+            if file_id is not None:
+                self._remember_file_id(key, file_id)
+            return file_id
+
+    def put_file_id(self, key: str, file_id: str) -> None:
+        """
+        Запоминает file_id отправленного изображения.
+
+        Args:
+            key (str): Ключ из plot_cache_key.
+            file_id (str): file_id фотографии в Telegram.
+        """
+        with self._lock:
+            self._remember_file_id(key, file_id)
+            if self.directory is None:
+                return
+            try:
+                os.makedirs(self.directory, exist_ok=True)
+                with open(self._path(key, "fileid"), "w",
+                          encoding="ascii") as file:
+                    file.write(file_id)
+            except OSError as e:
+                logger.warning("Не удалось сохранить file_id: %s", e)
+
+    def forget_file_id(self, key: str) -> None:
+        """
+        Забывает file_id, который Telegram больше не принимает.
+
+        Args:
+            key (str): Ключ из plot_cache_key.
+        """
+        with self._lock:
+            self._file_ids.pop(key, None)
+            if self.directory is not None:
+                try:
+                    os.remove(self._path(key, "fileid"))
+                except OSError:
+                    pass
+
+    def _remember_file_id(self, key: str, file_id: str) -> None:
+        """Помещает file_id в память, вытесняя самый старый."""
+        self._file_ids[key] = file_id
+        self._file_ids.move_to_end(key)
+        while len(self._file_ids) > MAX_MEMORY_FILE_IDS:
+            self._file_ids.popitem(last=False)
+
+    def _files(self) -> list[tuple[float, int, str]]:
+        """Возвращает (mtime, размер, путь) файлов изображений каталога."""
+        files = []
+        with os.scandir(self.directory) as entries:
+            for entry in entries:
+                if entry.name.endswith(".png"):
+                    stat = entry.stat()
+                    files.append((stat.st_mtime, stat.st_size, entry.path))
+        return files
+
+    def _evict_files(self) -> None:
+        """Удаляет самые давние файлы, пока каталог не уложится в лимит."""
+        files = sorted(self._files())
+        self._disk_bytes = sum(size for _, size, _ in files)
+        for _, size, path in files:
+            if self._disk_bytes <= self.max_disk_bytes:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            self._disk_bytes -= size
+            key = os.path.basename(path)[:-len(".png")]
+            self._file_ids.pop(key, None)
+            try:
+                os.remove(self._path(key, "fileid"))
+            except OSError:
+                pass
+
+    def clear(self) -> None:
+        """Очищает уровень в памяти (файлы на диске остаются)."""
+        with self._lock:
+            self._memory.clear()
+            self._file_ids.clear()
+
+
+_plot_cache: Optional[PlotCache] = None
+
+
+def get_plot_cache() -> PlotCache:
+    """
+    Возвращает общий кэш графиков.
+
+    Returns:
+        PlotCache: Кэш, создаваемый по конфигурации при первом обращении.
+    """
+    global _plot_cache
+    if _plot_cache is None:
+        from telegram_tracker_bot.config import (PLOT_CACHE_DIR,
+                                                 PLOT_CACHE_MAX_BYTES)
+        _plot_cache = PlotCache(PLOT_CACHE_DIR or None,
+                                max_disk_bytes=PLOT_CACHE_MAX_BYTES)
+    return _plot_cache
+
+
+def set_plot_cache(cache: Optional[PlotCache]) -> None:
+    """
+    Заменяет общий кэш графиков (для тестов).
+
+    Args:
+        cache (Optional[PlotCache]): Новый кэш или None, чтобы
+         при следующем обращении создать его по конфигурации.
+    """
+    global _plot_cache
+    _plot_cache = cache
@@ -2,149 +2,267 @@
 Модуль для создания графиков недельной активности пользователя.
 
 Функции:
-- plot_weekly_data(user_id: int) -> BytesIO | None:
+- plot_weekly_data(user_id: int, annotate: bool,
+                   renderer: str) -> BytesIO | None:
     Создает и возвращает график с данными за последнюю неделю по сну,
     калориям и тренировкам пользователя в виде изображения в памяти.
     Если данных нет, возвращает None.
+- render_weekly_plot(user_id: int, columns: dict,
+                     annotate: bool) -> BytesIO | None:
+    Строит тот же график по уже полученным дневным столбцам.
+- get_weekly_renderer(renderer: str) -> Callable:
+    Функция отрисовки по названию: "matplotlib" (render_weekly_plot)
+    или "pillow" (render_weekly_plot_fast из модуля fast_plotting).
+- weekly_plot_key(user_id: int, columns: dict, annotate: bool,
+                  renderer: str) -> str:
+    Ключ готового изображения в кэше графиков (модуль plot_cache).
+
+Фигура с тремя осями, подписями, сетками, легендами, форматтерами
+и локаторами дат строится один раз на поток (шаблон _WeeklyFigure),
+а для каждого графика у готовых линий, столбцов и подписей значений
+меняются только данные и текст. Шаблон - отдельный объект Figure
+без глобального состояния pyplot, у каждого потока свой, поэтому
+несколько графиков можно строить одновременно в разных потоках
+(и в процессах пула render_pool). Подписи значений над точками
+можно отключить (annotate=False), это еще немного ускоряет отрисовку.
+matplotlib импортируется при построении первого шаблона, поэтому
+с отрисовкой через Pillow он не загружается вовсе.
 
 Использует:
 - matplotlib для построения графиков,
-- telegram_tracker_bot для получения данных пользователя,
+- хранилище telegram_tracker_bot (get_storage) для получения дневных
+  значений пользователя в виде массивов NumPy,
+- кэш готовых изображений (get_plot_cache), чтобы не строить заново
+  график недели, которая не изменилась,
 - вспомогательную функцию format_timedelta для форматирования времени.
 """
 
-from typing import Optional
+import threading
+from typing import Callable, Optional
 from io import BytesIO
-import datetime
 import numpy as np
-import matplotlib.dates as mdates
-import matplotlib.pyplot as plt
-import matplotlib
-from telegram_tracker_bot.db import get_records_last_n_days
+from telegram_tracker_bot.db import get_storage, has_data
+from .fast_plotting import FAST_RENDER_OPTIONS, render_weekly_plot_fast
+from .plot_cache import get_plot_cache, plot_cache_key
 from .stats import format_timedelta
 
-matplotlib.use("Agg")
+PLOT_DAYS = 7
+# Параметры отрисовки входят в ключ кэша; version нужно увеличить
+# при любом изменении внешнего вида графика.
+RENDER_OPTIONS = {"figsize": (10, 12), "format": "png", "version": 3}
+BAR_WIDTH = 0.8
+
+_templates = threading.local()
 
 
-def plot_weekly_data(user_id: int) -> Optional[BytesIO]:
+def plot_weekly_data(user_id: int, annotate: bool = True,
+                     renderer: str = "matplotlib") -> Optional[BytesIO]:
     """
     Создает график с данными за последнюю неделю и возвращает его как BytesIO.
 
     Args:
         user_id (int): Идентификатор пользователя.
+        annotate (bool): Подписывать ли значения над точками.
+        renderer (str): Способ отрисовки: "matplotlib" или "pillow".
 
     Returns:
         Optional[BytesIO]: График в виде объекта BytesIO.
     """
-    sleep_data = get_records_last_n_days(user_id,
-                                         "sleep",
-                                         7,
-                                         'telegram_tracker_bot'
-                                         '/db/tracker_data_base.db')
-    calories_data = get_records_last_n_days(user_id,
-                                            "calories", 7,
-                                            'telegram_tracker_bot/'
-                                            'db/tracker_data_base.db')
-    workouts_data = get_records_last_n_days(user_id,
-                                            "workouts", 7,
-                                            'telegram_tracker_bot/'
-                                            'db/tracker_data_base.db')
-
-    if not sleep_data and not calories_data and not workouts_data:
+    columns = get_storage().get_daily_columns_last_n_days(user_id,
+                                                          PLOT_DAYS)
+    if not has_data(columns):
         return None
-    dates = [
-        datetime.date.today() - datetime.timedelta(days=i)
-        for i in range(6, -1, -1)
-    ]
-    dates.sort()
-
-    workouts_map = {d_str: 0.0
-                    for d_str in [d.strftime("%Y-%m-%d")
-                                  for d in dates]}
-    for item in workouts_data:
-        if item["date"] in workouts_map:
-            workouts_map[item["date"]] += item["duration_hours"]
-    sleep_values = [{item["date"]: item["hours"]
-                     for item in sleep_data}.get(d_str, np.nan)
-                    for d_str in
-                    [d.strftime("%Y-%m-%d") for d in dates]]
-    calories_values = [{item["date"]: item["amount"]
-                        for item in calories_data}.get(d_str, np.nan)
-                       for d_str in [d.strftime("%Y-%m-%d")
-                                     for d in dates]]
-    workout_values = [workouts_map.get(d_str, np.nan)
-                      for d_str in [d.strftime("%Y-%m-%d")
-                                    for d in dates]]
-
-    fig, axes = plt.subplots(3, 1, figsize=(10, 12), sharex=True)
-    fig.suptitle(f"Недельная активность (ID: {user_id})", fontsize=16)
-
-    axes[0].plot(
-        dates, sleep_values, marker="o",
-        linestyle="-", color="blue",
-        label="Сон (часы)"
-    )
-    axes[0].set_ylabel("Часы сна")
-    axes[0].grid(True, linestyle="--", alpha=0.6)
-    axes[0].legend()
-    axes[0].yaxis.set_major_formatter(
-        plt.FuncFormatter(lambda x,
-                          pos: format_timedelta(x) if not np.isnan(x) else "")
-    )
-    for i, txt in enumerate(sleep_values):
-        if not np.isnan(txt):
-            axes[0].annotate(
-                format_timedelta(txt),
-                (mdates.date2num(dates[i]), sleep_values[i]),
-                textcoords="offset points",
-                xytext=(0, 5),
-                ha="center",
-            )
-
-    axes[1].plot(
-        dates,
-        calories_values,
-        marker="s",
-        linestyle="-",
-        color="red",
-        label="Калории (ккал)",
-    )
-    axes[1].set_ylabel("Калории (ккал)")
-    axes[1].grid(True, linestyle="--", alpha=0.6)
-    axes[1].legend()
-    for i, txt in enumerate(calories_values):
-        if not np.isnan(txt):
-            axes[1].annotate(
-                f"{int(txt)}",
-                (mdates.date2num(dates[i]), calories_values[i]),
-                textcoords="offset points",
-                xytext=(0, 5),
-                ha="center",
-            )
-    axes[2].bar(dates, workout_values, color="green",
-                alpha=0.7, label="Тренировки (часы)")
-    axes[2].set_ylabel("Часы тренировок")
-    axes[2].grid(True, linestyle="--", alpha=0.6)
-    axes[2].legend()
-    axes[2].yaxis.set_major_formatter(
-        plt.FuncFormatter(lambda x, pos: format_timedelta(x)
-                          if not np.isnan(x) else "")
-    )
-    for i, txt in enumerate(workout_values):
-        if not np.isnan(txt) and txt > 0:
-            axes[2].annotate(
-                format_timedelta(txt),
-                (mdates.date2num(dates[i]), workout_values[i]),
-                textcoords="offset points",
-                xytext=(0, 5),
-                ha="center",
-            )
-    plt.xlabel("Дата")
-    fig.autofmt_xdate()
-    axes[2].xaxis.set_major_formatter(mdates.DateFormatter("%Y-%m-%d"))
-    axes[2].xaxis.set_major_locator(mdates.DayLocator(interval=1))
-    buf = BytesIO()
-    plt.savefig(buf, format="png", bbox_inches="tight")
-    plt.close(fig)
-    buf.seek(0)
+    render = get_weekly_renderer(renderer)
+    cache = get_plot_cache()
+    key = weekly_plot_key(user_id, columns, annotate, renderer)
+    image = cache.get(key)
+    if image is not None:
+        return BytesIO(image)
+    buf = render(user_id, columns, annotate)
+    cache.put(key, buf.getvalue())
     return buf
+
+
+def get_weekly_renderer(renderer: str) -> Callable[..., Optional[BytesIO]]:
+    """
+    Возвращает функцию отрисовки недельного графика.
+
+    Args:
+        renderer (str): "matplotlib" или "pillow".
+
+    Returns:
+        Callable: render_weekly_plot или render_weekly_plot_fast.
+
+    Raises:
+        ValueError: Если способ отрисовки неизвестен.
+    """
+    if renderer == "matplotlib":
+        return render_weekly_plot
+    if renderer == "pillow":
+        return render_weekly_plot_fast
+    raise ValueError(f"Неизвестный способ отрисовки графика: {renderer}")
+
+
+def weekly_plot_key(user_id: int, columns: dict[str, np.ndarray],
+                    annotate: bool = True,
+                    renderer: str = "matplotlib") -> str:
+    """
+    Возвращает ключ недельного графика в кэше изображений.
+
+    Args:
+        user_id (int): Идентификатор пользователя.
+        columns (dict[str, np.ndarray]): Дневные столбцы за 7 дней.
+        annotate (bool): Подписываются ли значения над точками.
+        renderer (str): Способ отрисовки: "matplotlib" или "pillow".
+
+    Returns:
+        str: Ключ из plot_cache_key.
+    """
+    options = (FAST_RENDER_OPTIONS if renderer == "pillow"
+               else RENDER_OPTIONS)
+    return plot_cache_key(user_id, PLOT_DAYS, columns,
+                          {**options, "annotate": annotate})
+
+
+def _format_hours(value: float, _position=None) -> str:
+    """Форматирует часы для оси и подписей (пусто для NaN)."""
+    return format_timedelta(value) if not np.isnan(value) else ""
+
+
+class _WeeklyFigure:
+    """Шаблон недельного графика: фигура и изменяемые элементы."""
+
+    def __init__(self) -> None:
+        import matplotlib.dates as mdates
+        from matplotlib.figure import Figure
+        from matplotlib.ticker import FuncFormatter
+
+        fig = Figure(figsize=RENDER_OPTIONS["figsize"])
+        axes = fig.subplots(3, 1, sharex=True)
+        self.fig = fig
+        self.axes = axes
+        self.title = fig.suptitle("", fontsize=16)
+
+        # Заготовка дат задает осям X единицы измерения - даты
+        dates = np.arange(np.datetime64("1970-01-01"),
+                          np.datetime64("1970-01-08")).astype(object)
+        empty = np.full(PLOT_DAYS, np.nan)
+        (self.sleep_line,) = axes[0].plot(
+            dates, empty, marker="o", linestyle="-", color="blue",
+            label="Сон (часы)")
+        axes[0].set_ylabel("Часы сна")
+        axes[0].yaxis.set_major_formatter(FuncFormatter(_format_hours))
+        (self.calories_line,) = axes[1].plot(
+            dates, empty, marker="s", linestyle="-", color="red",
+            label="Калории (ккал)")
+        axes[1].set_ylabel("Калории (ккал)")
+        self.bars = axes[2].bar(dates, np.zeros(PLOT_DAYS), width=BAR_WIDTH,
+                                color="green", alpha=0.7,
+                                label="Тренировки (часы)")
+        axes[2].set_ylabel("Часы тренировок")
+        axes[2].yaxis.set_major_formatter(FuncFormatter(_format_hours))
+        for ax in axes:
+            ax.grid(True, linestyle="--", alpha=0.6)
+            ax.legend()
+        self.labels = [
+            [ax.annotate("", (0, 0), textcoords="offset points",
+                         xytext=(0, 5), ha="center", visible=False)
+             for _ in range(PLOT_DAYS)]
+            for ax in axes]
+
+        axes[-1].set_xlabel("Дата")
+        fig.autofmt_xdate()
+        axes[2].xaxis.set_major_formatter(mdates.DateFormatter("%Y-%m-%d"))
+        axes[2].xaxis.set_major_locator(mdates.DayLocator(interval=1))
+        # Поля задаются один раз вместо bbox_inches="tight" при каждом
+        # сохранении, которое рисует фигуру дважды
+        fig.subplots_adjust(left=0.1, right=0.97, bottom=0.08, top=0.94,
+                            hspace=0.1)
+        # Пределы осей без данных: autoscale_view не меняет пределы
+        # оси, у линий которой нет ни одного значения
+        self.empty_limits = [ax.get_ylim() for ax in axes]
+
+    def _set_labels(self, row: int, x: np.ndarray, values: np.ndarray,
+                    texts: list[str]) -> None:
+        """Обновляет подписи значений над точками одной оси."""
+        for label, x_value, value, text in zip(self.labels[row], x,
+                                               values, texts):
+            label.set_visible(bool(text))
+            if text:
+                label.set_text(text)
+                label.xy = (x_value, value)
+
+    def render(self, user_id: int, columns: dict[str, np.ndarray],
+               annotate: bool) -> BytesIO:
+        """
+        Подставляет данные пользователя в шаблон и сохраняет изображение.
+
+        Args:
+            user_id (int): Идентификатор пользователя.
+            columns (dict[str, np.ndarray]): Дневные столбцы за 7 дней.
+            annotate (bool): Подписывать ли значения над точками.
+
+        Returns:
+            BytesIO: Изображение в начале буфера.
+        """
+        import matplotlib.dates as mdates
+
+        x = mdates.date2num(columns["date"])
+        sleep_values = columns["sleep"]
+        calories_values = columns["calories"]
+        workout_values = columns["workouts"]
+
+        self.title.set_text(f"Недельная активность (ID: {user_id})")
+        self.sleep_line.set_data(x, sleep_values)
+        self.calories_line.set_data(x, calories_values)
+        for bar, x_value, value in zip(self.bars, x, workout_values):
+            bar.set_x(x_value - BAR_WIDTH / 2)
+            bar.set_height(0.0 if np.isnan(value) else value)
+        # Пределы прошлого графика сбрасываются, иначе на панели без
+        # данных остался бы диапазон значений другого пользователя
+        for ax, limits in zip(self.axes, self.empty_limits):
+            ax.set_ylim(limits, auto=None)
+            ax.relim()
+            ax.autoscale_view()
+
+        empty = [""] * PLOT_DAYS
+        self._set_labels(0, x, sleep_values,
+                         [_format_hours(value) for value in sleep_values]
+                         if annotate else empty)
+        self._set_labels(1, x, calories_values,
+                         [f"{int(value)}" if not np.isnan(value) else ""
+                          for value in calories_values]
+                         if annotate else empty)
+        self._set_labels(2, x, workout_values,
+                         [_format_hours(value) if value > 0 else ""
+                          for value in workout_values]
+                         if annotate else empty)
+
+        buf = BytesIO()
+        self.fig.savefig(buf, format=RENDER_OPTIONS["format"])
+        buf.seek(0)
+        return buf
+
+
+def render_weekly_plot(user_id: int, columns: dict[str, np.ndarray],
+                       annotate: bool = True) -> Optional[BytesIO]:
+    """
+    Строит недельный график по дневным столбцам пользователя
+    на шаблоне фигуры текущего потока.
+
+    Args:
+        user_id (int): Идентификатор пользователя.
+        columns (dict[str, np.ndarray]): Столбцы date, sleep, calories
+         и workouts за 7 дней (результат get_daily_columns_last_n_days).
+        annotate (bool): Подписывать ли значения над точками.
+
+    Returns:
+        Optional[BytesIO]: График в виде объекта BytesIO или None,
+         если данных нет.
+    """
+    if not has_data(columns):
+        return None
+    template = getattr(_templates, "figure", None)
+    if template is None:
+        template = _templates.figure = _WeeklyFigure()
+    return template.render(user_id, columns, annotate)
@@ -0,0 +1,135 @@
+"""
+Пул процессов для построения графиков.
+
+Отрисовка недельного графика matplotlib занимает сотни миллисекунд
+процессорного времени и удерживает GIL, поэтому в потоке она
+замедляет обработку всех остальных чатов. Здесь графики строятся
+в пуле из RENDER_WORKERS процессов: в каждом процессе заранее
+импортирован модуль plotting (и matplotlib с бэкендом Agg, если
+графики строятся через него - PLOT_RENDERER в конфигурации),
+а обработчик только ожидает результат.
+
+Процессы запускаются методом spawn: к моменту первого графика
+у бота уже работают потоки (пул базы данных, очереди записи),
+а fork процесса с потоками небезопасен.
+
+Одновременно ожидать отрисовки могут не больше MAX_PENDING_RENDERS
+запросов; следующий получает исключение RenderPoolBusy, и бот
+просит повторить попытку позже, а не копит очередь.
+
+Содержит:
+- render_in_pool: выполнение функции отрисовки в пуле процессов
+- start_render_pool: запуск и прогрев процессов (при запуске бота)
+- shutdown_render_pool: остановка пула при остановке бота
+"""
+
+import asyncio
+import functools
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Optional, TypeVar
+
+RENDER_WORKERS = min(4, os.cpu_count() or 1)
+MAX_PENDING_RENDERS = RENDER_WORKERS * 4
+
+T = TypeVar('T')
+
+_executor: Optional[ProcessPoolExecutor] = None
+_pending = 0
+
+
+class RenderPoolBusy(Exception):
+    """Очередь построения графиков переполнена."""
+
+
+def _init_worker() -> None:
+    """Готовит процесс пула: выбирает бэкенд Agg и импортирует модули."""
+    from telegram_tracker_bot.config import PLOT_RENDERER
+    if PLOT_RENDERER == "matplotlib":
+        import matplotlib
+        matplotlib.use("Agg")
+    from telegram_tracker_bot.logic import plotting
+    _ = plotting
+
+
+def _warm_up() -> None:
+    """Отрисовывает пустую фигуру, чтобы заполнить кэш шрифтов."""
+    from io import BytesIO
+    from telegram_tracker_bot.config import PLOT_RENDERER
+    if PLOT_RENDERER != "matplotlib":
+        return
+    from matplotlib.figure import Figure
+    Figure().savefig(BytesIO(), format="png")
+
+
+def get_render_executor() -> ProcessPoolExecutor:
+    """
+    Возвращает пул процессов для построения графиков.
+
+    Returns:
+        ProcessPoolExecutor: Пул, создаваемый при первом обращении.
+    """
+    global _executor
+    if _executor is None:
+        _executor = ProcessPoolExecutor(
+            max_workers=RENDER_WORKERS,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker)
+    return _executor
+
+
+def start_render_pool() -> None:
+    """
+    Запускает все процессы пула заранее, чтобы первые графики
+    не ждали импорта модулей отрисовки.
+    """
+    executor = get_render_executor()
+    for _ in range(RENDER_WORKERS):
+        executor.submit(_warm_up)
+
+
+async def render_in_pool(func: Callable[..., T], *args: Any,
+                         **kwargs: Any) -> T:
+    """
+    Выполняет функцию отрисовки в пуле процессов.
+
+    Функция, аргументы и результат передаются между процессами
+    через pickle.
+
+    Args:
+        func (Callable): Функция уровня модуля, например
+         render_weekly_plot.
+        *args: Позиционные аргументы функции.
+        **kwargs: Именованные аргументы функции.
+
+    Returns:
+        T: Результат функции.
+
+    Raises:
+        RenderPoolBusy: Если уже ожидают MAX_PENDING_RENDERS графиков.
+        BrokenProcessPool: Если процесс пула аварийно завершился
+         (следующий вызов создаст новый пул).
+    """
+    global _pending, _executor
+    if _pending >= MAX_PENDING_RENDERS:
+        raise RenderPoolBusy
+    _pending += 1
+    try:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            get_render_executor(), functools.partial(func, *args, **kwargs))
+    except BrokenProcessPool:
+        _executor = None
+        raise
+    finally:
+        _pending -= 1
+
+
+def shutdown_render_pool() -> None:
+    """Дожидается текущих графиков и останавливает пул процессов."""
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=True)
+        _executor = None
@@ -1,14 +1,32 @@
 """
 Модуль для обработки и формирования отчетов
- по недельной активности пользователя.
+ по активности пользователя за последние дни.
 
 Функции:
 - format_timedelta(hours: float) -> str:
     Форматирует часы в строку вида "ЧЧ:ММ".
 
-- get_weekly_stats_text(user_id: int) -> str:
+- get_stats_text(user_id: int, n_days: int) -> str:
     Генерирует текстовый отчет со статистикой сна, калорий и тренировок
-    за последние 7 дней для указанного пользователя.
+    за последние N дней для указанного пользователя.
+
+- get_weekly_stats_text(user_id: int) -> str:
+    То же за последние 7 дней.
+
+- format_stats_text(n_days, totals, days, usual, sketches) -> str:
+    Форматирует отчет по уже прочитанным данным (используется также
+    недельной рассылкой, читающей данные пакетами).
+
+- format_calories(value: float) -> str,
+  format_change(value: float, formatter) -> str:
+    Форматируют калории и изменение показателя со знаком.
+
+- get_percentiles_text() -> str:
+    Генерирует отчет для администраторов с квантилями сна, калорий
+    и тренировок по записям всех пользователей.
+
+- stats_cache_info() -> dict:
+    Возвращает счетчики попаданий и промахов кэша отчетов.
 
 - get_data_for_advice(user_id: int) -> dict:
     Собирает и возвращает данные за последнюю неделю в упрощенном формате,
@@ -16,12 +34,38 @@
      для анализа и формирования советов.
 
 Использует:
-- telegram_tracker_bot для получения записей пользователя.
-- collections.defaultdict для агрегации данных по типам активности.
+- хранилище telegram_tracker_bot (get_storage) для получения записей,
+  дневных сводок, итогов за период и статистики за все время
+  (строки "Обычно" в отчете читают одну строку на показатель
+  независимо от длины истории) и квантильных скетчей всех
+  пользователей (строки процентилей читают несколько сотен счетчиков
+  корзин, а не записи всех пользователей).
+
+Отчет меняется, только когда пользователь добавляет запись или
+наступает новый день, поэтому готовый текст кэшируется по ключу
+(пользователь, окно, сегодняшний день). Запись пользователя делает
+его отчеты устаревшими (подписка add_record_listener), а с наступлением
+нового дня отчеты прошлого дня отбрасываются. Процентили среди всех
+пользователей в кэшированном отчете тоже обновляются только при этом:
+распределение всех записей за день почти не сдвигается.
 """
 
-from collections import defaultdict
-from telegram_tracker_bot.db import get_records_last_n_days
+import datetime
+import threading
+from collections import OrderedDict
+from typing import Callable, Optional
+from telegram_tracker_bot.db import (get_storage, format_day, date_to_day,
+                                     add_record_listener, StorageBackend,
+                                     RunningStats, QuantileSketch,
+                                     totals_from_summary)
+
+MAX_CACHED_REPORTS = 4096
+MAX_STATS_DAYS = 3650
+MAX_LISTED_DAYS = 14
+# Меньше записей всех пользователей - процентиль не показывается.
+PERCENTILE_MIN_COUNT = 100
+PERCENTILE_LEVELS = ((0.1, "10%"), (0.25, "25%"), (0.5, "Медиана"),
+                     (0.75, "75%"), (0.9, "90%"))
 
 
 def format_timedelta(hours: float) -> str:
@@ -40,9 +84,199 @@ def format_timedelta(hours: float) -> str:
     return f"{h:02d}:{m:02d}"
 
 
+def format_change(value: float, formatter: Callable[[float], str]) -> str:
+    """
+    Форматирует изменение показателя со знаком.
+
+    Args:
+        value (float): Изменение.
+        formatter (Callable[[float], str]): Форматирование модуля
+         изменения, например format_timedelta.
+
+    Returns:
+        str: Например, "+00:30" или "-150 ккал".
+    """
+    return ("+" if value >= 0 else "-") + formatter(abs(value))
+
+
+def _usual_line(stats: Optional[RunningStats], total: float, count: int,
+                formatter: Callable[[float], str], unit: str) -> list[str]:
+    """
+    Строит строку сравнения периода с обычным значением за все время.
+
+    Args:
+        stats (Optional[RunningStats]): Статистика показателя
+         за все время.
+        total (float): Сумма значений записей за период.
+        count (int): Число записей за период.
+        formatter (Callable[[float], str]): Форматирование значения.
+        unit (str): Единица сравнения, например "за запись".
+
+    Returns:
+        list[str]: Строка отчета или пустой список, если записей
+         за все время меньше двух.
+    """
+    if stats is None or stats.count < 2 or not count:
+        return []
+    change = total / count - stats.mean
+    return [f"  - Обычно: {formatter(stats.mean)} {unit}"
+            f" (±{formatter(stats.std)}), сейчас"
+            f" {format_change(change, formatter)}"]
+
+
+def _percentile_line(sketch: Optional[QuantileSketch], total: float,
+                     count: int) -> list[str]:
+    """
+    Строит строку процентиля средней записи периода среди записей
+    всех пользователей.
+
+    Args:
+        sketch (Optional[QuantileSketch]): Скетч показателя.
+        total (float): Сумма значений записей за период.
+        count (int): Число записей за период.
+
+    Returns:
+        list[str]: Строка отчета или пустой список, если записей
+         всех пользователей меньше PERCENTILE_MIN_COUNT.
+    """
+    if sketch is None or sketch.count < PERCENTILE_MIN_COUNT or not count:
+        return []
+    percentile = sketch.percentile_of(total / count)
+    return [f"  - Среди всех пользователей: {percentile:.0f}-й процентиль"]
+
+
+def format_calories(value: float) -> str:
+    """Форматирует калории."""
+    return f"{value:.0f} ккал"
+
+
+class _ReportCache:
+    """Готовые отчеты по ключу (пользователь, окно, день), LRU."""
+
+    def __init__(self, max_reports: int = MAX_CACHED_REPORTS) -> None:
+        self.max_reports = max_reports
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._day: Optional[int] = None
+        # (пользователь, окно, день) -> (хранилище, версия, текст)
+        self._reports: OrderedDict[tuple[int, int, int],
+                                   tuple[StorageBackend, int, str]] = \
+            OrderedDict()
+        # Сколько раз за день данные пользователя менялись
+        self._versions: dict[int, int] = {}
+
+    def _roll_over(self, day: int) -> None:
+        """Отбрасывает отчеты прошлого дня."""
+        if day != self._day:
+            self._day = day
+            self._reports.clear()
+            self._versions.clear()
+
+    def get(self, storage: StorageBackend, user_id: int, n_days: int,
+            day: int) -> tuple[Optional[str], int]:
+        """
+        Ищет отчет пользователя.
+
+        Args:
+            storage (StorageBackend): Хранилище, по которому строится отчет.
+            user_id (int): ID пользователя.
+            n_days (int): Окно отчета в днях.
+            day (int): Сегодняшний день.
+
+        Returns:
+            tuple[Optional[str], int]: Текст отчета или None и версия
+             данных пользователя для put.
+        """
+        key = (user_id, n_days, day)
+        with self._lock:
+            self._roll_over(day)
+            version = self._versions.get(user_id, 0)
+            entry = self._reports.get(key)
+            if (entry is not None and entry[0] is storage
+                    and entry[1] == version):
+                self.hits += 1
+                self._reports.move_to_end(key)
+                return entry[2], version
+            self.misses += 1
+            return None, version
+
+    def put(self, storage: StorageBackend, user_id: int, n_days: int,
+            day: int, version: int, text: str) -> None:
+        """
+        Сохраняет отчет, если данные не менялись с момента get.
+
+        Args:
+            storage (StorageBackend): Хранилище, по которому построен отчет.
+            user_id (int): ID пользователя.
+            n_days (int): Окно отчета в днях.
+            day (int): День, за который построен отчет.
+            version (int): Версия данных, полученная от get.
+            text (str): Текст отчета.
+        """
+        key = (user_id, n_days, day)
+        with self._lock:
+            if day != self._day or self._versions.get(user_id, 0) != version:
+                return
+            self._reports[key] = (storage, version, text)
+            self._reports.move_to_end(key)
+            while len(self._reports) > self.max_reports:
+                self._reports.popitem(last=False)
+
+    def invalidate(self, user_id: int) -> None:
+        """
+        Делает устаревшими отчеты пользователя после его новой записи.
+
+        Args:
+            user_id (int): ID пользователя.
+        """
+        with self._lock:
+            self._versions[user_id] = self._versions.get(user_id, 0) + 1
+
+    def info(self) -> dict:
+        """Возвращает счетчики кэша."""
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses,
+                    "size": len(self._reports)}
+
+
+_reports = _ReportCache()
+add_record_listener(_reports.invalidate)
+
+
+def stats_cache_info() -> dict:
+    """
+    Возвращает счетчики кэша отчетов /stats.
+
+    Returns:
+        dict: hits - ответы из кэша, misses - построенные отчеты,
+         size - число отчетов в кэше.
+    """
+    return _reports.info()
+
+
+def days_phrase(n_days: int) -> str:
+    """
+    Согласует число дней со словом "день".
+
+    Args:
+        n_days (int): Количество дней.
+
+    Returns:
+        str: Например, "1 день", "3 дня", "30 дней".
+    """
+    if n_days % 10 == 1 and n_days % 100 != 11:
+        word = "день"
+    elif 2 <= n_days % 10 <= 4 and not 12 <= n_days % 100 <= 14:
+        word = "дня"
+    else:
+        word = "дней"
+    return f"{n_days} {word}"
+
+
 def get_weekly_stats_text(user_id: int) -> str:
     """
-    Генерирует текстовый отчет по статистике за последние 7 дней.
+    Возвращает текстовый отчет по статистике за последние 7 дней.
 
     Args:
         user_id (int): Идентификатор пользователя.
@@ -50,62 +284,186 @@ def get_weekly_stats_text(user_id: int) -> str:
     Returns:
         str: Текстовый формат статистики за неделю.
     """
-    sleep_data = get_records_last_n_days(user_id,
-                                         "sleep", 7,
-                                         'telegram_tracker_bot'
-                                         '/db/tracker_data_base.db')
-    calories_data = get_records_last_n_days(user_id, "calories", 7,
-                                            'telegram_tracker_bot/'
-                                            'db/tracker_data_base.db')
-    workouts_data = get_records_last_n_days(user_id, "workouts", 7,
-                                            'telegram_tracker_bot/db/'
-                                            'tracker_data_base.db')
-
-    report = ["📊 Статистика за последние 7 дней:\n"]
-    if sleep_data:
-        total_sleep = sum(item['hours'] for item in sleep_data)
-        avg_sleep = total_sleep / len(sleep_data)
+    return get_stats_text(user_id, 7)
+
+
+def get_stats_text(user_id: int, n_days: int) -> str:
+    """
+    Возвращает текстовый отчет по статистике за последние N дней.
+
+    Готовый отчет берется из кэша, пока пользователь не добавит
+    запись или не наступит новый день.
+
+    Args:
+        user_id (int): Идентификатор пользователя.
+        n_days (int): Количество последних дней (от 1 до MAX_STATS_DAYS).
+
+    Returns:
+        str: Текстовый формат статистики за период.
+
+    Raises:
+        ValueError: Если окно вне допустимого диапазона.
+    """
+    if not 1 <= n_days <= MAX_STATS_DAYS:
+        raise ValueError(f"Окно статистики должно быть от 1"
+                         f" до {MAX_STATS_DAYS} дней")
+    storage = get_storage()
+    today = date_to_day(datetime.date.today())
+    text, version = _reports.get(storage, user_id, n_days, today)
+    if text is None:
+        text = _build_stats_text(storage, user_id, n_days)
+        _reports.put(storage, user_id, n_days, today, version, text)
+    return text
+
+
+def _build_stats_text(storage: StorageBackend, user_id: int,
+                      n_days: int) -> str:
+    """
+    Строит текстовый отчет по статистике за последние N дней.
+
+    Для окон до MAX_LISTED_DAYS дней отчет строится по дневным сводкам
+    и перечисляет дни; для более длинных окон хранилище агрегирует
+    итоги само (в SQLite - запросом GROUP BY), и отдельные дни
+    не читаются.
+
+    Args:
+        storage (StorageBackend): Хранилище записей.
+        user_id (int): Идентификатор пользователя.
+        n_days (int): Количество последних дней.
+
+    Returns:
+        str: Текстовый формат статистики за период.
+    """
+    if n_days <= MAX_LISTED_DAYS:
+        days = storage.get_daily_summary_last_n_days(user_id, n_days)
+        totals = totals_from_summary(days)
+    else:
+        days = None
+        totals = storage.get_window_totals_last_n_days(user_id, n_days)
+    return format_stats_text(n_days, totals, days,
+                             storage.get_running_stats(user_id),
+                             storage.get_quantile_sketches())
+
+
+def format_stats_text(n_days: int, totals: dict, days: Optional[list[dict]],
+                      usual: dict[str, RunningStats],
+                      sketches: dict[str, QuantileSketch]) -> str:
+    """
+    Форматирует отчет по статистике за последние N дней.
+
+    Средние считаются по дням с записями, а несколько записей за один
+    день суммируются. Строки "Обычно" сравнивают среднюю запись
+    периода со статистикой за все время, строки процентилей - с записями
+    всех пользователей.
+
+    Args:
+        n_days (int): Количество последних дней.
+        totals (dict): Итоги за период в формате
+         get_window_totals_last_n_days.
+        days (Optional[list[dict]]): Дневные сводки для перечисления
+         дней или None, если дни не перечисляются.
+        usual (dict[str, RunningStats]): Статистика пользователя
+         за все время.
+        sketches (dict[str, QuantileSketch]): Скетчи показателей всех
+         пользователей.
+
+    Returns:
+        str: Текстовый формат статистики за период.
+    """
+    period = days_phrase(n_days)
+
+    report = [f"📊 Статистика за последние {period}:\n"]
+    if totals['sleep_days']:
+        avg_sleep = totals['sleep_hours'] / totals['sleep_days']
         report.append("😴 Сон:")
         report.append(f"  - В среднем: {format_timedelta(avg_sleep)} / ночь")
-        report.append("  - Записи:")
-        for entry in sorted(sleep_data, key=lambda x: x['date']):
-            report.append(
-                f"    - {entry['date']}:"
-                f" {format_timedelta(entry['hours'])}"
-            )
+        report += _usual_line(usual.get('sleep'), totals['sleep_hours'],
+                              totals['sleep_count'], format_timedelta,
+                              "за запись")
+        report += _percentile_line(sketches.get('sleep'),
+                                   totals['sleep_hours'],
+                                   totals['sleep_count'])
+        if days is None:
+            report.append(f"  - Дней с записями: {totals['sleep_days']}")
+        else:
+            report.append("  - Записи:")
+            for day in days:
+                if day['sleep_count']:
+                    report.append(
+                        f"    - {format_day(day['day'])}:"
+                        f" {format_timedelta(day['sleep_hours'])}"
+                    )
     else:
-        report.append("😴 Сон: Нет данных за последние 7 дней.")
+        report.append(f"😴 Сон: Нет данных за последние {period}.")
 
     report.append("\n")
 
-    if calories_data:
-        total_calories = sum(item['amount'] for item in calories_data)
-        avg_calories = total_calories / len(calories_data)
+    if totals['calories_days']:
+        avg_calories = totals['calories'] / totals['calories_days']
         report.append("🍎 Калории:")
         report.append(f"  - В среднем: {avg_calories:.0f} ккал / день")
-        report.append("  - Записи:")
-        for entry in sorted(calories_data, key=lambda x: x['date']):
-            report.append(f"    - {entry['date']}: {entry['amount']} ккал")
+        report += _usual_line(usual.get('calories'), totals['calories'],
+                              totals['calories_count'], format_calories,
+                              "за запись")
+        report += _percentile_line(sketches.get('calories'),
+                                   totals['calories'],
+                                   totals['calories_count'])
+        if days is None:
+            report.append(f"  - Дней с записями: {totals['calories_days']}")
+        else:
+            report.append("  - Записи:")
+            for day in days:
+                if day['calories_count']:
+                    report.append(f"    - {format_day(day['day'])}:"
+                                  f" {day['calories']} ккал")
     else:
-        report.append("🍎 Калории: Нет данных за последние 7 дней.")
+        report.append(f"🍎 Калории: Нет данных за последние {period}.")
 
     report.append("\n")
 
-    if workouts_data:
-        total_duration = sum(item['duration_hours'] for item in workouts_data)
-        activities = defaultdict(float)
-        for item in workouts_data:
-            activities[item['activity_type']] += item['duration_hours']
+    if totals['workout_days']:
         report.append("💪 Тренировки:")
-        report.append(f"  - Всего часов: {format_timedelta(total_duration)}")
+        report.append("  - Всего часов:"
+                      f" {format_timedelta(totals['workout_hours'])}")
+        report += _usual_line(usual.get('workouts'),
+                              totals['workout_hours'],
+                              totals['workout_count'], format_timedelta,
+                              "за тренировку")
+        report += _percentile_line(sketches.get('workouts'),
+                                   totals['workout_hours'],
+                                   totals['workout_count'])
+        if days is None:
+            report.append(f"  - Дней с тренировками:"
+                          f" {totals['workout_days']}")
         report.append("  - По активностям:")
-        for activity, duration in sorted(activities.items(),
-                                         key=lambda item: item[1],
-                                         reverse=True):
+        for activity, duration in totals['activities'].items():
             report.append(f"    - {activity}: {format_timedelta(duration)}")
     else:
-        report.append("💪 Тренировки: Нет данных за последние 7 дней.")
+        report.append(f"💪 Тренировки: Нет данных за последние {period}.")
+
+    return "\n".join(report)
+
+
+def get_percentiles_text() -> str:
+    """
+    Генерирует отчет с квантилями записей всех пользователей.
 
+    Returns:
+        str: Текст отчета для команды /percentiles.
+    """
+    sketches = get_storage().get_quantile_sketches()
+    report = ["🌍 Записи всех пользователей:\n"]
+    for metric, title, formatter in (
+            ("sleep", "😴 Сон", format_timedelta),
+            ("calories", "🍎 Калории", format_calories),
+            ("workouts", "💪 Тренировки", format_timedelta)):
+        sketch = sketches.get(metric)
+        if sketch is None:
+            report.append(f"{title}: Нет данных.")
+            continue
+        report.append(f"{title} (записей: {sketch.count}):")
+        for q, name in PERCENTILE_LEVELS:
+            report.append(f"  - {name}: {formatter(sketch.quantile(q))}")
     return "\n".join(report)
 
 
@@ -119,15 +477,10 @@ def get_data_for_advice(user_id: int) -> dict:
     Returns:
         dict: Словарь с данными по активности пользователя за последнюю неделю.
     """
-    sleep_data = get_records_last_n_days(
-        user_id, "sleep", 7,
-        'telegram_tracker_bot/db/tracker_data_base.db')
-    calories_data = get_records_last_n_days(
-        user_id, "calories", 7,
-        'telegram_tracker_bot/db/tracker_data_base.db')
-    workouts_data = get_records_last_n_days(
-        user_id, "workouts", 7,
-        'telegram_tracker_bot/db/tracker_data_base.db')
+    records = get_storage().get_all_records_last_n_days(user_id, 7)
+    sleep_data = records["sleep"]
+    calories_data = records["calories"]
+    workouts_data = records["workouts"]
 
     simple_sleep = [(d['date'], d['hours']) for d in sleep_data]
     simple_calories = [(d['date'], d['amount']) for d in calories_data]
@@ -0,0 +1,208 @@
+"""
+Модуль трендов активности пользователя.
+
+Все показатели считаются векторно по плотной сетке дней
+(см. get_daily_columns_last_n_days): столбцы сна, калорий
+и тренировок складываются в одну матрицу, и каждая операция
+выполняется сразу для всех трех показателей без циклов по дням.
+
+Функции:
+- rolling_mean(values, window) -> np.ndarray:
+    Скользящее среднее за window дней с пропуском дней без записей.
+- logging_streaks(columns) -> tuple[int, int]:
+    Текущая и самая длинная серии дней с записями.
+- compute_trends(columns) -> dict:
+    Скользящие средние за 7 и 30 дней, изменение к прошлой неделе
+    и линейный тренд для сна, калорий и тренировок.
+- get_trends_text(user_id: int) -> str:
+    Текстовый отчет для команды /trends.
+
+Для тренировок день без записей означает 0 часов, для сна и калорий -
+отсутствие данных (NaN), такие дни не участвуют в средних.
+"""
+
+import numpy as np
+from telegram_tracker_bot.db import get_storage, has_data
+from .stats import format_timedelta, format_calories, format_change
+
+TREND_DAYS = 30
+METRICS = ("sleep", "calories", "workouts")
+
+
+def _matrix(columns: dict[str, np.ndarray]) -> np.ndarray:
+    """
+    Складывает столбцы показателей в матрицу (показатель, день).
+
+    Args:
+        columns (dict[str, np.ndarray]): Результат
+         get_daily_columns_last_n_days.
+
+    Returns:
+        np.ndarray: Матрица формы (len(METRICS), число дней).
+    """
+    return np.vstack([columns[metric] for metric in METRICS])
+
+
+def rolling_mean(values: np.ndarray, window: int) -> np.ndarray:
+    """
+    Считает скользящее среднее за последние window дней.
+
+    Дни со значением NaN пропускаются; если в окне нет ни одного
+    значения, результат NaN. Считается через накопленные суммы,
+    поэтому время не зависит от длины окна.
+
+    Args:
+        values (np.ndarray): Значения по дням (последняя ось - дни).
+        window (int): Длина окна в днях.
+
+    Returns:
+        np.ndarray: Массив той же формы; элемент i - среднее
+         за дни от i - window + 1 до i.
+    """
+    finite = np.isfinite(values)
+    pad = [(0, 0)] * (values.ndim - 1) + [(1, 0)]
+    sums = np.pad(np.cumsum(np.where(finite, values, 0.0), axis=-1), pad)
+    counts = np.pad(np.cumsum(finite, axis=-1), pad)
+    ends = np.arange(1, values.shape[-1] + 1)
+    starts = np.maximum(ends - window, 0)
+    window_sums = sums[..., ends] - sums[..., starts]
+    window_counts = counts[..., ends] - counts[..., starts]
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.where(window_counts > 0, window_sums / window_counts,
+                        np.nan)
+
+
+def logging_streaks(columns: dict[str, np.ndarray]) -> tuple[int, int]:
+    """
+    Находит серии дней подряд, в которые пользователь что-то записал.
+
+    Текущая серия заканчивается сегодня или вчера (сегодняшняя
+    запись может быть еще впереди).
+
+    Args:
+        columns (dict[str, np.ndarray]): Результат
+         get_daily_columns_last_n_days.
+
+    Returns:
+        tuple[int, int]: Длины текущей и самой длинной серий в днях.
+    """
+    logged = (np.isfinite(columns["sleep"])
+              | np.isfinite(columns["calories"])
+              | (columns["workouts"] > 0))
+    edges = np.diff(np.concatenate(([0], logged.astype(np.int8), [0])))
+    starts = np.flatnonzero(edges == 1)
+    ends = np.flatnonzero(edges == -1)
+    if not len(starts):
+        return 0, 0
+    longest = int((ends - starts).max())
+    current = 0
+    if ends[-1] >= len(logged) - 1:
+        current = int(ends[-1] - starts[-1])
+    return current, longest
+
+
+def _slopes(values: np.ndarray) -> np.ndarray:
+    """
+    Считает наклон прямой наименьших квадратов для каждой строки.
+
+    Args:
+        values (np.ndarray): Матрица (показатель, день) с NaN.
+
+    Returns:
+        np.ndarray: Изменение за день для каждой строки
+         (NaN, если значений меньше двух).
+    """
+    finite = np.isfinite(values)
+    x = np.broadcast_to(np.arange(values.shape[-1], dtype=np.float64),
+                        values.shape)
+    y = np.where(finite, values, 0.0)
+    x = np.where(finite, x, 0.0)
+    n = finite.sum(axis=-1)
+    sx, sy = x.sum(axis=-1), y.sum(axis=-1)
+    sxx, sxy = (x * x).sum(axis=-1), (x * y).sum(axis=-1)
+    denominator = n * sxx - sx * sx
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.where((n >= 2) & (denominator > 0),
+                        (n * sxy - sx * sy) / denominator, np.nan)
+
+
+def compute_trends(columns: dict[str, np.ndarray]) -> dict:
+    """
+    Вычисляет тренды показателей по дневным столбцам.
+
+    Args:
+        columns (dict[str, np.ndarray]): Результат
+         get_daily_columns_last_n_days (не короче 14 дней).
+
+    Returns:
+        dict: По ключам sleep, calories и workouts - словари
+         с ключами mean_7 и mean_30 (последние значения скользящих
+         средних), rolling_7 (массив скользящего среднего за 7 дней),
+         week_delta (среднее последних 7 дней минус среднее
+         предыдущих 7) и slope (изменение за день по линейному
+         тренду окна); по ключу streak - (текущая, самая длинная)
+         серии дней с записями. Отсутствующие значения - NaN.
+    """
+    values = _matrix(columns)
+    rolling_7 = rolling_mean(values, 7)
+    rolling_30 = rolling_mean(values, 30)
+    previous_week = rolling_7[:, -8] if values.shape[-1] >= 8 \
+        else np.full(len(METRICS), np.nan)
+    week_delta = rolling_7[:, -1] - previous_week
+    slopes = _slopes(values)
+
+    trends: dict = {
+        metric: {"mean_7": float(rolling_7[i, -1]),
+                 "mean_30": float(rolling_30[i, -1]),
+                 "rolling_7": rolling_7[i],
+                 "week_delta": float(week_delta[i]),
+                 "slope": float(slopes[i])}
+        for i, metric in enumerate(METRICS)}
+    trends["streak"] = logging_streaks(columns)
+    return trends
+
+
+def get_trends_text(user_id: int) -> str:
+    """
+    Генерирует текстовый отчет по трендам за последние TREND_DAYS дней.
+
+    Args:
+        user_id (int): Идентификатор пользователя.
+
+    Returns:
+        str: Текст отчета для команды /trends.
+    """
+    columns = get_storage().get_daily_columns_last_n_days(user_id,
+                                                          TREND_DAYS)
+    if not has_data(columns):
+        return f"📈 Нет данных за последние {TREND_DAYS} дней."
+    trends = compute_trends(columns)
+
+    report = [f"📈 Тренды за последние {TREND_DAYS} дней:\n"]
+    for metric, title, formatter in (
+            ("sleep", "😴 Сон", format_timedelta),
+            ("calories", "🍎 Калории", format_calories),
+            ("workouts", "💪 Тренировки, в день", format_timedelta)):
+        metric_trends = trends[metric]
+        if np.isnan(metric_trends["mean_30"]):
+            report.append(f"{title}: Нет данных.")
+            continue
+        report.append(f"{title}:")
+        if not np.isnan(metric_trends["mean_7"]):
+            report.append("  - Среднее за 7 дней:"
+                          f" {formatter(metric_trends['mean_7'])}")
+        report.append("  - Среднее за 30 дней:"
+                      f" {formatter(metric_trends['mean_30'])}")
+        week_delta = metric_trends["week_delta"]
+        if not np.isnan(week_delta):
+            report.append("  - К прошлой неделе:"
+                          f" {format_change(week_delta, formatter)}")
+        weekly_slope = metric_trends["slope"] * 7
+        if not np.isnan(weekly_slope):
+            report.append("  - Тренд:"
+                          f" {format_change(weekly_slope, formatter)}"
+                          " в неделю")
+    current, longest = trends["streak"]
+    report.append(f"\n🔥 Дней подряд с записями: {current}"
+                  f" (лучшая серия: {longest})")
+    return "\n".join(report)
@@ -0,0 +1,117 @@
+"""
+ТЕСТЫ АРХИВАЦИИ СТАРЫХ ЗАПИСЕЙ
+"""
+import io
+import sqlite3
+from datetime import date, timedelta
+from unittest.mock import patch
+import pytest
+
+from telegram_tracker_bot.db import (
+    initialize_db,
+    add_sleep_record,
+    add_workout_record,
+    get_records_last_n_days,
+    get_all_records_last_n_days,
+    get_daily_summary_last_n_days,
+    archive_old_records,
+    close_all_pools
+)
+from telegram_tracker_bot.db import archive
+from telegram_tracker_bot.db.transfer import export_records
+
+
+def days_ago(n):
+    """Дата n дней назад в формате ГГГГ-ММ-ДД"""
+    return (date.today() - timedelta(days=n)).strftime('%Y-%m-%d')
+
+
+@pytest.fixture
+def database(tmp_path):
+    """Фикстура тестовой БД с записями во временной директории"""
+    path = str(tmp_path / "tracker.db")
+    initialize_db(path)
+    add_sleep_record(1, days_ago(200), 6.0, path)
+    add_sleep_record(1, days_ago(100), 7.0, path)
+    add_sleep_record(1, days_ago(1), 8.0, path)
+    add_workout_record(1, days_ago(150), 1.0, "Бег", path)
+    yield path
+    close_all_pools()
+
+
+def test_old_records_leave_hot_tables(database):
+    """Тест переноса записей старше горизонта"""
+    assert archive_old_records(database, 90) == 3
+    conn = sqlite3.connect(database)
+    hot = conn.execute("SELECT COUNT(*) FROM sleep").fetchone()[0]
+    chunks = conn.execute("SELECT SUM(row_count), MIN(compressed)"
+                          " FROM archive_chunks").fetchone()
+    conn.close()
+    assert hot == 1
+    assert chunks == (3, 1)
+
+
+def test_long_window_reads_through_archive(database):
+    """Тест прозрачного чтения архива для длинного окна"""
+    archive_old_records(database, 90)
+    records = get_records_last_n_days(1, "sleep", 365, database)
+    assert [record.hours for record in records] == [8.0, 7.0, 6.0]
+    assert records[1].date == days_ago(100)
+    bundle = get_all_records_last_n_days(1, 365, database)
+    assert bundle["workouts"] == [{"date": days_ago(150),
+                                   "duration_hours": 1.0,
+                                   "activity_type": "Бег"}]
+    assert len(get_records_last_n_days(1, "sleep", 7, database)) == 1
+
+
+def test_archive_keeps_summaries_and_export(database):
+    """Тест сохранности сводок и выгрузки после архивации"""
+    before = get_daily_summary_last_n_days(1, 365, database)
+    archive_old_records(database, 90)
+    assert get_daily_summary_last_n_days(1, 365, database) == before
+    buffer = io.StringIO()
+    assert export_records(database, buffer, "jsonl") == 4
+
+
+def test_repeated_archiving_merges_chunks(database):
+    """Тест дозаписи в существующий блок архива"""
+    archive_old_records(database, 90, compress=False)
+    add_sleep_record(1, days_ago(200), 5.0, database)
+    assert archive_old_records(database, 90) == 1
+    records = get_records_last_n_days(1, "sleep", 365, database)
+    assert sorted(record.hours for record in records) == [5.0, 6.0,
+                                                          7.0, 8.0]
+
+
+def test_failed_chunk_keeps_its_records(database):
+    """Тест сохранности записей блока, перенос которого не удался"""
+    store_chunk = archive._store_chunk
+    calls = []
+
+    def failing_store_chunk(*args):
+        calls.append(args)
+        if len(calls) == 2:
+            raise sqlite3.OperationalError("database is locked")
+        store_chunk(*args)
+
+    with patch.object(archive, "_store_chunk", failing_store_chunk):
+        with pytest.raises(sqlite3.OperationalError):
+            archive_old_records(database, 90)
+    conn = sqlite3.connect(database)
+    hot = conn.execute("SELECT COUNT(*) FROM sleep").fetchone()[0]
+    archived = conn.execute("SELECT SUM(row_count)"
+                            " FROM archive_chunks").fetchone()[0]
+    conn.close()
+    assert (hot, archived) == (2, 1)
+    assert len(get_records_last_n_days(1, "sleep", 365, database)) == 3
+
+
+def test_short_window_skips_archive(database):
+    """Тест чтения окна внутри горизонта без обращения к архиву"""
+    archive_old_records(database, 90)
+    with patch.object(archive, "_decode") as decode:
+        get_records_last_n_days(1, "sleep", 30, database)
+        get_all_records_last_n_days(1, 30, database)
+        decode.assert_not_called()
+        get_records_last_n_days(1, "sleep", 365, database)
+        decode.assert_called()
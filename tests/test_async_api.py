@@ -0,0 +1,45 @@
+"""
+ТЕСТЫ АСИНХРОННОГО ИНТЕРФЕЙСА БАЗЫ ДАННЫХ
+"""
+import asyncio
+import datetime
+import threading
+import pytest
+
+from telegram_tracker_bot.db import (
+    initialize_db,
+    add_sleep_record,
+    close_all_pools,
+    run_in_db_executor,
+    async_get_records_last_n_days,
+    shutdown_db_executor
+)
+
+
+@pytest.fixture
+def database(tmp_path):
+    """Фикстура тестовой БД во временной директории"""
+    path = str(tmp_path / "tracker.db")
+    initialize_db(path)
+    yield path
+    shutdown_db_executor()
+    close_all_pools()
+
+
+def test_run_in_db_executor_uses_worker_thread():
+    """Тест выполнения функции вне потока цикла событий"""
+    main_thread = threading.get_ident()
+    worker_thread = asyncio.run(run_in_db_executor(threading.get_ident))
+    shutdown_db_executor()
+    assert worker_thread != main_thread
+
+
+def test_async_get_records(database):
+    """Тест асинхронного чтения"""
+    today = datetime.date.today().strftime('%Y-%m-%d')
+    add_sleep_record(1, today, 7.5, database)
+
+    records = asyncio.run(
+        async_get_records_last_n_days(1, "sleep", 7, database))
+    assert len(records) == 1
+    assert records[0].hours == 7.5
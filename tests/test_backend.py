@@ -0,0 +1,118 @@
+"""
+ТЕСТЫ ХРАНИЛИЩ ДАННЫХ
+"""
+import asyncio
+from datetime import date, timedelta
+import numpy as np
+import pytest
+
+from telegram_tracker_bot.db import (
+    SQLiteBackend,
+    create_storage,
+    close_all_pools,
+    close_write_queues,
+    SleepRecord,
+    WorkoutRecord,
+    date_to_day,
+    format_day,
+    shutdown_db_executor
+)
+from telegram_tracker_bot.db.memory import MemoryBackend
+
+
+def days_ago(n):
+    """Дата n дней назад в формате ГГГГ-ММ-ДД"""
+    return (date.today() - timedelta(days=n)).strftime('%Y-%m-%d')
+
+
+@pytest.fixture(params=["sqlite", "memory"])
+def storage(request, tmp_path):
+    """Фикстура хранилища каждого вида"""
+    backend = create_storage(request.param, str(tmp_path / "tracker.db"))
+    backend.initialize()
+    backend.add_sleep_record(1, days_ago(1), 7.0)
+    backend.add_sleep_record(1, days_ago(1), 1.5)
+    backend.add_sleep_record(1, days_ago(10), 8.0)
+    backend.add_calories_record(1, days_ago(0), 2000)
+    backend.add_workout_record(1, days_ago(2), 1.0, "Бег")
+    backend.add_workout_record(1, days_ago(2), 0.5, "Йога")
+    backend.add_sleep_record(2, days_ago(0), 6.0)
+    yield backend
+    asyncio.run(close_write_queues())
+    shutdown_db_executor()
+    close_all_pools()
+
+
+def test_create_storage():
+    """Тест выбора хранилища по названию"""
+    assert isinstance(create_storage("sqlite", "tracker.db"), SQLiteBackend)
+    assert isinstance(create_storage("memory", "tracker.db"), MemoryBackend)
+    with pytest.raises(ValueError):
+        create_storage("redis", "tracker.db")
+
+
+def test_records_window(storage):
+    """Тест выборки записей за окно"""
+    records = storage.get_records_last_n_days(1, "sleep", 7)
+    assert [(r.user_id, r.date, r.hours) for r in records] == [
+        (1, days_ago(1), 7.0), (1, days_ago(1), 1.5)]
+    assert storage.get_records_last_n_days(3, "sleep", 7) == []
+    with pytest.raises(ValueError):
+        storage.get_records_last_n_days(1, "users", 7)
+
+
+def test_all_records(storage):
+    """Тест выборки всех таблиц"""
+    records = storage.get_all_records_last_n_days(1, 7)
+    assert records["calories"] == [{"date": days_ago(0), "amount": 2000}]
+    assert sorted(w["activity_type"] for w in records["workouts"]) == [
+        "Бег", "Йога"]
+    assert len(records["sleep"]) == 2
+
+
+def test_daily_summary(storage):
+    """Тест дневных сводок"""
+    days = storage.get_daily_summary_last_n_days(1, 7)
+    assert [format_day(day["day"]) for day in days] == [
+        days_ago(2), days_ago(1), days_ago(0)]
+    assert days[0]["workout_hours"] == 1.5
+    assert days[0]["activities"] == {"Бег": 1.0, "Йога": 0.5}
+    assert days[0]["sleep_hours"] is None
+    assert days[1]["sleep_hours"] == 8.5
+    assert days[1]["sleep_count"] == 2
+    assert days[2]["calories"] == 2000
+
+
+def test_daily_columns(storage):
+    """Тест дневных столбцов"""
+    columns = storage.get_daily_columns_last_n_days(1, 7)
+    np.testing.assert_array_equal(
+        columns["workouts"], [0, 0, 0, 0, 1.5, 0, 0])
+    assert columns["sleep"][5] == 8.5
+    assert np.isnan(columns["sleep"][6])
+    assert columns["calories"][6] == 2000
+
+
+def test_async_writes(storage):
+    """Тест асинхронной записи"""
+    async def write():
+        await storage.async_add_sleep_record(5, days_ago(0), 7.0)
+        await storage.async_add_calories_record(5, days_ago(0), 1500)
+        await storage.async_add_workout_record(5, days_ago(0), 1.0, "Бег")
+        await storage.close()
+
+    asyncio.run(write())
+    day = storage.get_daily_summary_last_n_days(5, 1)[0]
+    assert (day["sleep_hours"], day["calories"], day["workout_hours"]) == (
+        7.0, 1500, 1.0)
+
+
+def test_records_are_typed(storage):
+    """Тест типизированных записей таблиц"""
+    sleep = storage.get_records_last_n_days(1, "sleep", 7)[0]
+    workout = storage.get_records_last_n_days(1, "workouts", 7)[0]
+    assert isinstance(sleep, SleepRecord)
+    assert isinstance(workout, WorkoutRecord)
+    assert sleep.day == date_to_day(sleep.date)
+    assert (workout.duration_hours, workout.activity_type) in {
+        (1.0, "Бег"), (0.5, "Йога")}
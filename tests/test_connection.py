@@ -0,0 +1,65 @@
+"""
+ТЕСТЫ ПУЛА ПОДКЛЮЧЕНИЙ
+"""
+import os
+import sqlite3
+import pytest
+
+from telegram_tracker_bot.db.connection import (
+    ConnectionPool,
+    connection,
+    get_pool,
+    close_all_pools
+)
+
+
+@pytest.fixture
+def database(tmp_path, monkeypatch):
+    """Фикстура относительного пути к БД во временной директории"""
+    monkeypatch.chdir(tmp_path)
+    yield "tracker.db"
+    close_all_pools()
+
+
+def test_connection_uses_wal(database):
+    """Тест режима журнала WAL и настроек PRAGMA"""
+    with connection(database) as conn:
+        mode = conn.execute("PRAGMA journal_mode").fetchone()[0]
+        synchronous = conn.execute("PRAGMA synchronous").fetchone()[0]
+    assert mode == "wal"
+    assert synchronous == 1
+
+
+def test_connection_is_reused(database):
+    """Тест повторного использования подключения"""
+    with connection(database) as first:
+        pass
+    with connection(database) as second:
+        pass
+    assert first is second
+    assert get_pool(database) is get_pool(os.path.abspath(database))
+
+
+def test_connection_rolls_back_on_error(database):
+    """Тест отката транзакции при исключении"""
+    with connection(database) as conn:
+        conn.execute("CREATE TABLE items (value INTEGER)")
+    with pytest.raises(RuntimeError):
+        with connection(database) as conn:
+            conn.execute("INSERT INTO items VALUES (1)")
+            raise RuntimeError("ошибка")
+    with connection(database) as conn:
+        count = conn.execute("SELECT COUNT(*) FROM items").fetchone()[0]
+    assert count == 0
+
+
+def test_pool_is_bounded(database):
+    """Тест ограничения размера пула"""
+    pool = ConnectionPool(database, size=1, timeout=0.01)
+    conn = pool.acquire()
+    with pytest.raises(sqlite3.OperationalError):
+        pool.acquire()
+    pool.release(conn)
+    assert pool.acquire() is conn
+    pool.release(conn)
+    pool.close()
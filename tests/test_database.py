@@ -4,6 +4,7 @@
 import os
 import sqlite3
 from datetime import datetime, timedelta
+import numpy as np
 import pytest
 
 from telegram_tracker_bot.db import (
@@ -11,7 +12,14 @@ from telegram_tracker_bot.db import (
     add_sleep_record,
     add_calories_record,
     add_workout_record,
-    get_records_last_n_days
+    get_records_last_n_days,
+    get_all_records_last_n_days,
+    get_daily_summary_last_n_days,
+    get_daily_columns_last_n_days,
+    get_window_totals_last_n_days,
+    totals_from_summary,
+    date_to_day,
+    close_all_pools
 )
 
 TEST_DB_NAME = "test_health_bot.db"
@@ -24,6 +32,7 @@ def setup_database():
         os.remove(TEST_DB_NAME)
     initialize_db(TEST_DB_NAME)
     yield
+    close_all_pools()
     if os.path.exists(TEST_DB_NAME):
         os.remove(TEST_DB_NAME)
 
@@ -104,9 +113,9 @@ def test_get_records_last_n_days(setup_database):
         add_sleep_record(user_id, date, 7 + i * 0.5, TEST_DB_NAME)
     records = get_records_last_n_days(user_id, "sleep", 3, TEST_DB_NAME)
     assert len(records) == 3
-    assert records[0]['date'] == test_dates[0]
-    assert records[1]['date'] == test_dates[1]
-    assert records[2]['date'] == test_dates[2]
+    assert records[0].date == test_dates[0]
+    assert records[1].date == test_dates[1]
+    assert records[2].date == test_dates[2]
     with pytest.raises(ValueError):
         get_records_last_n_days(user_id, "nonexistent_table", 3, TEST_DB_NAME)
 
@@ -131,3 +140,91 @@ def test_multiple_users(setup_database):
     cursor.execute("SELECT * FROM calories WHERE user_id = ?", (user2,))
     assert len(cursor.fetchall()) == 1
     conn.close()
+
+
+def test_get_all_records_last_n_days(setup_database):
+    """Тест получения записей всех таблиц одним запросом"""
+    user_id = 3
+    today = datetime.now().date().strftime('%Y-%m-%d')
+    old_date = (datetime.now().date()
+                - timedelta(days=10)).strftime('%Y-%m-%d')
+    add_sleep_record(user_id, today, 7.5, TEST_DB_NAME)
+    add_sleep_record(user_id, old_date, 6.0, TEST_DB_NAME)
+    add_calories_record(user_id, today, 1800, TEST_DB_NAME)
+    add_workout_record(user_id, today, 1.25, "Бег", TEST_DB_NAME)
+    records = get_all_records_last_n_days(user_id, 7, TEST_DB_NAME)
+    assert records["sleep"] == [{"date": today, "hours": 7.5}]
+    assert records["calories"] == [{"date": today, "amount": 1800}]
+    assert records["workouts"] == [{"date": today, "duration_hours": 1.25,
+                                    "activity_type": "Бег"}]
+
+
+def test_get_daily_summary_last_n_days(setup_database):
+    """Тест дневной сводки, обновляемой при добавлении записей"""
+    user_id = 4
+    today = datetime.now().date().strftime('%Y-%m-%d')
+    add_sleep_record(user_id, today, 6.0, TEST_DB_NAME)
+    add_sleep_record(user_id, today, 1.5, TEST_DB_NAME)
+    add_workout_record(user_id, today, 0.5, "Бег", TEST_DB_NAME)
+    add_workout_record(user_id, today, 1.0, "Бег", TEST_DB_NAME)
+    add_workout_record(user_id, today, 0.25, "Йога", TEST_DB_NAME)
+    days = get_daily_summary_last_n_days(user_id, 7, TEST_DB_NAME)
+    assert len(days) == 1
+    assert days[0]["day"] == date_to_day(today)
+    assert days[0]["sleep_hours"] == 7.5
+    assert days[0]["sleep_count"] == 2
+    assert days[0]["calories"] is None
+    assert days[0]["calories_count"] == 0
+    assert days[0]["workout_hours"] == 1.75
+    assert days[0]["workout_count"] == 3
+    assert days[0]["activities"] == {"Бег": 1.5, "Йога": 0.25}
+
+
+def test_get_daily_columns_last_n_days(setup_database):
+    """Тест столбцовой выборки по плотной сетке дней"""
+    user_id = 5
+    today = datetime.now().date()
+    two_days_ago = (today - timedelta(days=2)).strftime('%Y-%m-%d')
+    add_sleep_record(user_id, two_days_ago, 7.0, TEST_DB_NAME)
+    add_calories_record(user_id, today.strftime('%Y-%m-%d'),
+                        1500, TEST_DB_NAME)
+    columns = get_daily_columns_last_n_days(user_id, 4, TEST_DB_NAME)
+    assert columns["date"].dtype == np.dtype('datetime64[D]')
+    assert str(columns["date"][-1]) == today.strftime('%Y-%m-%d')
+    np.testing.assert_array_equal(columns["sleep"],
+                                  [np.nan, 7.0, np.nan, np.nan])
+    np.testing.assert_array_equal(columns["calories"],
+                                  [np.nan, np.nan, np.nan, 1500.0])
+    np.testing.assert_array_equal(columns["workouts"], [0, 0, 0, 0])
+
+
+def test_get_window_totals_last_n_days(setup_database):
+    """Тест итогов за период, агрегируемых в SQLite"""
+    user_id = 6
+    today = datetime.now().date()
+
+    def day(n):
+        return (today - timedelta(days=n)).strftime('%Y-%m-%d')
+
+    add_sleep_record(user_id, day(0), 7.0, TEST_DB_NAME)
+    add_sleep_record(user_id, day(0), 1.0, TEST_DB_NAME)
+    add_sleep_record(user_id, day(100), 6.0, TEST_DB_NAME)
+    add_calories_record(user_id, day(20), 2000, TEST_DB_NAME)
+    add_workout_record(user_id, day(3), 0.5, "Йога", TEST_DB_NAME)
+    add_workout_record(user_id, day(50), 2.0, "Бег", TEST_DB_NAME)
+    add_workout_record(user_id, day(400), 3.0, "Бег", TEST_DB_NAME)
+
+    totals = get_window_totals_last_n_days(user_id, 365, TEST_DB_NAME)
+    assert totals == {"sleep_days": 2, "sleep_count": 3, "sleep_hours": 14.0,
+                      "calories_days": 1, "calories_count": 1,
+                      "calories": 2000,
+                      "workout_days": 2, "workout_count": 2,
+                      "workout_hours": 2.5,
+                      "activities": {"Бег": 2.0, "Йога": 0.5}}
+    assert totals == totals_from_summary(
+        get_daily_summary_last_n_days(user_id, 365, TEST_DB_NAME))
+    assert get_window_totals_last_n_days(7, 30, TEST_DB_NAME) == {
+        "sleep_days": 0, "sleep_count": 0, "sleep_hours": 0.0,
+        "calories_days": 0, "calories_count": 0, "calories": 0,
+        "workout_days": 0, "workout_count": 0, "workout_hours": 0.0,
+        "activities": {}}
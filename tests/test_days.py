@@ -0,0 +1,44 @@
+"""
+ТЕСТЫ НОМЕРОВ ДНЕЙ
+"""
+import datetime
+import sqlite3
+import numpy as np
+import pytest
+
+from telegram_tracker_bot.db import date_to_day, day_to_date, format_day
+from telegram_tracker_bot.db.days import SQL_DAY, day_window
+
+
+def test_day_matches_numpy_and_sqlite():
+    """Тест совпадения номера дня с datetime64[D] и SQL-выражением"""
+    day = date_to_day("2024-02-29")
+    assert day == np.datetime64("2024-02-29", 'D').astype(int)
+    assert date_to_day(datetime.date(2024, 2, 29)) == day
+    conn = sqlite3.connect(":memory:")
+    sql_day = conn.execute(
+        f"SELECT {SQL_DAY.format('?')}", ("2024-02-29",)).fetchone()[0]
+    conn.close()
+    assert sql_day == day
+
+
+def test_round_trip():
+    """Тест обратного перевода номера дня в дату"""
+    assert date_to_day("1970-01-01") == 0
+    assert day_to_date(19723) == datetime.date(2024, 1, 1)
+    assert format_day(date_to_day("2024-12-31")) == "2024-12-31"
+
+
+def test_day_window():
+    """Тест окна последних дней"""
+    start_day, today = day_window(7)
+    assert today == date_to_day(datetime.date.today())
+    assert today - start_day == 6
+
+
+def test_invalid_date():
+    """Тест отказа для некорректной даты"""
+    with pytest.raises(ValueError):
+        date_to_day("вчера")
+    with pytest.raises(TypeError):
+        date_to_day(None)
@@ -0,0 +1,136 @@
+"""
+ТЕСТЫ НЕДЕЛЬНОЙ СВОДКИ
+"""
+import asyncio
+from datetime import date, timedelta
+from unittest.mock import AsyncMock, patch
+import pytest
+from telegram.error import Forbidden, RetryAfter
+
+from telegram_tracker_bot.db import (
+    SQLiteBackend,
+    set_storage,
+    close_write_queues,
+    date_to_day,
+    get_daily_summary_last_n_days,
+    get_daily_summaries_for_users,
+    get_running_stats,
+    get_running_stats_for_users,
+)
+from telegram_tracker_bot.db.memory import MemoryBackend
+from telegram_tracker_bot.handlers import jobs
+from telegram_tracker_bot.logic import (digest_week, build_digest_batch,
+                                        get_stats_text)
+
+
+def days_ago(n):
+    """Дата n дней назад в формате ГГГГ-ММ-ДД"""
+    return (date.today() - timedelta(days=n)).strftime('%Y-%m-%d')
+
+
+@pytest.fixture
+def storage():
+    """Фикстура хранилища в памяти с пятью активными пользователями"""
+    backend = MemoryBackend()
+    for user_id in range(1, 6):
+        backend.add_sleep_record(user_id, days_ago(1), 7.0 + user_id / 10)
+    backend.add_workout_record(2, days_ago(2), 1.0, "Бег")
+    # давно не записывавший пользователь сводку не получает
+    backend.add_sleep_record(9, days_ago(30), 8.0)
+    set_storage(backend)
+    yield backend
+    set_storage(None)
+
+
+@pytest.fixture(autouse=True)
+def no_pause():
+    """Отключает паузы между сообщениями"""
+    with patch.object(jobs.asyncio, "sleep", AsyncMock()) as sleep:
+        yield sleep
+
+
+def sent_to(bot):
+    """ID получателей отправленных сообщений"""
+    return [call.kwargs["chat_id"]
+            for call in bot.send_message.call_args_list]
+
+
+def test_digest_week():
+    """Тест недели рассылки"""
+    monday = date(2024, 5, 6)
+    assert digest_week(monday) == date_to_day(monday)
+    assert digest_week(date(2024, 5, 12)) == date_to_day(monday)
+
+
+def test_batch_matches_stats_report(storage):
+    """Тест совпадения сводки с отчетом /stats"""
+    batch = build_digest_batch([2, 9])
+
+    assert [user_id for user_id, _ in batch] == [2, 9]
+    assert batch[0][1].startswith("🗓 Итоги недели")
+    assert batch[0][1].endswith(get_stats_text(2, 7))
+
+
+def test_sends_to_active_users(storage):
+    """Тест рассылки всем активным пользователям"""
+    bot = AsyncMock()
+    assert asyncio.run(jobs.run_digest(bot)) == 5
+
+    assert sent_to(bot) == [1, 2, 3, 4, 5]
+    assert storage.get_digest_progress(digest_week()) == (5, 5, True)
+    # повторный запуск на той же неделе ничего не отправляет
+    assert asyncio.run(jobs.run_digest(bot)) == 0
+
+
+def test_resume_after_restart(storage):
+    """Тест продолжения прерванной рассылки"""
+    storage.save_digest_progress(digest_week(), 2, 2, False)
+    bot = AsyncMock()
+
+    assert asyncio.run(jobs.run_digest(bot, resume_only=True)) == 3
+    assert sent_to(bot) == [3, 4, 5]
+    assert storage.get_digest_progress(digest_week()) == (5, 5, True)
+
+
+def test_resume_only_does_not_start(storage):
+    """Тест запуска бота без начатой рассылки"""
+    bot = AsyncMock()
+
+    assert asyncio.run(jobs.run_digest(bot, resume_only=True)) == 0
+    assert not bot.send_message.called
+
+
+def test_rate_limit_and_blocked_users(storage, no_pause):
+    """Тест повтора после лимита Telegram и пропуска заблокировавших"""
+    bot = AsyncMock()
+    bot.send_message.side_effect = [None, RetryAfter(3), None,
+                                    Forbidden("blocked"), None, None]
+
+    assert asyncio.run(jobs.run_digest(bot)) == 4
+    assert sent_to(bot) == [1, 2, 2, 3, 4, 5]
+    no_pause.assert_any_await(3)
+
+
+def test_batched_reads_match_per_user(tmp_path):
+    """Тест пакетных выборок SQLite"""
+    backend = SQLiteBackend(str(tmp_path / "tracker.db"))
+    backend.initialize()
+    database = backend.database_name
+    for user_id in range(1, 4):
+        backend.add_sleep_record(user_id, days_ago(1), 7.0)
+        backend.add_workout_record(user_id, days_ago(2), 1.0, "Бег")
+        backend.add_workout_record(user_id, days_ago(2), 0.5, "Йога")
+    user_ids = [1, 2, 3, 4]
+
+    summaries = get_daily_summaries_for_users(user_ids, 7, database)
+    stats = get_running_stats_for_users(user_ids, database)
+
+    for user_id in user_ids:
+        assert summaries[user_id] == get_daily_summary_last_n_days(
+            user_id, 7, database)
+        assert stats[user_id] == get_running_stats(user_id, database)
+    assert backend.get_active_user_ids(7) == [1, 2, 3]
+    backend.save_digest_progress(100, 2, 2, False)
+    assert backend.get_digest_progress(100) == (2, 2, False)
+    assert backend.get_digest_progress(101) is None
+    asyncio.run(close_write_queues())
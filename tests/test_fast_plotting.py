@@ -0,0 +1,146 @@
+"""
+ТЕСТЫ БЫСТРОЙ ОТРИСОВКИ ГРАФИКА (PILLOW)
+"""
+import datetime
+import numpy as np
+import pytest
+from PIL import Image
+
+from telegram_tracker_bot.logic import (render_weekly_plot,
+                                        render_weekly_plot_fast)
+from telegram_tracker_bot.logic.plotting import (get_weekly_renderer,
+                                                 weekly_plot_key)
+
+
+def week_columns():
+    """Столбцы за 7 дней: сон и растущие тренировки каждый день,
+    калории с пропусками"""
+    today = np.datetime64(datetime.date.today(), 'D')
+    return {"date": np.arange(today - np.timedelta64(6, 'D'),
+                              today + np.timedelta64(1, 'D')),
+            "sleep": np.array([7.5, 6.0, 8.0, 6.5, 7.0, 9.0, 8.25]),
+            "calories": np.array([2000, 2100, np.nan, 1800, 2500, 2300,
+                                  np.nan]),
+            # легенда тренировок остается в левом верхнем углу
+            "workouts": np.array([0.25, 0.5, 0.75, 1.0, 1.25, 1.5, 2.0])}
+
+
+def pixels(buf):
+    """Изображение в виде массива RGB"""
+    return np.asarray(Image.open(buf).convert("RGB")).astype(int)
+
+
+def frame_rows(image):
+    """Строки горизонтальных сторон рамок осей"""
+    dark = image[:, 100:971].sum(axis=2) < 200
+    return np.flatnonzero(dark.mean(axis=1) > 0.9)
+
+
+def bars(image):
+    """(левый край, правый край, верх) столбцов тренировок"""
+    red, green, blue = image[..., 0], image[..., 1], image[..., 2]
+    # пунктир сетки поверх столбца тоже остается зеленоватым
+    mask = (green - red > 20) & (green - blue > 20)
+    tops = {}
+    for x in range(image.shape[1]):
+        rows = np.flatnonzero(mask[:, x])
+        # легенда со своим зеленым прямоугольником ниже 30 пикселей
+        if rows.size > 30:
+            runs = np.split(rows, np.flatnonzero(np.diff(rows) > 1) + 1)
+            tops[x] = max(runs, key=len)[0]
+    spans, start = [], None
+    for x in sorted(tops):
+        if start is None:
+            start = x
+        if x + 1 not in tops:
+            spans.append((start, x, int(np.median(
+                [tops[column] for column in range(start, x + 1)]))))
+            start = None
+    return spans
+
+
+def color_rows(image, channel):
+    """Строки пикселей чистого синего (2) или красного (0) цвета"""
+    others = [index for index in range(3) if index != channel]
+    mask = ((image[..., channel] - image[..., others[0]] > 150)
+            & (image[..., channel] - image[..., others[1]] > 150))
+    return np.flatnonzero(mask.any(axis=1))
+
+
+@pytest.fixture(scope="module")
+def images():
+    """Один и тот же график, построенный matplotlib и Pillow"""
+    columns = week_columns()
+    return (pixels(render_weekly_plot(123, columns)),
+            pixels(render_weekly_plot_fast(123, columns)))
+
+
+def test_same_size(images):
+    """Тест размера изображения"""
+    reference, fast = images
+    assert fast.shape == reference.shape == (1200, 1000, 3)
+
+
+def test_axes_frames_match(images):
+    """Тест совпадения рамок трех осей"""
+    reference, fast = images
+    expected, actual = frame_rows(reference), frame_rows(fast)
+
+    assert len(expected) >= 6
+    for row in expected:
+        assert np.abs(actual - row).min() <= 2
+    for row in actual:
+        assert np.abs(expected - row).min() <= 2
+
+
+def test_bars_match(images):
+    """Тест положения, ширины и высоты столбцов"""
+    reference, fast = images
+    expected, actual = bars(reference), bars(fast)
+
+    assert len(expected) == len(actual) == 7
+    for (left, right, top), (fast_left, fast_right, fast_top) in zip(
+            expected, actual):
+        assert abs(left - fast_left) <= 2
+        assert abs(right - fast_right) <= 2
+        assert abs(top - fast_top) <= 2
+
+
+def test_lines_stay_in_their_panels(images):
+    """Тест линий сна и калорий в своих осях"""
+    for image in images:
+        sleep_rows, calories_rows = color_rows(image, 2), color_rows(image, 0)
+        assert 72 <= sleep_rows.min() and sleep_rows.max() <= 395
+        assert 426 <= calories_rows.min() and calories_rows.max() <= 750
+
+
+def test_no_data():
+    """Тест отсутствия данных"""
+    columns = week_columns()
+    columns["sleep"][:] = np.nan
+    columns["calories"][:] = np.nan
+    columns["workouts"][:] = 0.0
+
+    assert render_weekly_plot_fast(123, columns) is None
+
+
+def test_annotations_can_be_disabled():
+    """Тест графика без подписей значений"""
+    columns = week_columns()
+    annotated = render_weekly_plot_fast(123, columns).getvalue()
+    plain = render_weekly_plot_fast(123, columns, annotate=False).getvalue()
+
+    assert plain.startswith(b"\x89PNG")
+    assert plain != annotated
+
+
+def test_renderer_selection():
+    """Тест выбора способа отрисовки и ключа кэша"""
+    columns = week_columns()
+
+    assert get_weekly_renderer("matplotlib") is render_weekly_plot
+    assert get_weekly_renderer("pillow") is render_weekly_plot_fast
+    with pytest.raises(ValueError):
+        get_weekly_renderer("svg")
+    assert (weekly_plot_key(1, columns, renderer="pillow")
+            != weekly_plot_key(1, columns))
@@ -0,0 +1,179 @@
+"""
+ТЕСТЫ КЭША ПОСЛЕДНИХ ДНЕЙ ПОЛЬЗОВАТЕЛЕЙ
+"""
+import asyncio
+from datetime import date, timedelta
+from unittest.mock import patch
+import numpy as np
+import pytest
+
+from telegram_tracker_bot.db import (
+    SQLiteBackend,
+    close_write_queues,
+    get_daily_summary_last_n_days,
+    get_daily_columns_last_n_days,
+    get_all_records_last_n_days,
+    date_to_day,
+    SleepRecord,
+)
+from telegram_tracker_bot.db import backend as backend_module
+from telegram_tracker_bot.db.hot_cache import HotWindowCache
+
+
+def days_ago(n):
+    """Дата n дней назад в формате ГГГГ-ММ-ДД"""
+    return (date.today() - timedelta(days=n)).strftime('%Y-%m-%d')
+
+
+def sleep(record_id, user_id, n, hours):
+    """Запись о сне n дней назад"""
+    return SleepRecord(record_id, user_id, days_ago(n),
+                       date_to_day(days_ago(n)), hours, "")
+
+
+@pytest.fixture
+def storage(tmp_path):
+    """Фикстура SQLite-хранилища с записями за последние дни"""
+    backend = SQLiteBackend(str(tmp_path / "tracker.db"))
+    backend.initialize()
+    backend.add_sleep_record(1, days_ago(1), 7.0)
+    backend.add_sleep_record(1, days_ago(1), 1.5)
+    backend.add_sleep_record(1, days_ago(40), 8.0)
+    backend.add_calories_record(1, days_ago(0), 2000)
+    backend.add_workout_record(1, days_ago(2), 1.0, "Бег")
+    backend.add_workout_record(1, days_ago(2), 0.5, "Йога")
+    yield backend
+    asyncio.run(close_write_queues())
+
+
+def test_repeat_reads_do_not_touch_database(storage):
+    """Тест ответа из кэша без обращения к SQLite"""
+    storage.get_records_last_n_days(1, "sleep", 7)
+    with patch.object(backend_module, "get_records_last_n_days") as load, \
+            patch("telegram_tracker_bot.db.database.connection") as conn:
+        records = storage.get_records_last_n_days(1, "sleep", 7)
+        storage.get_daily_summary_last_n_days(1, 7)
+        storage.get_daily_columns_last_n_days(1, 30)
+        storage.get_all_records_last_n_days(1, 7)
+
+    assert not load.called
+    assert not conn.called
+    assert [record.hours for record in records] == [7.0, 1.5]
+
+
+def test_cache_matches_database(storage):
+    """Тест совпадения ответов кэша с выборками из SQLite"""
+    database = storage.database_name
+    storage.add_sleep_record(1, days_ago(3), 6.0)
+
+    assert (storage.get_daily_summary_last_n_days(1, 30)
+            == get_daily_summary_last_n_days(1, 30, database))
+    # порядок записей одного дня не задан
+    cached = storage.get_all_records_last_n_days(1, 30)
+    expected = get_all_records_last_n_days(1, 30, database)
+    for table in ("sleep", "calories", "workouts"):
+        assert (sorted(map(sorted, map(dict.items, cached[table])))
+                == sorted(map(sorted, map(dict.items, expected[table]))))
+    cached = storage.get_daily_columns_last_n_days(1, 30)
+    expected = get_daily_columns_last_n_days(1, 30, database)
+    for name in ("date", "sleep", "calories", "workouts"):
+        np.testing.assert_array_equal(cached[name], expected[name])
+
+
+def test_write_through(storage):
+    """Тест обновления кэша при записи"""
+    assert len(storage.get_records_last_n_days(1, "workouts", 7)) == 2
+
+    storage.add_workout_record(1, days_ago(0), 2.0, "Плавание")
+    asyncio.run(storage.async_add_workout_record(1, days_ago(1), 1.0,
+                                                 "Бег"))
+
+    with patch.object(backend_module, "get_records_last_n_days") as load:
+        records = storage.get_records_last_n_days(1, "workouts", 7)
+        days = storage.get_daily_summary_last_n_days(1, 7)
+    assert not load.called
+    assert [record.activity_type for record in records] == [
+        "Плавание", "Бег", "Бег", "Йога"]
+    assert days[-1]["activities"] == {"Плавание": 2.0}
+
+
+def test_long_window_reads_database(storage):
+    """Тест выборки из SQLite для окна длиннее кэша"""
+    records = storage.get_records_last_n_days(1, "sleep", 60)
+
+    assert len(records) == 3
+    assert len(storage.cache) == 0
+
+
+def test_lru_eviction():
+    """Тест вытеснения давно не читавшегося пользователя"""
+    loads = []
+
+    def loader(user_id, n_days):
+        loads.append(user_id)
+        return {"sleep": [sleep(user_id, user_id, 1, 7.0)],
+                "calories": [], "workouts": []}
+
+    cache = HotWindowCache(loader, max_users=2)
+    cache.get_records_last_n_days(1, "sleep", 7)
+    cache.get_records_last_n_days(2, "sleep", 7)
+    cache.get_records_last_n_days(1, "sleep", 7)
+    cache.get_records_last_n_days(3, "sleep", 7)
+    cache.get_records_last_n_days(1, "sleep", 7)
+    cache.get_records_last_n_days(2, "sleep", 7)
+
+    assert loads == [1, 2, 3, 2]
+    assert len(cache) == 2
+
+
+def test_idle_eviction():
+    """Тест вытеснения пользователя после простоя"""
+    def loader(user_id, n_days):
+        return {"sleep": [], "calories": [], "workouts": []}
+
+    cache = HotWindowCache(loader, idle_seconds=60)
+    with patch("telegram_tracker_bot.db.hot_cache.time.monotonic",
+               return_value=1000.0):
+        cache.get_records_last_n_days(1, "sleep", 7)
+    with patch("telegram_tracker_bot.db.hot_cache.time.monotonic",
+               return_value=1100.0):
+        cache.get_records_last_n_days(2, "sleep", 7)
+
+    assert len(cache) == 1
+
+
+def test_write_during_load_is_not_lost():
+    """Тест записи, сделанной во время загрузки окна"""
+    cache = HotWindowCache(None)
+
+    def loader(user_id, n_days):
+        # запись фиксируется после того, как загрузка прочитала базу
+        cache.add("sleep", sleep(2, user_id, 0, 6.0))
+        return {"sleep": [sleep(1, user_id, 1, 7.0)],
+                "calories": [], "workouts": []}
+
+    cache._loader = loader
+    cache.get_records_last_n_days(1, "sleep", 7)
+
+    assert len(cache) == 0
+
+
+def test_load_between_commit_and_cache_update(storage):
+    """Тест загрузки окна между фиксацией записи и обновлением кэша"""
+    record = backend_module.add_sleep_record(2, days_ago(0), 7.0,
+                                             storage.database_name)
+    # другой поток читает окно, в котором запись уже есть
+    assert len(storage.get_records_last_n_days(2, "sleep", 7)) == 1
+    storage._added("sleep", record)
+
+    records = storage.get_records_last_n_days(2, "sleep", 7)
+    days = storage.get_daily_summary_last_n_days(2, 7)
+    assert [record.hours for record in records] == [7.0]
+    assert (days[-1]["sleep_hours"], days[-1]["sleep_count"]) == (7.0, 1)
+
+
+def test_invalid_table_name():
+    """Тест проверки имени таблицы"""
+    cache = HotWindowCache(lambda user_id, n_days: {})
+    with pytest.raises(ValueError):
+        cache.get_records_last_n_days(1, "users", 7)
@@ -0,0 +1,67 @@
+"""
+ТЕСТЫ МИГРАЦИЙ СХЕМЫ
+"""
+import sqlite3
+import pytest
+
+from telegram_tracker_bot.db import initialize_db, close_all_pools
+from telegram_tracker_bot.db.migrations import (
+    MIGRATIONS,
+    apply_migrations,
+    get_schema_version
+)
+
+
+@pytest.fixture
+def database(tmp_path):
+    """Фикстура пути к тестовой БД во временной директории"""
+    yield str(tmp_path / "tracker.db")
+    close_all_pools()
+
+
+def test_new_database_is_fully_migrated(database):
+    """Тест применения всех миграций к новой базе"""
+    initialize_db(database)
+    conn = sqlite3.connect(database)
+    assert get_schema_version(conn) == MIGRATIONS[-1][0]
+    indexes = {row[0] for row in conn.execute(
+        "SELECT name FROM sqlite_master WHERE type='index'")}
+    conn.close()
+    assert {'idx_sleep_user_day', 'idx_calories_user_day',
+            'idx_workouts_user_day'} <= indexes
+    assert not {'idx_sleep_user_date', 'idx_calories_user_date',
+                'idx_workouts_user_date'} & indexes
+
+
+def test_legacy_database_is_upgraded(database):
+    """Тест обновления базы, созданной до появления миграций"""
+    conn = sqlite3.connect(database)
+    conn.execute("CREATE TABLE sleep (id INTEGER PRIMARY KEY AUTOINCREMENT,"
+                 " user_id INTEGER NOT NULL, date TEXT NOT NULL,"
+                 " hours REAL NOT NULL,"
+                 " timestamp DATETIME DEFAULT CURRENT_TIMESTAMP)")
+    conn.execute("INSERT INTO sleep (user_id, date, hours)"
+                 " VALUES (1, '2024-01-01', 8.0)")
+    conn.commit()
+    conn.close()
+
+    initialize_db(database)
+
+    conn = sqlite3.connect(database)
+    assert get_schema_version(conn) == MIGRATIONS[-1][0]
+    assert conn.execute("SELECT day FROM sleep").fetchall() == [(19723,)]
+    summary = conn.execute("SELECT user_id, day, sleep_hours, sleep_count"
+                           " FROM daily_summary").fetchall()
+    conn.close()
+    assert summary == [(1, 19723, 8.0, 1)]
+
+
+def test_migrations_are_idempotent(database):
+    """Тест повторного запуска миграций"""
+    conn = sqlite3.connect(database)
+    first = apply_migrations(conn)
+    second = apply_migrations(conn)
+    applied = conn.execute("SELECT COUNT(*) FROM schema_version").fetchone()[0]
+    conn.close()
+    assert first == second == MIGRATIONS[-1][0]
+    assert applied == len(MIGRATIONS)
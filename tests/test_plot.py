@@ -5,11 +5,30 @@ import unittest
 from unittest.mock import patch
 from io import BytesIO
 import datetime
+import numpy as np
 import matplotlib.pyplot as plt
-from telegram_tracker_bot.logic import plot_weekly_data
+from telegram_tracker_bot.logic import plot_weekly_data, render_weekly_plot
+from telegram_tracker_bot.logic import plotting
+from telegram_tracker_bot.logic.plot_cache import PlotCache, set_plot_cache
 
 
-@patch('telegram_tracker_bot.logic.plotting.get_records_last_n_days')
+def columns(*days):
+    """Столбцы за последние 7 дней для мока из пар (дата, значения)"""
+    today = np.datetime64(datetime.date.today(), 'D')
+    dates = np.arange(today - np.timedelta64(6, 'D'),
+                      today + np.timedelta64(1, 'D'))
+    result = {"date": dates,
+              "sleep": np.full(7, np.nan),
+              "calories": np.full(7, np.nan),
+              "workouts": np.zeros(7)}
+    for date, values in days:
+        position = int((np.datetime64(date, 'D') - dates[0]).astype(int))
+        for key, value in values.items():
+            result[key][position] = value
+    return result
+
+
+@patch('telegram_tracker_bot.logic.plotting.get_storage')
 @patch('telegram_tracker_bot.'
        'logic.plotting.format_timedelta', side_effect=lambda x: f"{x:.1f}h")
 class TestPlotWeeklyData(unittest.TestCase):
@@ -24,88 +43,112 @@ class TestPlotWeeklyData(unittest.TestCase):
                           for i in range(6, -1, -1)]
         self.expected_dates = sorted([self.today - datetime.timedelta(days=i)
                                       for i in range(7)])
+        set_plot_cache(PlotCache())
 
-    def test_plot_with_all_data(self, _, mock_get_records):
-        """ТЕСТ"""
-        mock_get_records.side_effect = [
-            [
-                {"date": self.dates_str[0], "hours": 7.5},
+    def tearDown(self):
+        set_plot_cache(None)
 
-                {"date": self.dates_str[2], "hours": 8.0},
-                {"date": self.dates_str[6], "hours": 6.5},
-            ],
-            [
-                {"date": self.dates_str[1], "amount": 2000},
-                {"date": self.dates_str[3], "amount": 2200},
-                {"date": self.dates_str[5], "amount": 1800},
-            ],
-            [
-                {"date": self.dates_str[0], "duration_hours": 1.0},
-                {"date": self.dates_str[4], "duration_hours": 1.5},
-            ]
-        ]
+    def test_plot_with_all_data(self, _, mock_storage):
+        """ТЕСТ"""
+        mock_get_records = (
+            mock_storage.return_value.get_daily_columns_last_n_days)
+        mock_get_records.return_value = columns(
+            (self.dates_str[0], {"sleep": 7.5, "workouts": 1.0}),
+            (self.dates_str[1], {"calories": 2000}),
+            (self.dates_str[2], {"sleep": 8.0}),
+            (self.dates_str[3], {"calories": 2200}),
+            (self.dates_str[4], {"workouts": 1.5}),
+            (self.dates_str[5], {"calories": 1800}),
+            (self.dates_str[6], {"sleep": 6.5}),
+        )
 
         buffer = plot_weekly_data(self.user_id)
         self.assertIsInstance(buffer, BytesIO)
         self.assertEqual(buffer.tell(), 0)
-        mock_get_records.assert_any_call(self.user_id, "sleep", 7,
-                                         'telegram_tracker_bot/'
-                                         'db/tracker_data_base.db')
-        mock_get_records.assert_any_call(self.user_id,
-                                         "calories", 7,
-                                         'telegram_tracker_bot'
-                                         '/db/tracker_data_base.db')
-        mock_get_records.assert_any_call(self.user_id,
-                                         "workouts", 7,
-                                         'telegram_tracker_bot'
-                                         '/db/tracker_data_base.db')
+        mock_get_records.assert_called_once_with(self.user_id, 7)
         self.assertIsNotNone(plt.gcf())
 
-    def test_plot_with_no_data(self, _, mock_get_records):
+    def test_plot_with_no_data(self, _, mock_storage):
         """ТЕСТ"""
-        mock_get_records.side_effect = [[], [], []]
+        mock_get_records = (
+            mock_storage.return_value.get_daily_columns_last_n_days)
+        mock_get_records.return_value = columns()
         buffer = plot_weekly_data(self.user_id)
         self.assertIsNone(buffer)
 
     def test_plot_with_partial_data(
-            self, _, mock_get_records):
+            self, _, mock_storage):
         """ТЕСТ"""
-        mock_get_records.side_effect = [
-            [
-                {"date": self.dates_str[0], "hours": 7.0},
-                {"date": self.dates_str[6], "hours": 8.0},
-            ],
-            [
-                {"date": self.dates_str[3], "amount": 2500},
-                {"date": self.dates_str[5], "amount": 2100},
-            ],
-            []
-        ]
+        mock_get_records = (
+            mock_storage.return_value.get_daily_columns_last_n_days)
+        mock_get_records.return_value = columns(
+            (self.dates_str[0], {"sleep": 7.0}),
+            (self.dates_str[3], {"calories": 2500}),
+            (self.dates_str[5], {"calories": 2100}),
+            (self.dates_str[6], {"sleep": 8.0}),
+        )
         buffer = plot_weekly_data(self.user_id)
         self.assertIsInstance(buffer, BytesIO)
         self.assertEqual(buffer.tell(), 0)
 
     def test_plot_with_single_day_data(
-            self, _, mock_get_records):
+            self, _, mock_storage):
         """СНОВА ТЕСТ"""
-        mock_get_records.side_effect = [
-            [{"date": self.dates_str[0], "hours": 7.0}],
-            [{"date": self.dates_str[0], "amount": 2000}],
-            [{"date": self.dates_str[0], "duration_hours": 0.5}],
-        ]
+        mock_get_records = (
+            mock_storage.return_value.get_daily_columns_last_n_days)
+        mock_get_records.return_value = columns(
+            (self.dates_str[0], {"sleep": 7.0, "calories": 2000,
+                                 "workouts": 0.5}),
+        )
         buffer = plot_weekly_data(self.user_id)
         self.assertIsInstance(buffer, BytesIO)
         self.assertEqual(buffer.tell(), 0)
 
     def test_workout_duration_aggregation(
-            self, _, mock_get_records):
+            self, _, mock_storage):
         """Опять тест..."""
-        mock_get_records.side_effect = [[], [], [
-                {"date": self.dates_str[0], "duration_hours": 0.5},
-                {"date": self.dates_str[0], "duration_hours": 0.75},
-                {"date": self.dates_str[1], "duration_hours": 1.0},
-            ]
-        ]
+        mock_get_records = (
+            mock_storage.return_value.get_daily_columns_last_n_days)
+        mock_get_records.return_value = columns(
+            (self.dates_str[0], {"workouts": 0.5 + 0.75}),
+            (self.dates_str[1], {"workouts": 1.0}),
+        )
         buffer = plot_weekly_data(self.user_id)
         self.assertIsInstance(buffer, BytesIO)
         self.assertEqual(buffer.tell(), 0)
+
+    def test_render_does_not_touch_pyplot(self, _, mock_storage):
+        """Тест построения графика без глобальных фигур pyplot"""
+        _ = mock_storage
+        figures = plt.get_fignums()
+        buffer = render_weekly_plot(
+            self.user_id, columns((self.dates_str[6], {"sleep": 8.0})))
+        self.assertIsInstance(buffer, BytesIO)
+        self.assertEqual(plt.get_fignums(), figures)
+
+    def test_template_is_reused(self, _, mock_storage):
+        """Тест повторного использования шаблона фигуры потока"""
+        _ = mock_storage
+        first = render_weekly_plot(
+            self.user_id, columns((self.dates_str[6], {"sleep": 8.0})))
+        template = plotting._templates.figure
+        second = render_weekly_plot(
+            self.user_id, columns((self.dates_str[5], {"calories": 1900})),
+            annotate=False)
+        self.assertIs(plotting._templates.figure, template)
+        self.assertNotEqual(first.getvalue(), second.getvalue())
+        self.assertTrue(np.isnan(template.sleep_line.get_ydata()).all())
+        self.assertFalse(any(label.get_visible()
+                             for row in template.labels for label in row))
+
+    def test_reused_template_matches_fresh(self, _, mock_storage):
+        """Тест независимости графика от прошлых графиков потока"""
+        _ = mock_storage
+        # у второго пользователя нет сна и калорий
+        other = columns((self.dates_str[6], {"workouts": 1.0}))
+        plotting._templates.figure = None
+        fresh = render_weekly_plot(456, other).getvalue()
+        render_weekly_plot(self.user_id, columns(
+            (self.dates_str[0], {"sleep": 7.0, "calories": 2000}),
+            (self.dates_str[1], {"sleep": 8.75, "calories": 2300})))
+        self.assertEqual(render_weekly_plot(456, other).getvalue(), fresh)
@@ -0,0 +1,180 @@
+"""
+ТЕСТЫ КЭША ГРАФИКОВ
+"""
+import asyncio
+import datetime
+import os
+from io import BytesIO
+from unittest.mock import AsyncMock, MagicMock, patch
+import numpy as np
+import pytest
+from telegram import InputFile
+from telegram.error import BadRequest
+
+from telegram_tracker_bot.logic import plot_weekly_data
+from telegram_tracker_bot.logic.plot_cache import (PlotCache, plot_cache_key,
+                                                   set_plot_cache)
+from telegram_tracker_bot.config import PLOT_ANNOTATIONS, PLOT_RENDERER
+from telegram_tracker_bot.logic.plotting import (RENDER_OPTIONS,
+                                                 weekly_plot_key)
+from telegram_tracker_bot.handlers import send_plot
+
+
+def week_columns(sleep=7.0):
+    """Столбцы за последние 7 дней со сном в последний день"""
+    today = np.datetime64(datetime.date.today(), 'D')
+    columns = {"date": np.arange(today - np.timedelta64(6, 'D'),
+                                 today + np.timedelta64(1, 'D')),
+               "sleep": np.full(7, np.nan),
+               "calories": np.full(7, np.nan),
+               "workouts": np.zeros(7)}
+    columns["sleep"][-1] = sleep
+    return columns
+
+
+def key(user_id=1, columns=None, options=None):
+    """Ключ недельного графика"""
+    return plot_cache_key(user_id, 7, columns or week_columns(),
+                          options or RENDER_OPTIONS)
+
+
+@pytest.fixture
+def cache():
+    """Фикстура общего кэша графиков только в памяти"""
+    plot_cache = PlotCache()
+    set_plot_cache(plot_cache)
+    yield plot_cache
+    set_plot_cache(None)
+
+
+def test_key_depends_on_everything_drawn():
+    """Тест ключа: те же данные - тот же ключ, любое отличие - другой"""
+    assert key() == key()
+    assert key(user_id=2) != key()
+    assert key(columns=week_columns(7.5)) != key()
+    assert key(options={**RENDER_OPTIONS,
+                        "version": RENDER_OPTIONS["version"] + 1}) != key()
+    assert (weekly_plot_key(1, week_columns(), annotate=False)
+            != weekly_plot_key(1, week_columns()))
+
+
+@patch('telegram_tracker_bot.logic.plotting.get_storage')
+def test_repeat_plot_is_not_rendered(mock_storage, cache):
+    """Тест повторного /plot без отрисовки"""
+    mock_storage.return_value.get_daily_columns_last_n_days.return_value = \
+        week_columns()
+    first = plot_weekly_data(1).getvalue()
+    with patch('telegram_tracker_bot.logic.plotting.render_weekly_plot') \
+            as render:
+        second = plot_weekly_data(1).getvalue()
+
+    assert not render.called
+    assert second == first
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_memory_lru():
+    """Тест вытеснения давно не запрошенного изображения"""
+    plot_cache = PlotCache(max_items=2)
+    plot_cache.put("a", b"1")
+    plot_cache.put("b", b"2")
+    plot_cache.get("a")
+    plot_cache.put("c", b"3")
+
+    assert plot_cache.get("b") is None
+    assert plot_cache.get("a") == b"1"
+    assert len(plot_cache) == 2
+
+
+def test_disk_tier_survives_restart(tmp_path):
+    """Тест чтения изображения с диска новым экземпляром кэша"""
+    PlotCache(str(tmp_path)).put("a", b"png")
+
+    plot_cache = PlotCache(str(tmp_path))
+    assert plot_cache.get("a") == b"png"
+    assert len(plot_cache) == 1
+
+
+def test_disk_eviction_by_size(tmp_path):
+    """Тест удаления самых давних файлов при превышении размера"""
+    plot_cache = PlotCache(str(tmp_path), max_items=1, max_disk_bytes=350)
+    for age, name in ((300, "old"), (200, "middle"), (100, "new")):
+        plot_cache.put(name, b"x" * 100)
+        mtime = os.path.getmtime(tmp_path / f"{name}.png") - age
+        os.utime(tmp_path / f"{name}.png", (mtime, mtime))
+    # чтение с диска обновляет время обращения к файлу
+    plot_cache.clear()
+    assert plot_cache.get("old") is not None
+
+    plot_cache.put("extra", b"x" * 100)
+
+    assert sorted(os.listdir(tmp_path)) == ["extra.png", "new.png",
+                                            "old.png"]
+    assert PlotCache(str(tmp_path)).get("middle") is None
+
+
+def test_file_id_survives_restart_and_eviction(tmp_path):
+    """Тест хранения file_id рядом с изображением"""
+    plot_cache = PlotCache(str(tmp_path), max_disk_bytes=150)
+    plot_cache.put("a", b"x" * 100)
+    plot_cache.put_file_id("a", "AgAD-file-a")
+
+    assert PlotCache(str(tmp_path)).get_file_id("a") == "AgAD-file-a"
+    assert plot_cache.get_file_id("b") is None
+
+    # изображение вытесняется вместе со своим file_id
+    mtime = os.path.getmtime(tmp_path / "a.png") - 100
+    os.utime(tmp_path / "a.png", (mtime, mtime))
+    plot_cache.put("b", b"x" * 100)
+    assert plot_cache.get_file_id("a") is None
+    assert sorted(os.listdir(tmp_path)) == ["b.png"]
+
+
+def plot_update(file_id):
+    """Мок сообщения /plot, ответ на которое получает file_id"""
+    update = MagicMock()
+    update.effective_user.id = 1
+    update.message.reply_text = AsyncMock()
+    update.message.reply_photo = AsyncMock(
+        return_value=MagicMock(photo=[MagicMock(file_id="small"),
+                                      MagicMock(file_id=file_id)]))
+    return update
+
+
+@patch('telegram_tracker_bot.handlers.handlers.get_storage')
+def test_repeat_plot_is_sent_by_file_id(mock_storage, cache):
+    """Тест повторной отправки графика по file_id без загрузки"""
+    mock_storage.return_value.get_daily_columns_last_n_days.return_value = \
+        week_columns()
+    render = AsyncMock(return_value=BytesIO(b"png"))
+    with patch('telegram_tracker_bot.handlers.handlers.render_in_pool',
+               render):
+        first, second = plot_update("AgAD-1"), plot_update("AgAD-2")
+        asyncio.run(send_plot(first, None))
+        asyncio.run(send_plot(second, None))
+
+    assert render.call_count == 1
+    assert isinstance(first.message.reply_photo.call_args.kwargs["photo"],
+                      InputFile)
+    assert second.message.reply_photo.call_args.kwargs["photo"] == "AgAD-1"
+
+
+@patch('telegram_tracker_bot.handlers.handlers.get_storage')
+def test_rejected_file_id_is_uploaded_again(mock_storage, cache):
+    """Тест загрузки изображения, если Telegram не принял file_id"""
+    mock_storage.return_value.get_daily_columns_last_n_days.return_value = \
+        week_columns()
+    plot_key = weekly_plot_key(1, week_columns(), PLOT_ANNOTATIONS,
+                               PLOT_RENDERER)
+    cache.put(plot_key, b"png")
+    cache.put_file_id(plot_key, "AgAD-stale")
+    update = plot_update("AgAD-new")
+    update.message.reply_photo.side_effect = [
+        BadRequest("Wrong file identifier"),
+        MagicMock(photo=[MagicMock(file_id="AgAD-new")])]
+
+    asyncio.run(send_plot(update, None))
+
+    assert isinstance(update.message.reply_photo.call_args.kwargs["photo"],
+                      InputFile)
+    assert cache.get_file_id(plot_key) == "AgAD-new"
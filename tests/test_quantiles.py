@@ -0,0 +1,126 @@
+"""
+ТЕСТЫ КВАНТИЛЬНЫХ СКЕТЧЕЙ
+"""
+import io
+import sqlite3
+from datetime import date, timedelta
+import numpy as np
+import pytest
+
+from telegram_tracker_bot.db import (
+    initialize_db,
+    add_sleep_record,
+    add_calories_record,
+    archive_old_records,
+    get_quantile_sketches,
+    set_storage,
+    close_all_pools,
+    QuantileSketch,
+)
+from telegram_tracker_bot.db.memory import MemoryBackend
+from telegram_tracker_bot.db.quantiles import RELATIVE_ACCURACY
+from telegram_tracker_bot.db.transfer import import_records
+from telegram_tracker_bot.logic import get_percentiles_text
+
+VALUES = np.random.default_rng(7).lognormal(2.0, 0.5, 5000)
+
+
+def days_ago(n):
+    """Дата n дней назад в формате ГГГГ-ММ-ДД"""
+    return (date.today() - timedelta(days=n)).strftime('%Y-%m-%d')
+
+
+@pytest.fixture
+def database(tmp_path):
+    """Фикстура пустой базы во временной директории"""
+    path = str(tmp_path / "tracker.db")
+    initialize_db(path)
+    yield path
+    close_all_pools()
+
+
+def sketch_of(values):
+    """Скетч набора значений"""
+    sketch = QuantileSketch()
+    for value in values:
+        sketch.add(value)
+    return sketch
+
+
+def test_quantiles_within_relative_accuracy():
+    """Тест точности квантилей"""
+    sketch = sketch_of(VALUES)
+
+    assert sketch.count == len(VALUES)
+    for q in (0.01, 0.1, 0.5, 0.9, 0.99):
+        expected = np.quantile(VALUES, q, method="lower")
+        assert sketch.quantile(q) == pytest.approx(
+            expected, rel=2 * RELATIVE_ACCURACY)
+    median = np.median(VALUES)
+    assert sketch.percentile_of(median) == pytest.approx(50, abs=1)
+
+
+def test_merge_equals_single_sketch():
+    """Тест объединения скетчей частей"""
+    merged = sketch_of(VALUES[:1000]).merge(sketch_of(VALUES[1000:]))
+
+    assert merged.counts == sketch_of(VALUES).counts
+
+
+def test_empty_sketch():
+    """Тест пустого скетча"""
+    assert np.isnan(QuantileSketch().quantile(0.5))
+    assert np.isnan(QuantileSketch().percentile_of(7.0))
+
+
+def test_updated_on_insert_and_import(database):
+    """Тест обновления скетчей при записи и импорте"""
+    add_sleep_record(1, days_ago(0), 6.0, database)
+    add_sleep_record(2, days_ago(0), 8.0, database)
+    add_calories_record(1, days_ago(0), 2000, database)
+    src = io.StringIO('{"table": "sleep", "user_id": 3,'
+                      f' "date": "{days_ago(1)}", "hours": 7.0}}\n')
+    import_records(database, src, "jsonl")
+
+    sketches = get_quantile_sketches(database)
+    assert sketches["sleep"].count == 3
+    assert sketches["sleep"].quantile(0.5) == pytest.approx(
+        7.0, rel=RELATIVE_ACCURACY)
+    assert sketches["calories"].count == 1
+    assert "workouts" not in sketches
+
+
+def test_migration_backfills_history(database):
+    """Тест заполнения скетчей по записям и архиву при миграции"""
+    for n in range(6):
+        add_sleep_record(1, days_ago(n * 100), 7.0 + n, database)
+    assert archive_old_records(database, 200) == 3
+    expected = get_quantile_sketches(database)["sleep"].counts
+    close_all_pools()
+    # база предыдущей версии схемы: скетчей еще нет
+    conn = sqlite3.connect(database)
+    conn.execute("DROP TABLE quantile_sketch")
+    conn.execute("DROP TABLE digest_progress")
+    conn.execute("DELETE FROM schema_version WHERE version >= 7")
+    conn.commit()
+    conn.close()
+
+    initialize_db(database)
+
+    assert get_quantile_sketches(database)["sleep"].counts == expected
+
+
+def test_percentiles_text():
+    """Тест отчета для администраторов"""
+    storage = MemoryBackend()
+    for n in range(1, 10):
+        storage.add_sleep_record(n, days_ago(0), float(n))
+    set_storage(storage)
+    try:
+        report = get_percentiles_text()
+    finally:
+        set_storage(None)
+
+    assert "😴 Сон (записей: 9):" in report
+    assert "  - Медиана: 05:00" in report
+    assert "🍎 Калории: Нет данных." in report
@@ -0,0 +1,66 @@
+"""
+ТЕСТЫ ПУЛА ПРОЦЕССОВ ДЛЯ ГРАФИКОВ
+"""
+import asyncio
+import datetime
+from concurrent.futures.process import BrokenProcessPool
+from io import BytesIO
+import numpy as np
+import pytest
+
+from telegram_tracker_bot.logic import render_pool, render_weekly_plot
+from telegram_tracker_bot.logic.render_pool import (render_in_pool,
+                                                    RenderPoolBusy,
+                                                    start_render_pool,
+                                                    shutdown_render_pool)
+
+
+def week_columns():
+    """Столбцы за последние 7 дней со сном каждый день"""
+    today = np.datetime64(datetime.date.today(), 'D')
+    return {"date": np.arange(today - np.timedelta64(6, 'D'),
+                              today + np.timedelta64(1, 'D')),
+            "sleep": np.linspace(6.0, 9.0, 7),
+            "calories": np.full(7, np.nan),
+            "workouts": np.zeros(7)}
+
+
+class _BrokenExecutor:
+    """Пул, процесс которого аварийно завершился"""
+
+    def submit(self, *args, **kwargs):
+        raise BrokenProcessPool("worker died")
+
+
+def test_renders_in_worker_process(monkeypatch):
+    """Тест построения графика в процессе пула"""
+    monkeypatch.setattr(render_pool, "RENDER_WORKERS", 1)
+    start_render_pool()
+    try:
+        buffer = asyncio.run(render_in_pool(render_weekly_plot, 123,
+                                            week_columns()))
+    finally:
+        shutdown_render_pool()
+
+    assert isinstance(buffer, BytesIO)
+    assert buffer.getvalue().startswith(b"\x89PNG")
+
+
+def test_busy_when_queue_is_full(monkeypatch):
+    """Тест отказа при переполненной очереди"""
+    monkeypatch.setattr(render_pool, "_pending",
+                        render_pool.MAX_PENDING_RENDERS)
+
+    with pytest.raises(RenderPoolBusy):
+        asyncio.run(render_in_pool(render_weekly_plot, 123, week_columns()))
+    assert render_pool._pending == render_pool.MAX_PENDING_RENDERS
+
+
+def test_broken_pool_is_replaced(monkeypatch):
+    """Тест замены пула после аварийного завершения процесса"""
+    monkeypatch.setattr(render_pool, "_executor", _BrokenExecutor())
+
+    with pytest.raises(BrokenProcessPool):
+        asyncio.run(render_in_pool(render_weekly_plot, 123, week_columns()))
+    assert render_pool._executor is None
+    assert render_pool._pending == 0
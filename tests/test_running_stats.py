@@ -0,0 +1,110 @@
+"""
+ТЕСТЫ СТАТИСТИКИ ЗА ВСЕ ВРЕМЯ
+"""
+import io
+import sqlite3
+from datetime import date, timedelta
+import numpy as np
+import pytest
+
+from telegram_tracker_bot.db import (
+    initialize_db,
+    add_sleep_record,
+    add_calories_record,
+    add_workout_record,
+    archive_old_records,
+    get_running_stats,
+    close_all_pools,
+)
+from telegram_tracker_bot.db.memory import MemoryBackend
+from telegram_tracker_bot.db.running_stats import merge_stats, stats_of
+from telegram_tracker_bot.db.transfer import import_records
+
+SLEEP = [7.5, 6.0, 8.25, 5.5, 9.0, 7.0]
+
+
+def days_ago(n):
+    """Дата n дней назад в формате ГГГГ-ММ-ДД"""
+    return (date.today() - timedelta(days=n)).strftime('%Y-%m-%d')
+
+
+@pytest.fixture
+def database(tmp_path):
+    """Фикстура пустой базы во временной директории"""
+    path = str(tmp_path / "tracker.db")
+    initialize_db(path)
+    yield path
+    close_all_pools()
+
+
+def assert_matches(stats, values):
+    """Сверяет статистику с расчетом NumPy"""
+    assert stats.count == len(values)
+    assert stats.mean == pytest.approx(np.mean(values))
+    assert stats.variance == pytest.approx(np.var(values, ddof=1))
+    assert stats.min == min(values)
+    assert stats.max == max(values)
+
+
+def test_updated_on_insert(database):
+    """Тест обновления статистики при каждой записи"""
+    for n, hours in enumerate(SLEEP):
+        add_sleep_record(1, days_ago(n), hours, database)
+    add_calories_record(1, days_ago(0), 500, database)
+    add_calories_record(1, days_ago(0), 700, database)
+    add_workout_record(2, days_ago(0), 1.0, "Бег", database)
+
+    stats = get_running_stats(1, database)
+    assert_matches(stats["sleep"], SLEEP)
+    assert_matches(stats["calories"], [500, 700])
+    assert "workouts" not in stats
+    assert get_running_stats(2, database)["workouts"].count == 1
+    assert get_running_stats(3, database) == {}
+
+
+def test_batch_import_merges(database):
+    """Тест объединения импортированного пакета с накопленной статистикой"""
+    add_sleep_record(1, days_ago(0), SLEEP[0], database)
+    src = io.StringIO("".join(
+        f'{{"table": "sleep", "user_id": 1, "date": "{days_ago(n)}",'
+        f' "hours": {hours}}}\n' for n, hours in enumerate(SLEEP[1:], 1)))
+    import_records(database, src, "jsonl")
+
+    assert_matches(get_running_stats(1, database)["sleep"], SLEEP)
+
+
+def test_merge_stats():
+    """Тест формулы объединения частей"""
+    merged = merge_stats(stats_of(SLEEP[:2]), stats_of(SLEEP[2:]))
+    assert_matches(merged, SLEEP)
+    assert merge_stats(stats_of([]), stats_of(SLEEP)) == stats_of(SLEEP)
+
+
+def test_migration_backfills_history(database):
+    """Тест заполнения статистики по записям и архиву при миграции"""
+    for n, hours in enumerate(SLEEP):
+        add_sleep_record(1, days_ago(n * 100), hours, database)
+    assert archive_old_records(database, 200) == 3
+    close_all_pools()
+    # база предыдущей версии схемы: статистики еще нет
+    conn = sqlite3.connect(database)
+    conn.execute("DROP TABLE running_stats")
+    conn.execute("DROP TABLE quantile_sketch")
+    conn.execute("DROP TABLE digest_progress")
+    conn.execute("DELETE FROM schema_version WHERE version >= 6")
+    conn.commit()
+    conn.close()
+
+    initialize_db(database)
+
+    assert_matches(get_running_stats(1, database)["sleep"], SLEEP)
+
+
+def test_memory_backend():
+    """Тест статистики хранилища в памяти"""
+    storage = MemoryBackend()
+    for n, hours in enumerate(SLEEP):
+        storage.add_sleep_record(1, days_ago(n), hours)
+
+    assert_matches(storage.get_running_stats(1)["sleep"], SLEEP)
+    assert storage.get_running_stats(2) == {}
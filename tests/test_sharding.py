@@ -0,0 +1,139 @@
+"""
+ТЕСТЫ РАЗДЕЛЕНИЯ БАЗЫ НА ШАРДЫ
+"""
+import asyncio
+import io
+import os
+import sqlite3
+from datetime import date
+import pytest
+
+from telegram_tracker_bot.db import (
+    initialize_db,
+    add_sleep_record,
+    add_workout_record,
+    get_records_last_n_days,
+    get_daily_summary_last_n_days,
+    get_running_stats,
+    get_quantile_sketches,
+    get_digest_progress,
+    save_digest_progress,
+    get_write_queue,
+    close_write_queues,
+    close_all_pools,
+    shutdown_db_executor,
+    shard_path,
+    all_shard_paths,
+    reshard
+)
+from telegram_tracker_bot.db import sharding
+from telegram_tracker_bot.db.transfer import export_records, import_records
+
+TODAY = date.today().strftime('%Y-%m-%d')
+
+
+@pytest.fixture
+def database(monkeypatch, tmp_path):
+    """Фикстура базы из четырех шардов во временной директории"""
+    monkeypatch.setattr(sharding, "SHARDS", 4)
+    path = str(tmp_path / "tracker.db")
+    initialize_db(path)
+    yield path
+    close_all_pools()
+    shutdown_db_executor()
+
+
+def count_sleep(path):
+    """Количество записей сна в файле"""
+    conn = sqlite3.connect(path)
+    count = conn.execute("SELECT COUNT(*) FROM sleep").fetchone()[0]
+    conn.close()
+    return count
+
+
+def test_shard_is_stable():
+    """Тест стабильного выбора шарда"""
+    assert shard_path("a.db", 42, 1) == "a.db"
+    assert shard_path("a.db", 42, 4) == shard_path("a.db", 42, 4)
+    assert shard_path("a.db", 42, 4) in all_shard_paths("a.db", 4)
+    assert all_shard_paths("a.db", 2) == ["a.shard0of2.db",
+                                          "a.shard1of2.db"]
+
+
+def test_records_go_to_user_shard(database):
+    """Тест записи и чтения через шард пользователя"""
+    for user_id in range(20):
+        add_sleep_record(user_id, TODAY, 7.0, database)
+    for path in all_shard_paths(database):
+        assert os.path.exists(path)
+    assert not os.path.exists(database)
+    assert sum(count_sleep(path)
+               for path in all_shard_paths(database)) == 20
+    assert count_sleep(shard_path(database, 7)) >= 1
+    assert len(get_records_last_n_days(7, "sleep", 7, database)) == 1
+    assert get_daily_summary_last_n_days(7, 7, database)[0][
+        "sleep_hours"] == 7.0
+
+
+def test_write_queue_routes_batch(database):
+    """Тест групповой записи в несколько шардов"""
+    async def write_all():
+        write_queue = get_write_queue(database)
+        await asyncio.gather(*(write_queue.add_sleep_record(
+            user_id, TODAY, 8.0) for user_id in range(20)))
+        await close_write_queues()
+
+    asyncio.run(write_all())
+    for user_id in range(20):
+        assert len(get_records_last_n_days(user_id, "sleep", 1,
+                                           database)) == 1
+
+
+def test_transfer_across_shards(database):
+    """Тест экспорта и импорта шардированной базы"""
+    src = io.StringIO("".join(
+        f'{{"table": "sleep", "user_id": {user_id}, "date": "{TODAY}",'
+        f' "hours": 6.5}}\n' for user_id in range(10)))
+    assert import_records(database, src, "jsonl") == 10
+    out = io.StringIO()
+    assert export_records(database, out, "jsonl") == 10
+    assert get_records_last_n_days(3, "sleep", 1,
+                                   database)[0].hours == 6.5
+
+
+def test_reshard(database, monkeypatch):
+    """Тест перераспределения базы на другое число шардов"""
+    for user_id in range(20):
+        add_sleep_record(user_id, TODAY, 7.0, database)
+        add_workout_record(user_id, TODAY, 1.0, "Бег", database)
+    # рассылка сводки прервана на середине
+    save_digest_progress(100, 9, 10, False, database)
+    close_all_pools()
+
+    # записи, дневная сводка и сводка активности, статистика по 2 видам
+    assert reshard(database, 4, 2) == 20 * 6
+    monkeypatch.setattr(sharding, "SHARDS", 2)
+    for user_id in range(20):
+        day = get_daily_summary_last_n_days(user_id, 1, database)[0]
+        assert day["sleep_hours"] == 7.0
+        assert day["activities"] == {"Бег": 1.0}
+        assert get_running_stats(user_id, database)["sleep"].count == 1
+    assert get_quantile_sketches(database)["workouts"].count == 20
+    assert get_digest_progress(100, database) == (9, 10, False)
+    with pytest.raises(ValueError):
+        reshard(database, 4, 2)
+
+
+def test_reshard_back_to_single_file(database, monkeypatch):
+    """Тест сбора шардов обратно в исходный файл"""
+    for user_id in range(10):
+        add_sleep_record(user_id, TODAY, 7.0, database)
+    close_all_pools()
+
+    assert reshard(database, 4, 1) == 10 * 3
+    assert count_sleep(database) == 10
+    monkeypatch.setattr(sharding, "SHARDS", 1)
+    assert get_records_last_n_days(5, "sleep", 1,
+                                   database)[0].hours == 7.0
+    with pytest.raises(ValueError, match="переименуйте"):
+        reshard(database, 4, 1)
@@ -1,10 +1,18 @@
+import asyncio
+from datetime import date
 from unittest.mock import patch
+import pytest
 from telegram_tracker_bot.logic.stats import (
     format_timedelta,
     get_weekly_stats_text,
-    get_data_for_advice
+    get_data_for_advice,
+    get_stats_text,
+    days_phrase,
+    stats_cache_info
 )
 import telegram_tracker_bot.handlers
+from telegram_tracker_bot.db import date_to_day, RunningStats, QuantileSketch
+from telegram_tracker_bot.db.memory import MemoryBackend
 
 MOCK_SLEEP_DATA = [
     {'date': '2024-05-15', 'hours': 7.5},
@@ -34,6 +42,44 @@ MOCK_WORKOUTS_DATA = [
 ]
 
 
+def make_daily_summary(sleep, calories, workouts):
+    """Собирает дневные сводки из списков записей"""
+    days = {}
+
+    def day(date):
+        return days.setdefault(date, {
+            'day': date_to_day(date), 'sleep_hours': None, 'sleep_count': 0,
+            'calories': None, 'calories_count': 0,
+            'workout_hours': 0.0, 'workout_count': 0, 'activities': {}})
+
+    for item in sleep:
+        entry = day(item['date'])
+        entry['sleep_hours'] = (entry['sleep_hours'] or 0) + item['hours']
+        entry['sleep_count'] += 1
+    for item in calories:
+        entry = day(item['date'])
+        entry['calories'] = (entry['calories'] or 0) + item['amount']
+        entry['calories_count'] += 1
+    for item in workouts:
+        entry = day(item['date'])
+        entry['workout_hours'] += item['duration_hours']
+        entry['workout_count'] += 1
+        activities = entry['activities']
+        activities[item['activity_type']] = (
+            activities.get(item['activity_type'], 0)
+            + item['duration_hours'])
+    return [days[date] for date in sorted(days)]
+
+
+@pytest.fixture
+def mock_storage():
+    """Мок хранилища для отчета: без статистики пользователя и скетчей"""
+    with patch('telegram_tracker_bot.logic.stats.get_storage') as storage:
+        storage.return_value.get_running_stats.return_value = {}
+        storage.return_value.get_quantile_sketches.return_value = {}
+        yield storage
+
+
 def test_format_timedelta():
     assert format_timedelta(7.5) == "07:30"
     assert format_timedelta(0.5) == "00:30"
@@ -41,13 +87,12 @@ def test_format_timedelta():
     assert format_timedelta(0.0) == "00:00"
     assert format_timedelta(24.0) == "24:00"
     assert format_timedelta(1.75) == "01:45"
-@patch('telegram_tracker_bot.logic.stats.get_records_last_n_days')
-def test_get_weekly_stats_text_with_data(mock_get_records):
-    mock_get_records.side_effect = [
-        MOCK_SLEEP_DATA,
-        MOCK_CALORIES_DATA,
-        MOCK_WORKOUTS_DATA
-    ]
+
+
+def test_get_weekly_stats_text_with_data(mock_storage):
+    mock_get_records = mock_storage.return_value.get_daily_summary_last_n_days
+    mock_get_records.return_value = make_daily_summary(
+        MOCK_SLEEP_DATA, MOCK_CALORIES_DATA, MOCK_WORKOUTS_DATA)
     user_id = 123
     report = get_weekly_stats_text(user_id)
 
@@ -62,14 +107,12 @@ def test_get_weekly_stats_text_with_data(mock_get_records):
     assert "    - Weightlifting: 01:30" in report
     assert "    - Running: 01:45" in report
     assert "    - Yoga: 00:30" in report
-    mock_get_records.assert_any_call(user_id, "sleep", 7, 'telegram_tracker_bot/db/tracker_data_base.db')
-    mock_get_records.assert_any_call(user_id, "calories", 7, 'telegram_tracker_bot/db/tracker_data_base.db')
-    mock_get_records.assert_any_call(user_id, "workouts", 7, 'telegram_tracker_bot/db/tracker_data_base.db')
+    mock_get_records.assert_called_once_with(user_id, 7)
 
 
-@patch('telegram_tracker_bot.logic.stats.get_records_last_n_days')
-def test_get_weekly_stats_text_no_data(mock_get_records):
-    mock_get_records.side_effect = [[], [], []]
+def test_get_weekly_stats_text_no_data(mock_storage):
+    mock_get_records = mock_storage.return_value.get_daily_summary_last_n_days
+    mock_get_records.return_value = []
     user_id = 456
     report = get_weekly_stats_text(user_id)
 
@@ -78,13 +121,14 @@ def test_get_weekly_stats_text_no_data(mock_get_records):
     assert "💪 Тренировки: Нет данных за последние 7 дней." in report
 
 
-@patch('telegram_tracker_bot.logic.stats.get_records_last_n_days')
-def test_get_data_for_advice_with_data(mock_get_records):
-    mock_get_records.side_effect = [
-        MOCK_SLEEP_DATA,
-        MOCK_CALORIES_DATA,
-        MOCK_WORKOUTS_DATA
-    ]
+@patch('telegram_tracker_bot.logic.stats.get_storage')
+def test_get_data_for_advice_with_data(mock_storage):
+    mock_get_records = mock_storage.return_value.get_all_records_last_n_days
+    mock_get_records.return_value = {
+        "sleep": MOCK_SLEEP_DATA,
+        "calories": MOCK_CALORIES_DATA,
+        "workouts": MOCK_WORKOUTS_DATA
+    }
     user_id = 789
     data = get_data_for_advice(user_id)
     _ = telegram_tracker_bot.handlers
@@ -109,17 +153,118 @@ def test_get_data_for_advice_with_data(mock_get_records):
     assert data["calories"] == expected_calories
     assert data["workouts"] == expected_workouts
 
-    mock_get_records.assert_any_call(user_id, "sleep", 7, 'telegram_tracker_bot/db/tracker_data_base.db')
-    mock_get_records.assert_any_call(user_id, "calories", 7, 'telegram_tracker_bot/db/tracker_data_base.db')
-    mock_get_records.assert_any_call(user_id, "workouts", 7, 'telegram_tracker_bot/db/tracker_data_base.db')
+    mock_get_records.assert_called_once_with(user_id, 7)
 
 
-@patch('telegram_tracker_bot.logic.stats.get_records_last_n_days')
-def test_get_data_for_advice_no_data(mock_get_records):
-    mock_get_records.side_effect = [[], [], []]
+@patch('telegram_tracker_bot.logic.stats.get_storage')
+def test_get_data_for_advice_no_data(mock_storage):
+    mock_get_records = mock_storage.return_value.get_all_records_last_n_days
+    mock_get_records.return_value = {"sleep": [], "calories": [],
+                                     "workouts": []}
     user_id = 999
     data = get_data_for_advice(user_id)
 
     assert data["sleep"] == []
     assert data["calories"] == []
-    assert data["workouts"] == []
\ No newline at end of file
+    assert data["workouts"] == []
+
+
+def test_get_weekly_stats_text_sums_entries_per_day(mock_storage):
+    mock_get_records = mock_storage.return_value.get_daily_summary_last_n_days
+    mock_get_records.return_value = make_daily_summary(
+        [{'date': '2024-05-20', 'hours': 6.0},
+         {'date': '2024-05-20', 'hours': 1.5},
+         {'date': '2024-05-21', 'hours': 8.5}],
+        [{'date': '2024-05-20', 'amount': 1200},
+         {'date': '2024-05-20', 'amount': 800}],
+        [])
+    report = get_weekly_stats_text(1)
+
+    assert "  - В среднем: 08:00 / ночь" in report
+    assert "    - 2024-05-20: 07:30" in report
+    assert "  - В среднем: 2000 ккал / день" in report
+
+
+def test_weekly_stats_text_is_cached(mock_storage):
+    mock_get_records = mock_storage.return_value.get_daily_summary_last_n_days
+    mock_get_records.return_value = make_daily_summary(
+        MOCK_SLEEP_DATA, [], [])
+    before = stats_cache_info()
+
+    first = get_weekly_stats_text(2001)
+    second = get_weekly_stats_text(2001)
+
+    after = stats_cache_info()
+    assert first == second
+    mock_get_records.assert_called_once_with(2001, 7)
+    assert after["hits"] - before["hits"] == 1
+    assert after["misses"] - before["misses"] == 1
+
+
+def test_weekly_stats_text_invalidated_on_write():
+    storage = MemoryBackend()
+    today = date.today().isoformat()
+    with patch('telegram_tracker_bot.logic.stats.get_storage',
+               return_value=storage):
+        assert "Сон: Нет данных" in get_weekly_stats_text(2002)
+        storage.add_sleep_record(2002, today, 7.5)
+        assert "В среднем: 07:30 / ночь" in get_weekly_stats_text(2002)
+        asyncio.run(storage.async_add_sleep_record(2002, today, 1.0))
+        assert "В среднем: 08:30 / ночь" in get_weekly_stats_text(2002)
+
+
+def test_weekly_stats_text_rebuilt_after_midnight(mock_storage):
+    mock_get_records = mock_storage.return_value.get_daily_summary_last_n_days
+    mock_get_records.return_value = []
+    today = date_to_day(date.today())
+    with patch('telegram_tracker_bot.logic.stats.date_to_day',
+               return_value=today):
+        get_weekly_stats_text(2003)
+        get_weekly_stats_text(2003)
+    with patch('telegram_tracker_bot.logic.stats.date_to_day',
+               return_value=today + 1):
+        get_weekly_stats_text(2003)
+
+    assert mock_get_records.call_count == 2
+
+
+def test_get_stats_text_long_window_uses_totals(mock_storage):
+    mock_totals = mock_storage.return_value.get_window_totals_last_n_days
+    mock_totals.return_value = {
+        "sleep_days": 200, "sleep_count": 200, "sleep_hours": 1500.0,
+        "calories_days": 0, "calories_count": 0, "calories": 0,
+        "workout_days": 40, "workout_count": 50, "workout_hours": 50.5,
+        "activities": {"Бег": 30.0, "Йога": 20.5}}
+    mock_storage.return_value.get_running_stats.return_value = {
+        "sleep": RunningStats(400, 7.0, 100.0, 4.0, 10.0)}
+    sketch = QuantileSketch()
+    sketch.add(6.0, 100)
+    sketch.add(9.0, 100)
+    mock_storage.return_value.get_quantile_sketches.return_value = {
+        "sleep": sketch}
+    report = get_stats_text(2004, 365)
+
+    assert "📊 Статистика за последние 365 дней:" in report
+    assert "  - В среднем: 07:30 / ночь" in report
+    assert "  - Дней с записями: 200" in report
+    assert "  - Обычно: 07:00 за запись (±00:30), сейчас +00:30" in report
+    assert "  - Среди всех пользователей: 50-й процентиль" in report
+    assert "🍎 Калории: Нет данных за последние 365 дней." in report
+    assert "  - Дней с тренировками: 40" in report
+    assert "    - Йога: 20:30" in report
+    mock_totals.assert_called_once_with(2004, 365)
+    assert not mock_storage.return_value.get_daily_summary_last_n_days.called
+
+
+def test_get_stats_text_rejects_bad_window():
+    with pytest.raises(ValueError):
+        get_stats_text(1, 0)
+
+
+def test_days_phrase():
+    assert days_phrase(1) == "1 день"
+    assert days_phrase(3) == "3 дня"
+    assert days_phrase(7) == "7 дней"
+    assert days_phrase(12) == "12 дней"
+    assert days_phrase(21) == "21 день"
+    assert days_phrase(365) == "365 дней"
@@ -0,0 +1,122 @@
+"""
+ТЕСТЫ ИМПОРТА И ЭКСПОРТА
+"""
+import io
+import json
+import pytest
+
+from telegram_tracker_bot.db import (
+    initialize_db,
+    archive_old_records,
+    add_sleep_record,
+    add_calories_record,
+    add_workout_record,
+    close_all_pools
+)
+from telegram_tracker_bot.db.connection import connection
+from telegram_tracker_bot.db.transfer import (
+    export_records,
+    import_records,
+    main
+)
+
+
+@pytest.fixture
+def databases(tmp_path):
+    """Фикстура исходной БД с записями и пустой целевой БД"""
+    source = str(tmp_path / "source.db")
+    target = str(tmp_path / "target.db")
+    initialize_db(source)
+    add_sleep_record(1, "2024-05-01", 7.5, source)
+    add_calories_record(1, "2024-05-01", 2100, source)
+    add_workout_record(1, "2024-05-01", 1.0, "Бег", source)
+    add_workout_record(1, "2024-05-01", 0.5, "Бег", source)
+    add_sleep_record(2, "2024-05-02", 6.0, source)
+    yield source, target
+    close_all_pools()
+
+
+def summary_rows(database):
+    """Строки дневных сводок базы"""
+    with connection(database) as conn:
+        return conn.execute(
+            "SELECT user_id, day, sleep_hours, calories, workout_hours"
+            " FROM daily_summary ORDER BY user_id, day").fetchall()
+
+
+@pytest.mark.parametrize("fmt", ["csv", "jsonl"])
+def test_round_trip(databases, fmt):
+    """Тест выгрузки и загрузки без потерь"""
+    source, target = databases
+    buffer = io.StringIO()
+    assert export_records(source, buffer, fmt) == 5
+    buffer.seek(0)
+    assert import_records(target, buffer, fmt) == 5
+    assert summary_rows(target) == summary_rows(source)
+
+
+def test_export_user_filter(databases):
+    """Тест выгрузки одного пользователя"""
+    source, _ = databases
+    buffer = io.StringIO()
+    export_records(source, buffer, "jsonl", [2])
+    records = [json.loads(line) for line in buffer.getvalue().splitlines()]
+    assert records == [{"table": "sleep", "user_id": 2,
+                        "date": "2024-05-02", "hours": 6.0}]
+
+
+def test_export_empty_user_filter(databases):
+    """Тест выгрузки по пустому списку пользователей, в том числе архива"""
+    source, _ = databases
+    archive_old_records(source, 90)
+    buffer = io.StringIO()
+    assert export_records(source, buffer, "jsonl", []) == 0
+    assert buffer.getvalue() == ""
+
+
+def test_import_rejects_invalid_record(databases):
+    """Тест сообщения об ошибке с номером записи"""
+    _, target = databases
+    src = io.StringIO('{"table": "sleep", "user_id": 1,'
+                      ' "date": "2024-05-01", "hours": 7}\n'
+                      '{"table": "sleep", "user_id": 1, "date": "вчера",'
+                      ' "hours": 7}\n')
+    with pytest.raises(ValueError, match="Запись 2"):
+        import_records(target, src, "jsonl")
+    assert summary_rows(target) == []
+
+
+@pytest.mark.parametrize("field, value", [
+    ("hours", "nan"), ("hours", "inf"), ("hours", 0), ("hours", -1.5)])
+def test_import_rejects_non_positive_values(databases, field, value):
+    """Тест отказа в импорте бесконечных, NaN и неположительных значений"""
+    _, target = databases
+    record = {"table": "sleep", "user_id": 1, "date": "2024-05-01",
+              field: value}
+    with pytest.raises(ValueError, match="Запись 1"):
+        import_records(target, io.StringIO(json.dumps(record)), "jsonl")
+    assert summary_rows(target) == []
+
+
+@pytest.mark.parametrize("table, field, value", [
+    ("sleep", "hours", 24), ("calories", "amount", 0.5),
+    ("calories", "amount", "1800.5"), ("workouts", "duration_hours", 30)])
+def test_import_rejects_values_out_of_range(databases, table, field, value):
+    """Тест тех же границ значений, что и у команд бота"""
+    _, target = databases
+    record = {"table": table, "user_id": 1, "date": "2024-05-01",
+              "activity_type": "Бег", field: value}
+    with pytest.raises(ValueError, match="Запись 1"):
+        import_records(target, io.StringIO(json.dumps(record)), "jsonl")
+    assert summary_rows(target) == []
+
+
+def test_cli_export(databases, tmp_path):
+    """Тест запуска из командной строки"""
+    source, _ = databases
+    out = tmp_path / "backup.csv"
+    assert main(["export", str(out), "--database", source,
+                 "--user", "1"]) == 0
+    lines = out.read_text(encoding="utf-8").splitlines()
+    assert lines[0].startswith("table,user_id,date")
+    assert len(lines) == 5
@@ -0,0 +1,91 @@
+"""
+ТЕСТЫ ТРЕНДОВ АКТИВНОСТИ
+"""
+from unittest.mock import patch
+import numpy as np
+
+from telegram_tracker_bot.db import date_to_day
+from telegram_tracker_bot.db.columnar import columns_from_summary
+from telegram_tracker_bot.logic.trends import (
+    rolling_mean,
+    logging_streaks,
+    compute_trends,
+    get_trends_text,
+)
+
+
+def make_columns(sleep, calories=None, workouts=None):
+    """Дневные столбцы окна с 2024-05-01"""
+    n_days = len(sleep)
+    calories = calories if calories is not None else [None] * n_days
+    workouts = workouts if workouts is not None else [0.0] * n_days
+    start_day = date_to_day("2024-05-01")
+    rows = [(start_day + i, sleep[i], calories[i], workouts[i])
+            for i in range(n_days)]
+    return columns_from_summary(start_day, n_days, rows)
+
+
+def test_rolling_mean_skips_missing_days():
+    values = np.array([1.0, np.nan, 3.0, np.nan, np.nan, np.nan])
+    np.testing.assert_allclose(rolling_mean(values, 3),
+                               [1.0, 1.0, 2.0, 3.0, 3.0, np.nan])
+
+
+def test_rolling_mean_matrix_rows_independent():
+    values = np.array([[1.0, 2.0, 3.0, 4.0],
+                       [10.0, np.nan, 30.0, 50.0]])
+    np.testing.assert_allclose(rolling_mean(values, 2),
+                               [[1.0, 1.5, 2.5, 3.5],
+                                [10.0, 10.0, 30.0, 40.0]])
+
+
+def test_logging_streaks():
+    columns = make_columns([7.0, 7.0, 7.0, None, None, 8.0, None],
+                           calories=[None] * 6 + [2000],
+                           workouts=[0.0] * 4 + [1.0, 0.0, 0.0])
+    assert logging_streaks(columns) == (3, 3)
+
+
+def test_logging_streak_survives_until_tonight():
+    columns = make_columns([7.0, 7.0, None])
+    assert logging_streaks(columns) == (2, 2)
+    columns = make_columns([7.0, None, None])
+    assert logging_streaks(columns) == (0, 1)
+
+
+def test_compute_trends():
+    sleep = [6.0 + 0.1 * i for i in range(14)]
+    columns = make_columns(sleep, workouts=[1.0, 0.0] * 7)
+    trends = compute_trends(columns)
+
+    np.testing.assert_allclose(trends["sleep"]["slope"], 0.1)
+    np.testing.assert_allclose(trends["sleep"]["week_delta"], 0.7)
+    np.testing.assert_allclose(trends["sleep"]["mean_7"], np.mean(sleep[7:]))
+    np.testing.assert_allclose(trends["sleep"]["mean_30"], np.mean(sleep))
+    np.testing.assert_allclose(trends["workouts"]["mean_7"], 3 / 7)
+    assert np.isnan(trends["calories"]["mean_30"])
+    assert np.isnan(trends["calories"]["slope"])
+    assert trends["streak"] == (14, 14)
+
+
+@patch('telegram_tracker_bot.logic.trends.get_storage')
+def test_get_trends_text(mock_storage):
+    mock_columns = mock_storage.return_value.get_daily_columns_last_n_days
+    mock_columns.return_value = make_columns(
+        [7.0] * 23 + [8.0] * 7, calories=[2000] * 30)
+    report = get_trends_text(1)
+
+    assert "📈 Тренды за последние 30 дней:" in report
+    assert "  - Среднее за 7 дней: 08:00" in report
+    assert "  - К прошлой неделе: +01:00" in report
+    assert "  - Среднее за 30 дней: 2000 ккал" in report
+    assert "💪 Тренировки, в день:" in report
+    assert "🔥 Дней подряд с записями: 30" in report
+    mock_columns.assert_called_once_with(1, 30)
+
+
+@patch('telegram_tracker_bot.logic.trends.get_storage')
+def test_get_trends_text_no_data(mock_storage):
+    mock_columns = mock_storage.return_value.get_daily_columns_last_n_days
+    mock_columns.return_value = make_columns([None] * 30)
+    assert get_trends_text(1) == "📈 Нет данных за последние 30 дней."
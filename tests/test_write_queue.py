@@ -0,0 +1,131 @@
+"""
+ТЕСТЫ ОЧЕРЕДИ ГРУППОВОЙ ЗАПИСИ
+"""
+import asyncio
+import sqlite3
+from unittest.mock import AsyncMock, MagicMock, patch
+import pytest
+
+from telegram_tracker_bot.db import initialize_db, close_all_pools
+from telegram_tracker_bot.db.write_queue import WriteQueue, WriteQueueStopped
+from telegram_tracker_bot.handlers import record_sleep
+
+
+@pytest.fixture
+def database(tmp_path):
+    """Фикстура тестовой БД во временной директории"""
+    path = str(tmp_path / "tracker.db")
+    initialize_db(path)
+    yield path
+    close_all_pools()
+
+
+def count_rows(database, table):
+    """Считает строки в таблице тестовой БД"""
+    conn = sqlite3.connect(database)
+    count = conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+    conn.close()
+    return count
+
+
+def test_concurrent_writes_share_transaction(database):
+    """Тест объединения одновременных записей в один пакет"""
+    write_queue = WriteQueue(database, max_delay=0.05)
+
+    async def scenario():
+        await asyncio.gather(
+            *(write_queue.add_sleep_record(i, "2024-01-01", 8.0)
+              for i in range(20)),
+            write_queue.add_calories_record(1, "2024-01-01", 2000),
+            write_queue.add_workout_record(1, "2024-01-01", 1.0, "Бег"),
+        )
+        await write_queue.close()
+
+    with patch.object(WriteQueue, "_write_batch",
+                      autospec=True,
+                      side_effect=WriteQueue._write_batch) as write_batch:
+        asyncio.run(scenario())
+
+    assert write_batch.call_count == 1
+    assert count_rows(database, "sleep") == 20
+    assert count_rows(database, "calories") == 1
+    assert count_rows(database, "workouts") == 1
+
+
+def test_failed_record_does_not_break_batch(database):
+    """Тест изоляции ошибочной записи внутри пакета"""
+    write_queue = WriteQueue(database, max_delay=0.05)
+
+    async def scenario():
+        results = await asyncio.gather(
+            write_queue.add_sleep_record(1, "2024-01-01", 7.0),
+            write_queue.add_sleep_record(2, "2024-01-01", None),
+            write_queue.add_sleep_record(3, None, 7.0),
+            return_exceptions=True)
+        await write_queue.close()
+        return results
+
+    results = asyncio.run(scenario())
+
+    assert results[0].user_id == 1
+    assert results[0].hours == 7.0
+    assert isinstance(results[1], sqlite3.IntegrityError)
+    assert isinstance(results[2], TypeError)
+    assert count_rows(database, "sleep") == 1
+
+
+def test_close_without_writes(database):
+    """Тест остановки очереди без записей"""
+    asyncio.run(WriteQueue(database).close())
+
+
+def test_unexpected_error_fails_batch(database):
+    """Тест передачи вызывающим ошибки, отличной от sqlite3.Error"""
+    write_queue = WriteQueue(database, max_delay=0.05)
+
+    async def scenario():
+        results = await asyncio.gather(
+            write_queue.add_sleep_record(1, "2024-01-01", 7.0),
+            write_queue.add_sleep_record(2, "2024-01-01", 7.0),
+            return_exceptions=True)
+        await write_queue.close()
+        return results
+
+    with patch.object(WriteQueue, "_write_batch",
+                      side_effect=ValueError("ошибка")):
+        results = asyncio.run(scenario())
+
+    assert all(isinstance(result, ValueError) for result in results)
+
+
+def test_stopped_task_fails_pending_records(database):
+    """Тест завершения ожидающих записей при аварийной остановке"""
+    write_queue = WriteQueue(database, max_delay=0.05)
+
+    async def scenario():
+        writes = [asyncio.create_task(
+            write_queue.add_sleep_record(i, "2024-01-01", 7.0))
+            for i in range(3)]
+        await asyncio.sleep(0)
+        write_queue._task.cancel()
+        return await asyncio.gather(*writes, return_exceptions=True)
+
+    results = asyncio.run(scenario())
+
+    assert all(isinstance(result, WriteQueueStopped) for result in results)
+    assert count_rows(database, "sleep") == 0
+
+
+@patch('telegram_tracker_bot.handlers.handlers.get_storage')
+def test_handler_replies_when_queue_stopped(mock_storage):
+    """Тест ответа пользователю, если очередь остановлена (выключение)"""
+    mock_storage.return_value.async_add_sleep_record = AsyncMock(
+        side_effect=WriteQueueStopped("Очередь записи остановлена"))
+    update = MagicMock()
+    update.message.reply_text = AsyncMock()
+    context = MagicMock(args=["7.5"])
+
+    asyncio.run(record_sleep(update, context))
+
+    update.message.reply_text.assert_awaited_once()
+    assert "ошибка" in update.message.reply_text.call_args.args[0]